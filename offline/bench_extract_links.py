@@ -0,0 +1,132 @@
+"""Benchmark link extraction against the rules it replaced, on a golden corpus.
+
+The legacy rules decoded each page's entities, stripped refs and truncated at
+the first reference-style header before matching links, each a pass over the
+whole text. extract_pages does it in one fused scan of the escaped text. Both
+run over GOLDEN_CORPUS_PATH (escaped wikitext, as stored in the dump); the
+pages and links they extract must be identical, then each is timed.
+
+    uv run python -m offline.bench_extract_links
+"""
+
+import html
+import json
+import re
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from loguru import logger
+
+from offline.extract_graph import NON_ARTICLE_PREFIXES, extract_pages, normalize_title
+
+GOLDEN_CORPUS_PATH = Path(__file__).parent / "testdata" / "golden_links.jsonl"
+
+# Each timed pass runs over this many copies of the corpus, which alone takes
+# only milliseconds; the fastest of REPEATS passes is reported.
+CORPUS_COPIES = 20
+REPEATS = 10
+
+LEGACY_REDIRECT_RE = re.compile(r"#REDIRECT\s*\[\[([^\]|#]+)", re.IGNORECASE)
+LEGACY_REF_RE = re.compile(r"<ref[^>]*?(?:/>|>.*?</ref>)", re.DOTALL)
+LEGACY_TRUNCATE_RE = re.compile(
+    r"==\s*(references|notes|bibliography|external links|"
+    r"further reading|sources|citations|works cited|footnotes)\s*==",
+    re.IGNORECASE,
+)
+LEGACY_LINK_RE = re.compile(r"\[\[([^\]|#<>{}\n]+?)(?:[|#][^\]]*)?\]\]")
+
+
+def load_golden_corpus() -> list[tuple[str, int, str]]:
+    """(title, revision, escaped text) per page of the golden corpus."""
+    with open(GOLDEN_CORPUS_PATH, encoding="utf-8") as f:
+        return [
+            (page["title"], page["revision"], page["text"])
+            for page in map(json.loads, f)
+        ]
+
+
+def legacy_extract_pages(
+    pages_text: Iterable[tuple[str, int, str]],
+) -> tuple[list[tuple[str, bool, str | None, int]], list[tuple[str, str]]]:
+    """Extract (pages, links) the way extraction did before the fused scan."""
+    pages: list[tuple[str, bool, str | None, int]] = []
+    links: list[tuple[str, str]] = []
+
+    for title, revision, text in pages_text:
+        text = html.unescape(text)
+        text = LEGACY_REF_RE.sub("", text)
+        truncate_match = LEGACY_TRUNCATE_RE.search(text)
+        if truncate_match:
+            text = text[: truncate_match.start()]
+
+        redirect_match = LEGACY_REDIRECT_RE.search(text[:300])
+        if redirect_match:
+            target = normalize_title(redirect_match.group(1))
+            pages.append((title, True, target, revision))
+            continue
+
+        pages.append((title, False, None, revision))
+
+        seen: set[str] = set()
+        for link_match in LEGACY_LINK_RE.finditer(text):
+            target = link_match.group(1).strip()
+            if not target or target.startswith(NON_ARTICLE_PREFIXES):
+                continue
+
+            target = normalize_title(target)
+
+            if target in seen or target == title:
+                continue
+            seen.add(target)
+
+            links.append((title, target))
+
+    return pages, links
+
+
+def fused_extract_pages(
+    pages_text: Iterable[tuple[str, int, str]],
+) -> tuple[list[tuple[str, bool, str | None, int]], list[tuple[str, str]]]:
+    """extract_pages, with its interned link ids mapped back to title pairs."""
+    title_ids: dict[str, int] = {}
+    pages, src, dst = extract_pages(pages_text, title_ids)
+    titles = list(title_ids)
+    return pages, [(titles[s], titles[d]) for s, d in zip(src, dst)]
+
+
+def pages_per_second(
+    extractors: list[Callable], pages_text: list[tuple[str, int, str]], repeats: int
+) -> list[float]:
+    """Each extractor's best rate over `repeats` passes.
+
+    The extractors take turns pass by pass, so drift in machine load hits all of
+    them alike.
+    """
+    best = [float("inf")] * len(extractors)
+    for _ in range(repeats):
+        for k, extract in enumerate(extractors):
+            start = time.perf_counter()
+            extract(pages_text)
+            best[k] = min(best[k], time.perf_counter() - start)
+    return [len(pages_text) / seconds for seconds in best]
+
+
+if __name__ == "__main__":
+    pages_text = load_golden_corpus()
+    logger.info(f"Loaded {len(pages_text):,} golden pages from {GOLDEN_CORPUS_PATH}")
+
+    legacy = legacy_extract_pages(pages_text)
+    fused = fused_extract_pages(pages_text)
+    if legacy != fused:
+        raise RuntimeError("Fused extraction differs from the legacy rules")
+    n_redirects = sum(is_redirect for _, is_redirect, _, _ in fused[0])
+    logger.info(f"Identical output: {n_redirects:,} redirects, {len(fused[1]):,} links")
+
+    legacy_rate, fused_rate = pages_per_second(
+        [legacy_extract_pages, lambda p: extract_pages(p, {})],
+        pages_text * CORPUS_COPIES,
+        REPEATS,
+    )
+    logger.info(f"Legacy: {legacy_rate:,.0f} pages/s")
+    logger.info(f"Fused:  {fused_rate:,.0f} pages/s ({fused_rate / legacy_rate:.2f}x)")
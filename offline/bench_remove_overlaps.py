@@ -0,0 +1,73 @@
+"""Benchmark the overlap-relaxation solvers on a synthetic dense cluster fixture.
+
+Drops NODES circles with lognormal radii (plus a few hubs) into Gaussian
+clusters of about CLUSTER_SIZE, packed well past touching, as ForceAtlas2 leaves its densest
+communities, then relaxes the same fixture with each solver and compares
+iterations, time, overlaps left and how far the nodes moved.
+
+    uv run python -m offline.bench_remove_overlaps
+"""
+
+import time
+
+import numpy as np
+from loguru import logger
+
+from offline.remove_overlaps import MAX_ITERS, relax
+
+NODES = 200_000
+CLUSTER_SIZE = 1_250
+HUBS = 200
+SEED = 0
+
+# Total circle area over the area within one standard deviation of each
+# cluster's center: above 1 the clusters cannot be laid out as they are.
+PACKING = 2.0
+
+
+def dense_clusters(
+    nodes: int = NODES, hubs: int = HUBS, seed: int = SEED
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(x, y, r) of the synthetic fixture."""
+    rng = np.random.default_rng(seed)
+    r = rng.lognormal(0.0, 0.5, nodes)
+    r[rng.choice(nodes, hubs, replace=False)] *= 20
+
+    clusters = max(1, nodes // CLUSTER_SIZE)
+    cluster = rng.integers(clusters, size=nodes)
+    area = np.bincount(cluster, weights=np.pi * r**2, minlength=clusters)
+    sigma = np.sqrt(area / PACKING / np.pi)
+    spread = 4 * sigma.max() * np.sqrt(clusters)
+    center = rng.uniform(0, spread, (clusters, 2))
+    x = center[cluster, 0] + rng.normal(0, sigma[cluster])
+    y = center[cluster, 1] + rng.normal(0, sigma[cluster])
+    return x, y, r
+
+
+if __name__ == "__main__":
+    x0, y0, r = dense_clusters()
+    logger.info(
+        f"{NODES:,} nodes in clusters of {CLUSTER_SIZE:,} at packing {PACKING}, "
+        f"{HUBS} hubs"
+    )
+
+    for solver in ("jacobi", "momentum"):
+        x, y = x0.copy(), y0.copy()
+        trace = []
+        start = time.perf_counter()
+        remaining = relax(x, y, r, MAX_ITERS, verbose=False, solver=solver, trace=trace)
+        elapsed = time.perf_counter() - start
+
+        disp = np.hypot(x - x0, y - y0)
+        iters = trace[-1]["iteration"]
+        logger.info(
+            f"{solver}: {iters} iterations in {elapsed:.1f}s "
+            f"({elapsed / iters * 1000:.0f} ms each), {remaining:,} overlaps left, "
+            f"displacement median={np.median(disp):.3f}, max={disp.max():.3f}"
+        )
+        for record in trace[:: max(1, len(trace) // 10)]:
+            logger.info(
+                f"  iter {record['iteration']}: {record['overlaps']:,} overlaps, "
+                f"max pen {record['max_penetration']:.3f}, "
+                f"mean step {record['mean_displacement']:.4f}"
+            )
@@ -1,10 +1,19 @@
 import bz2
+import hashlib
 import html
+import json
+import mmap
+import os
 import re
+import shutil
+from array import array
+from collections.abc import Iterable, Iterator
+from functools import cache
 from pathlib import Path
 
+import numpy as np
 import polars as pl
-from joblib import Parallel, delayed
+from joblib import Parallel, delayed, effective_n_jobs
 from loguru import logger
 from tqdm import tqdm
 
@@ -15,23 +24,106 @@ NODES_OUTPUT_PATH = Path("intermediates/extracted_nodes.parquet")
 EDGES_OUTPUT_PATH = Path("intermediates/extracted_edges.parquet")
 REDIRECTS_OUTPUT_PATH = Path("intermediates/extracted_redirects.parquet")
 
+# Workers spill their records here as Parquet shards instead of returning them
+# to the parent, so parent memory is bounded by a shard rather than the dump.
+SHARDS_DIR = Path("intermediates/extract_shards")
+
+# One line per completed shard, appended by the parent after all of that shard's
+# files are in place. A re-launched run with the same dump, shard size and
+# rules only processes the shards missing from it.
+MANIFEST_PATH = SHARDS_DIR / "manifest.jsonl"
+
+# To refresh from a new dump incrementally, move the previous run's SHARDS_DIR
+# here first. Articles whose revision id is unchanged skip link extraction and
+# their links are carried over from the previous shards. The previous run is
+# used only if it finished with the same extraction rules.
+PREVIOUS_SHARDS_DIR = Path("intermediates/extract_shards_previous")
+
+# Links per carried-over shard. Carried links are repacked into shards of this
+# size, so the number of shards doesn't grow with each refresh.
+CARRY_SHARD_LINKS = 64 * 2**20
+
+# Optionally keep each shard's namespace-0 (title, raw wikitext) as zstd Arrow
+# IPC next to the shards. bz2 dominates extraction while the cache decodes many
+# times faster, so re-running with changed link rules skips the dump entirely.
+# It is tied to the dump and SHARD_BYTES, not to the rules. The cache is about
+# as large as the ns0 text compressed with zstd (~25 GiB for enwiki).
+USE_TEXT_CACHE = False
+TEXT_CACHE_DIR = Path("intermediates/text_cache")
+TEXT_CACHE_KEY_PATH = TEXT_CACHE_DIR / "key.json"
+
+# Compressed bytes of consecutive streams per worker task / shard. Sized by
+# bytes rather than stream count so tasks take similar time; 32 MiB is ~500
+# streams (~50k pages), small enough to buffer in a worker while keeping the
+# task count in the hundreds rather than one task per 100-page stream.
+SHARD_BYTES = 32 * 2**20
+
+PAGES_SCHEMA = {
+    "title": pl.Utf8,
+    "is_redirect": pl.Boolean,
+    "redirect_target": pl.Utf8,
+    "revision": pl.UInt64,
+}
+TEXT_SCHEMA = {"title": pl.Utf8, "revision": pl.UInt64, "text": pl.Utf8}
+
+# Marks a shard title with no node (broken link, non-article or filtered target)
+# in the per-shard lookup tables. Node ids are dense and N < 2^32 - 1.
+MISSING_ID = np.iinfo(np.uint32).max
+
 REDIRECT_MAX_HOPS = 10
 
+# Every bz2 stream opens with "BZh", a block-size digit and the first block's
+# magic (pi in BCD). The index is itself a multistream bz2, so these byte-aligned
+# markers are points where it can be split and decompressed independently.
+BZ2_STREAM_RE = re.compile(rb"BZh[1-9]1AY&SY")
+
+# Index chunks per core on a cold parse, so uneven chunks still balance out.
+INDEX_CHUNKS_PER_CORE = 4
+
 # Parse XML using regexes instead of a proper XML parser
 # This is a lot faster
 PAGE_RE = re.compile(r"<page>(.*?)</page>", re.DOTALL)
 TITLE_RE = re.compile(r"<title>([^<]*)</title>")
 NS_RE = re.compile(r"<ns>(\d+)</ns>")
+REVISION_RE = re.compile(r"<revision>\s*<id>(\d+)</id>")
 TEXT_RE = re.compile(r"<text[^>]*>(.*?)</text>", re.DOTALL)
 REDIRECT_RE = re.compile(r"#REDIRECT\s*\[\[([^\]|#]+)", re.IGNORECASE)
-REF_RE = re.compile(r"<ref[^>]*?(?:/>|>.*?</ref>)", re.DOTALL)
-TRUNCATE_RE = re.compile(
-    r"==\s*(references|notes|bibliography|external links|"
-    r"further reading|sources|citations|works cited|footnotes)\s*==",
-    re.IGNORECASE,
+REDIRECT_HINT_RE = re.compile(r"#REDIRECT", re.IGNORECASE)
+
+# The wikitext rules below match the text as stored in the dump, i.e. still
+# XML-escaped: `<ref>` is `&lt;ref&gt;` and "AT&T" is "AT&amp;T". Only & < > and
+# quotes are escaped, so each pattern is the decoded-text rule with < and >
+# spelled as entities; entities are decoded only inside matched link titles.
+# Runs use possessive quantifiers and every alternative starts with a literal
+# so the scan below can skip ahead to the next "&", "=" or "[".
+REF_PATTERN = r"&lt;ref(?:[^&]++|&(?!gt;))*+(?:(?<=/)&gt;|&gt;.*?&lt;/ref&gt;)"
+TRUNCATE_PATTERN = (
+    r"==(?i:\s*(?:references|notes|bibliography|external links|"
+    r"further reading|sources|citations|works cited|footnotes)\s*==)"
+)
+# A title is a non-empty run of anything but ] | # < > { } or a newline. An
+# entity is taken whole, so the "#" of a numeric one like &#039; isn't read as
+# the start of a section anchor. A ref in the label or anchor after it is
+# skipped whole, as if stripped beforehand. Neither part may run into a
+# reference-style header: the body is cut there before links are matched, so a
+# link left open across one is no link at all.
+NOT_CUT = rf"(?!{TRUNCATE_PATTERN})="
+LINK_PATTERN = (
+    r"\[\[(?P<target>(?:[^\]|#<>{}\n&=]++|"
+    rf"&(?!lt;|gt;)(?:#[0-9]+;|#x[0-9a-fA-F]+;)?|{NOT_CUT})++)"
+    rf"(?:[|#](?:[^\]=&]++|{REF_PATTERN}|&|{NOT_CUT})*+)?\]\]"
 )
 
-LINK_RE = re.compile(r"\[\[([^\]|#<>{}\n]+?)(?:[|#][^\]]*)?\]\]")
+REF_RE = re.compile(REF_PATTERN, re.DOTALL)
+TRUNCATE_RE = re.compile(TRUNCATE_PATTERN)
+
+# All three rules fused into one left-to-right scan: a ref is skipped whole,
+# the first reference-style header ends the article body, and anything else
+# matched is a link. The empty groups only tag which rule matched.
+SCAN_RE = re.compile(
+    rf"{REF_PATTERN}(?P<ref>)|{TRUNCATE_PATTERN}(?P<cut>)|{LINK_PATTERN}",
+    re.DOTALL,
+)
 
 NON_ARTICLE_PREFIXES = (
     "File:",
@@ -67,43 +159,167 @@ def normalize_title(title: str) -> str:
     return title[0].upper() + title[1:]
 
 
+def stream_offsets_cache_path() -> Path:
+    """Sidecar holding the parsed stream offsets, keyed by the dump's size and mtime."""
+    stat = DUMP_PATH.stat()
+    return DUMP_INDEX_PATH.with_name(
+        f"{DUMP_INDEX_PATH.name}.{stat.st_size}-{stat.st_mtime_ns}.offsets.npy"
+    )
+
+
+def parse_index_chunk(start: int, end: int) -> np.ndarray:
+    """Decompress a run of whole index streams and return its unique stream offsets."""
+    with open(DUMP_INDEX_PATH, "rb") as f:
+        f.seek(start)
+        compressed = f.read(end - start)
+
+    lines = bz2.decompress(compressed).split(b"\n")
+    return np.unique(
+        np.array([int(line.split(b":", 1)[0]) for line in lines if line], np.int64)
+    )
+
+
 def get_stream_offsets() -> list[tuple[int, int | None]]:
     """Read the multistream dump index and return (start, end) byte ranges per stream
 
     Index is one line per page, each stream has 100 pages so we de-dupe to get unique streams.
+    On a cold run the index's own bz2 streams are decompressed in parallel; the
+    sorted offsets are then cached as an .npy sidecar so re-runs just load them.
     """
+    cache_path = stream_offsets_cache_path()
+    if cache_path.exists():
+        logger.info(f"Loading stream offsets from {cache_path}")
+        starts = np.load(cache_path)
+    else:
+        logger.info("Processing stream offsets from dump index")
+
+        with (
+            open(DUMP_INDEX_PATH, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index,
+        ):
+            size = len(index)
+            markers = np.array([m.start() for m in BZ2_STREAM_RE.finditer(index)])
+
+        # Group the index's streams into contiguous byte ranges, one per task.
+        n_chunks = min(len(markers), (os.cpu_count() or 1) * INDEX_CHUNKS_PER_CORE)
+        groups = np.array_split(markers, max(1, n_chunks))
+        cuts = sorted({0, *(int(group[0]) for group in groups if len(group))})
+        chunks = list(zip(cuts, cuts[1:] + [size]))
+        logger.info(f"Decompressing index in {len(chunks)} chunks")
+
+        results = Parallel(n_jobs=-1, backend="loky")(
+            delayed(parse_index_chunk)(start, end) for start, end in chunks
+        )
+        starts = np.unique(np.concatenate(results))
 
-    logger.info("Processing stream offsets from dump index")
-
-    offsets: set[int] = set()
-    with bz2.open(DUMP_INDEX_PATH, "rt") as f:
-        for line in tqdm(f, desc="Processing offsets", unit=" lines"):
-            offset = int(line.split(":", 1)[0])
-            offsets.add(offset)
+        tmp_path = cache_path.with_suffix(".tmp.npy")
+        np.save(tmp_path, starts)
+        tmp_path.replace(cache_path)
+        logger.info(f"Cached stream offsets to {cache_path}")
 
-    sorted_offsets = sorted(offsets)
+    sorted_offsets = starts.tolist()
 
     return list(zip(sorted_offsets, sorted_offsets[1:] + [None]))
 
 
-def process_stream(
-    start: int, end: int | None
-) -> tuple[list[tuple[str, bool, str | None]], list[tuple[str, str]]]:
-    """Decode one bz2 stream and extract page + link records.
+def batch_streams(
+    offsets: list[tuple[int, int | None]],
+) -> list[list[tuple[int, int | None]]]:
+    """Group consecutive streams into contiguous batches of ~SHARD_BYTES compressed."""
+    dump_size = DUMP_PATH.stat().st_size
+    batches: list[list[tuple[int, int | None]]] = []
+    batch: list[tuple[int, int | None]] = []
+    for start, end in offsets:
+        batch.append((start, end))
+        if (end if end is not None else dump_size) - batch[0][0] >= SHARD_BYTES:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
 
-    Returns:
-        pages: (title, is_redirect, redirect_target) for namespace-0 pages.
-        links: (source_title, target_title) for every unique wikilink from an article.
-               Titles are resolved to IDs later.
+    return batches
+
+
+@cache
+def dump_map() -> mmap.mmap:
+    """Memory-map the dump once per worker process.
+
+    loky reuses its workers across tasks, so every shard a worker runs slices
+    the same mapping instead of re-opening and reading the file.
     """
     with open(DUMP_PATH, "rb") as f:
-        f.seek(start)
-        compressed = f.read(end - start) if end is not None else f.read()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
 
-    xml = bz2.decompress(compressed).decode("utf-8", errors="replace")
+def read_ahead(start: int, end: int | None) -> None:
+    """Ask the kernel to start paging in a byte range of the dump asynchronously."""
+    dump = dump_map()
+    aligned = start - start % mmap.PAGESIZE
+    length = (end if end is not None else len(dump)) - aligned
+    dump.madvise(mmap.MADV_WILLNEED, aligned, length)
+
+
+def redirect_target(text: str) -> str | None:
+    """Return the normalized target if escaped page text is a redirect, else None.
+
+    A redirect has to be in the first 300 characters once refs are stripped and
+    the text is truncated at the first reference-style header. That full
+    treatment only runs for pages that contain "#REDIRECT" at all.
+    """
+    if ("#R" not in text and "#r" not in text) or not REDIRECT_HINT_RE.search(text):
+        return None
 
-    pages: list[tuple[str, bool, str | None]] = []
-    links: list[tuple[str, str]] = []
+    text = REF_RE.sub("", text)
+    truncate_match = TRUNCATE_RE.search(text)
+    if truncate_match:
+        text = text[: truncate_match.start()]
+
+    redirect_match = REDIRECT_RE.search(html.unescape(text)[:300])
+    if not redirect_match:
+        return None
+
+    return normalize_title(redirect_match.group(1))
+
+
+def scan_links(text: str) -> Iterator[str]:
+    """Yield normalized article link targets from escaped page text in one pass.
+
+    Inline citations are skipped (they'd add links to publishers, authors and
+    journals) and scanning stops at the first reference-style section header.
+    Entities are decoded per link title only. Targets may repeat; the caller
+    deduplicates.
+
+    Unlike stripping refs out of the text first, a link title or header split in
+    two by a ref is not stitched back together (MediaWiki doesn't render those
+    either). A ref in a link's label is skipped as if stripped, and a link left
+    open across a reference-style header is dropped, as with truncation first.
+    """
+    for match in SCAN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "cut":
+            return
+        if kind == "ref":
+            continue
+
+        target = match.group("target")
+        if "&" in target:
+            target = html.unescape(target)
+        target = target.strip()
+        if not target or target.startswith(NON_ARTICLE_PREFIXES):
+            continue
+
+        yield normalize_title(target)
+
+
+def iter_stream_pages(start: int, end: int | None) -> Iterator[tuple[str, int, str]]:
+    """Decode one bz2 stream and yield (title, revision, text) per namespace-0 page.
+
+    The wikitext stays XML-escaped; the rules match it as stored and only the
+    page title and each link title are decoded.
+    """
+    xml = bz2.decompress(memoryview(dump_map())[start:end]).decode(
+        "utf-8", errors="replace"
+    )
 
     for page_match in PAGE_RE.finditer(xml):
         page_xml = page_match.group(1)
@@ -118,135 +334,615 @@ def process_stream(
         if not title_match or not text_match:
             continue
 
-        # The dump XML-escapes the wikitext inside <text>, so `<ref>` is stored
-        # as `&lt;ref&gt;` and titles like "AT&T" as "AT&amp;T". Decode entities
-        # before any regex (REF_RE, LINK_RE) or title normalization — otherwise
-        # ref-stripping silently no-ops and every cited publisher/journal leaks
-        # into the link graph.
-        title = normalize_title(html.unescape(title_match.group(1)))
-        text = html.unescape(text_match.group(1))
-
-        # Strip inline citations (removes links to publishers, authors, journals)
-        text = REF_RE.sub("", text)
-
-        # Truncate at the first reference-style section header
-        truncate_match = TRUNCATE_RE.search(text)
-        if truncate_match:
-            text = text[: truncate_match.start()]
-
-        # Redirect has to be at the top of the text
-        redirect_match = REDIRECT_RE.search(text[:300])
-        if redirect_match:
-            target = normalize_title(redirect_match.group(1))
-            pages.append((title, True, target))
-            continue
+        # 0 never matches a previous revision, as real revision ids start at 1
+        revision_match = REVISION_RE.search(page_xml)
+        yield (
+            normalize_title(html.unescape(title_match.group(1))),
+            int(revision_match.group(1)) if revision_match else 0,
+            text_match.group(1),
+        )
 
-        pages.append((title, False, None))
 
-        # Deduplicate per-article links
-        seen: set[str] = set()
-        for link_match in LINK_RE.finditer(text):
-            target = link_match.group(1).strip()
-            if not target or target.startswith(NON_ARTICLE_PREFIXES):
+def extract_pages(
+    pages_text: Iterable[tuple[str, int, str]],
+    title_ids: dict[str, int],
+    previous: np.ndarray | None = None,
+) -> tuple[list[tuple[str, bool, str | None, int]], array, array]:
+    """Extract page + link records from (title, revision, text) pages.
+
+    Link endpoints are interned into `title_ids`, a title -> index dictionary
+    shared by every stream of the calling shard, so no tuple is built per link.
+    `previous` holds the sorted revision ids of the previous run's articles
+    when refreshing incrementally. Articles with one of those revisions are
+    recorded without scanning their links, which are carried over later instead.
+
+    Returns:
+        pages: (title, is_redirect, redirect_target, revision) for namespace-0 pages.
+        src, dst: parallel u32 arrays of `title_ids` indices, one entry per
+                  unique wikilink from an article. Titles are resolved to IDs later.
+    """
+    pages: list[tuple[str, bool, str | None, int]] = []
+    src = array("I")
+    dst = array("I")
+
+    for title, revision, text in pages_text:
+        target = redirect_target(text)
+        if target is not None:
+            pages.append((title, True, target, revision))
+            continue
+
+        pages.append((title, False, None, revision))
+        if previous is not None:
+            i = np.searchsorted(previous, revision)
+            if i < len(previous) and previous[i] == revision:
                 continue
 
-            target = normalize_title(target)
+        source_id = title_ids.setdefault(title, len(title_ids))
 
+        # Deduplicate per-article links
+        seen: set[str] = set()
+        for target in scan_links(text):
             if target in seen or target == title:
                 continue
             seen.add(target)
 
-            links.append((title, target))
+            src.append(source_id)
+            dst.append(title_ids.setdefault(target, len(title_ids)))
+
+    return pages, src, dst
+
+
+def text_cache_path(shard_id: int) -> Path:
+    """Path of one shard's cached (title, text) pages."""
+    return TEXT_CACHE_DIR / f"text-{shard_id:05d}.arrow"
+
+
+def prepare_text_cache() -> None:
+    """Create TEXT_CACHE_DIR, discarding a cache built from another dump or layout."""
+    stat = DUMP_PATH.stat()
+    key = {
+        "dump": DUMP_PATH.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "shard_bytes": SHARD_BYTES,
+    }
+    if TEXT_CACHE_KEY_PATH.exists():
+        if json.loads(TEXT_CACHE_KEY_PATH.read_text()) == key:
+            return
+        logger.info("Text cache is from another dump or shard layout, discarding")
+
+    shutil.rmtree(TEXT_CACHE_DIR, ignore_errors=True)
+    TEXT_CACHE_DIR.mkdir(parents=True)
+    TEXT_CACHE_KEY_PATH.write_text(json.dumps(key) + "\n")
+
+
+def read_shard_text(
+    shard_id: int,
+    ranges: list[tuple[int, int | None]],
+    next_ranges: list[tuple[int, int | None]] | None = None,
+) -> Iterable[tuple[str, int, str]]:
+    """(title, revision, text) pages of a shard, from the text cache when possible.
+
+    Without a cached copy the shard's streams are decompressed, and if
+    USE_TEXT_CACHE is set the pages are written to the cache on the way.
+    `next_ranges`, the streams this worker is expected to take next, are paged
+    in while these decompress.
+    """
+    if next_ranges is not None:
+        read_ahead(next_ranges[0][0], next_ranges[-1][1])
+
+    cache_path = text_cache_path(shard_id)
+    if USE_TEXT_CACHE and cache_path.exists():
+        cached = pl.read_ipc(cache_path)
+        return zip(cached["title"], cached["revision"], cached["text"])
+
+    pages_text = (
+        page for start, end in ranges for page in iter_stream_pages(start, end)
+    )
+    if not USE_TEXT_CACHE:
+        return pages_text
 
-    return pages, links
+    cached = pl.DataFrame(list(pages_text), schema=TEXT_SCHEMA, orient="row")
+    tmp_path = cache_path.with_suffix(".arrow.tmp")
+    cached.write_ipc(tmp_path, compression="zstd")
+    tmp_path.replace(cache_path)
+    return zip(cached["title"], cached["revision"], cached["text"])
 
 
-def resolve_redirect_chains(redirects: dict[str, str]) -> dict[str, str]:
+def shard_path(kind: str, shard_id: int, shards_dir: Path = SHARDS_DIR) -> Path:
+    """Path of one worker's `pages`, `titles` or `links` shard.
+
+    Links carried over from a previous run are stored the same way as
+    `carried-titles` and `carried-links` shards.
+    """
+    return shards_dir / f"{kind}-{shard_id:05d}.parquet"
+
+
+def write_shard(df: pl.DataFrame, kind: str, shard_id: int) -> None:
+    """Write a shard file atomically, so a killed worker never leaves a torn one."""
+    path = shard_path(kind, shard_id)
+    tmp_path = path.with_suffix(".parquet.tmp")
+    df.write_parquet(tmp_path)
+    tmp_path.replace(path)
+
+
+def rules_hash() -> str:
+    """Short hash of the extraction rules, to tell whether shards are comparable."""
+    rules = "\0".join(
+        [
+            REDIRECT_RE.pattern,
+            REF_PATTERN,
+            TRUNCATE_PATTERN,
+            LINK_PATTERN,
+            *NON_ARTICLE_PREFIXES,
+        ]
+    )
+    return hashlib.sha256(rules.encode()).hexdigest()[:16]
+
+
+def plan_key(previous: dict | None) -> dict:
+    """Identify the shard layout and extraction rules the checkpoints belong to.
+
+    Shards are only reusable if they were cut from the same dump with the same
+    SHARD_BYTES, extracted under the same rules and against the same previous
+    run (which decides the articles whose links were skipped).
+    """
+    stat = DUMP_PATH.stat()
+    return {
+        "dump": DUMP_PATH.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "shard_bytes": SHARD_BYTES,
+        "rules": rules_hash(),
+        "previous": previous,
+    }
+
+
+def read_manifest(path: Path) -> tuple[dict | None, dict[int, dict], int | None]:
+    """Parse a manifest into (plan key, completed shards by id, carried shards).
+
+    The first line is the plan key. Each following line records one completed
+    shard, and a final {"carried": n} line marks the run as finished. A torn
+    last line (the run died mid-append) is ignored.
+    """
+    if not path.exists():
+        return None, {}, None
+    lines = path.read_text().splitlines()
+    if not lines:
+        return None, {}, None
+
+    done: dict[int, dict] = {}
+    carried = None
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            break
+        if "carried" in entry:
+            carried = entry["carried"]
+        else:
+            done[entry["shard"]] = entry
+    return json.loads(lines[0]), done, carried
+
+
+def load_manifest(key: dict) -> tuple[dict[int, dict], int | None]:
+    """Return checkpointed progress, or reset SHARDS_DIR if it holds another plan.
+
+    Returns completed shards by id and, if carrying over links already
+    finished, the number of carried shards.
+    """
+    manifest_key, done, carried = read_manifest(MANIFEST_PATH)
+    if manifest_key == key:
+        # Drop a torn tail so later appends start on a fresh line
+        entries = [key, *done.values()]
+        if carried is not None:
+            entries.append({"carried": carried})
+        MANIFEST_PATH.write_text("".join(json.dumps(e) + "\n" for e in entries))
+        return done, carried
+    if manifest_key is not None:
+        logger.info("Shard checkpoints are from another dump or rule set, discarding")
+
+    shutil.rmtree(SHARDS_DIR, ignore_errors=True)
+    SHARDS_DIR.mkdir(parents=True)
+    MANIFEST_PATH.write_text(json.dumps(key) + "\n")
+    return {}, None
+
+
+def load_previous() -> dict | None:
+    """Summarize a finished previous run usable for an incremental refresh.
+
+    Returns {"plan", "shards", "carried"} from PREVIOUS_SHARDS_DIR's manifest,
+    or None if there is no previous run, it didn't finish, or it used other
+    extraction rules (its links would differ from a full re-extraction).
+    """
+    manifest_key, done, carried = read_manifest(
+        PREVIOUS_SHARDS_DIR / MANIFEST_PATH.name
+    )
+    if manifest_key is None:
+        return None
+    if carried is None:
+        logger.warning(f"Previous run in {PREVIOUS_SHARDS_DIR} didn't finish, ignoring")
+        return None
+    if manifest_key["rules"] != rules_hash():
+        logger.info("Previous run used other extraction rules, extracting in full")
+        return None
+    # The previous plan key is nested into ours, so keep only its own fields
+    # rather than its whole refresh history
+    plan = {k: v for k, v in manifest_key.items() if k != "previous"}
+    return {"plan": plan, "shards": len(done), "carried": carried}
+
+
+def previous_article_revisions(previous: dict) -> pl.LazyFrame:
+    """(title, revision) of the previous run's articles."""
+    return (
+        pl.scan_parquet(
+            [
+                shard_path("pages", shard_id, PREVIOUS_SHARDS_DIR)
+                for shard_id in range(previous["shards"])
+            ]
+        )
+        .filter(~pl.col("is_redirect") & (pl.col("revision") > 0))
+        .select(["title", "revision"])
+    )
+
+
+def carry_links(previous: dict, unchanged_titles: pl.DataFrame) -> int:
+    """Copy the previous links of unchanged articles into carried shards.
+
+    Both the previous run's own shards and its carried shards are filtered to
+    links from `unchanged_titles` and repacked into shards of about
+    CARRY_SHARD_LINKS links, each with its own dictionary of the titles it uses.
+    Returns the number of carried shards written.
+    """
+    groups = [("", shard_id) for shard_id in range(previous["shards"])] + [
+        ("carried-", shard_id) for shard_id in range(previous["carried"])
+    ]
+
+    n_carried = 0
+    titles: list[pl.Series] = []
+    src: list[np.ndarray] = []
+    dst: list[np.ndarray] = []
+    n_titles = 0
+    n_links = 0
+
+    def flush() -> None:
+        nonlocal n_carried, n_titles, n_links
+        write_shard(
+            pl.DataFrame(
+                {
+                    "idx": pl.Series(np.arange(n_titles, dtype=np.uint32)),
+                    "title": pl.concat(titles),
+                }
+            ),
+            "carried-titles",
+            n_carried,
+        )
+        write_shard(
+            pl.DataFrame(
+                {
+                    "src": pl.Series(np.concatenate(src)),
+                    "dst": pl.Series(np.concatenate(dst)),
+                }
+            ),
+            "carried-links",
+            n_carried,
+        )
+        n_carried += 1
+        titles.clear()
+        src.clear()
+        dst.clear()
+        n_titles = 0
+        n_links = 0
+
+    for prefix, shard_id in tqdm(groups, desc="Carrying links", unit=" shards"):
+        group_titles = pl.read_parquet(
+            shard_path(f"{prefix}titles", shard_id, PREVIOUS_SHARDS_DIR)
+        )
+        sources = group_titles.join(unchanged_titles, on="title", how="semi")
+        keep_source = np.zeros(len(group_titles), dtype=bool)
+        keep_source[sources["idx"].to_numpy()] = True
+
+        links = pl.read_parquet(
+            shard_path(f"{prefix}links", shard_id, PREVIOUS_SHARDS_DIR)
+        )
+        group_src = links["src"].to_numpy()
+        group_dst = links["dst"].to_numpy()
+        keep = keep_source[group_src]
+        if not keep.any():
+            continue
+
+        # Keep only the titles these links use, renumbered after those already
+        # buffered for the current carried shard
+        used, inverse = np.unique(
+            np.concatenate([group_src[keep], group_dst[keep]]), return_inverse=True
+        )
+        inverse = inverse.astype(np.uint32) + np.uint32(n_titles)
+        n_kept = int(keep.sum())
+        titles.append(group_titles["title"].gather(used))
+        src.append(inverse[:n_kept])
+        dst.append(inverse[n_kept:])
+        n_titles += len(used)
+        n_links += n_kept
+        if n_links >= CARRY_SHARD_LINKS:
+            flush()
+
+    if n_links:
+        flush()
+    return n_carried
+
+
+def process_shard(
+    shard_id: int,
+    ranges: list[tuple[int, int | None]],
+    next_ranges: list[tuple[int, int | None]] | None = None,
+    previous: np.ndarray | None = None,
+) -> tuple[int, int, int]:
+    """Process a batch of streams and spill its pages and links to Parquet shards.
+
+    `next_ranges`, if given, are read ahead while this batch decompresses.
+    `previous` is passed on to extract_pages for an incremental refresh.
+    Links are written dictionary-encoded: one `titles` row per distinct title in
+    the shard and one `links` row of u32 indices per link. Returns
+    (shard_id, n_pages, n_links) so the parent can checkpoint the shard and
+    report totals without ever holding the records themselves.
+    """
+    title_ids: dict[str, int] = {}
+    pages, src, dst = extract_pages(
+        read_shard_text(shard_id, ranges, next_ranges), title_ids, previous
+    )
+
+    write_shard(
+        pl.DataFrame(pages, schema=PAGES_SCHEMA, orient="row"), "pages", shard_id
+    )
+    # dicts keep insertion order, so the keys are already in index order
+    write_shard(
+        pl.DataFrame(
+            {
+                "idx": pl.Series(np.arange(len(title_ids), dtype=np.uint32)),
+                "title": pl.Series(list(title_ids), dtype=pl.Utf8),
+            }
+        ),
+        "titles",
+        shard_id,
+    )
+    write_shard(
+        pl.DataFrame(
+            {
+                "src": pl.Series(np.frombuffer(src, dtype=np.uint32)),
+                "dst": pl.Series(np.frombuffer(dst, dtype=np.uint32)),
+            }
+        ),
+        "links",
+        shard_id,
+    )
+    return shard_id, len(pages), len(src)
+
+
+def resolve_shard_links(
+    shard_id: int, title_map: pl.DataFrame, prefix: str = ""
+) -> np.ndarray:
+    """Resolve one shard's links to packed u64 (src << 32 | dst) node-id keys.
+
+    The shard's title dictionary is looked up in `title_map` (title -> node id,
+    covering articles and chain-resolved redirect aliases) once, giving a
+    local-index -> node-id table; the links are then mapped with two array
+    gathers. Links to titles with no node and self-loops from redirect
+    collapse are dropped.
+    """
+    titles = pl.read_parquet(shard_path(f"{prefix}titles", shard_id))
+    hits = titles.join(title_map, on="title", how="inner")
+    lookup = np.full(len(titles), MISSING_ID, dtype=np.uint32)
+    lookup[hits["idx"].to_numpy()] = hits["id"].to_numpy()
+
+    links = pl.read_parquet(shard_path(f"{prefix}links", shard_id))
+    src = lookup[links["src"].to_numpy()]
+    dst = lookup[links["dst"].to_numpy()]
+    keep = (src != MISSING_ID) & (dst != MISSING_ID) & (src != dst)
+
+    return (src[keep].astype(np.uint64) << 32) | dst[keep]
+
+
+def intern_titles(titles: pl.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Map each title to a dense int id (equal titles share an id).
+
+    Hashes to u64 and ranks the hashes with a NumPy sort, which is much faster
+    than a string hash-table. Every title is then compared against the first
+    title seen for its id, so a hash collision raises instead of merging pages.
+
+    Returns (ids, first): ids per input title, and for each id the position of
+    a title carrying it, so `titles.gather(first[k])` maps an id back.
+    """
+    hashes = titles.hash().to_numpy()
+    _, first, ids = np.unique(hashes, return_index=True, return_inverse=True)
+    if not (titles == titles.gather(first[ids])).all():
+        raise ValueError("u64 title hash collision; cannot intern titles")
+    return ids, first
+
+
+def resolve_redirect_chains(redirects: pl.DataFrame) -> pl.DataFrame:
     """Flatten redirect chains: A -> B -> C collapses to A -> C.
 
     These are officially discouraged by Wikipedia but still exist occassionally.
+    Titles are interned to ints and chains are followed by pointer jumping: each
+    round squares the successor array (restricted to pointers that haven't
+    reached a non-redirect yet), so after r rounds every redirect points 2^r
+    hops ahead or at the end of its chain. A chain whose end is still a
+    redirect after enough rounds to cover every redirect is a cycle (or feeds
+    into one). Cycles and chains longer than REDIRECT_MAX_HOPS are reported and
+    returned with a null target.
+
+    Takes (title, redirect_target) rows; returns (alias, target, hops).
     """
-    resolved: dict[str, str] = {}
-    for source in redirects:
-        current = source
-        for _ in range(REDIRECT_MAX_HOPS):
-            next = redirects.get(current)
-            if next is None or next == current:
-                break
-            current = next
-        resolved[source] = current
+    n = len(redirects)
+    titles = pl.concat([redirects["title"], redirects["redirect_target"]])
+    ids, first = intern_titles(titles)
+    source, target = ids[:n], ids[n:]
+
+    # Non-redirect titles point at themselves with zero hops, so chains stop there.
+    successor = np.arange(len(first))
+    successor[source] = target
+    is_redirect = np.zeros(len(successor), dtype=bool)
+    is_redirect[source] = True
+    hops = is_redirect.astype(np.int64)
+
+    # Only pointers that still land on a redirect need another jump. Most
+    # redirects are a single hop, so the active set is small from the start and
+    # after enough rounds to span every redirect it holds only cycles.
+    active = np.flatnonzero(is_redirect & is_redirect[successor])
+    for _ in range(max(1, n.bit_length())):
+        if active.size == 0:
+            break
+        via = successor[active]
+        hops[active] += hops[via]
+        successor[active] = successor[via]
+        active = active[is_redirect[successor[active]]]
+
+    end = successor[source]
+    chain_hops = hops[source]
+    cyclic = is_redirect[end]
+    too_long = ~cyclic & (chain_hops > REDIRECT_MAX_HOPS)
+    if cyclic.any():
+        examples = ", ".join(redirects["title"].filter(cyclic).head(5))
+        logger.warning(f"{int(cyclic.sum()):,} redirects are cyclic (e.g. {examples})")
+    if too_long.any():
+        examples = ", ".join(redirects["title"].filter(too_long).head(5))
+        logger.warning(
+            f"{int(too_long.sum()):,} redirect chains exceed "
+            f"REDIRECT_MAX_HOPS={REDIRECT_MAX_HOPS} (e.g. {examples})"
+        )
 
-    return resolved
+    return pl.DataFrame(
+        {
+            "alias": redirects["title"],
+            "target": titles.gather(first[end]).scatter(
+                np.flatnonzero(cyclic | too_long), None
+            ),
+            "hops": pl.Series(chain_hops).scatter(np.flatnonzero(cyclic), None),
+        }
+    )
 
 
 if __name__ == "__main__":
     logger.info("Starting graph extraction from dump")
 
     offsets = get_stream_offsets()
-    logger.info(f"Found {len(offsets)} streams to process")
+    shards = batch_streams(offsets)
+    logger.info(f"Found {len(offsets)} streams to process in {len(shards)} shards")
+
+    previous = load_previous()
+    if previous is not None:
+        logger.info(
+            f"Refreshing incrementally from {previous['plan']['dump']} "
+            f"in {PREVIOUS_SHARDS_DIR}"
+        )
 
-    all_pages: list[tuple[str, bool, str | None]] = []
-    all_links: list[tuple[str, str]] = []
+    done, n_carried = load_manifest(plan_key(previous))
+    done = {
+        shard_id: entry
+        for shard_id, entry in done.items()
+        if shard_id < len(shards) and entry["start"] == shards[shard_id][0][0]
+    }
+    todo = [shard_id for shard_id in range(len(shards)) if shard_id not in done]
+    if done:
+        logger.info(f"Resuming: {len(done):,} shards checkpointed, {len(todo):,} to go")
+    if USE_TEXT_CACHE:
+        prepare_text_cache()
+        n_cached = sum(text_cache_path(shard_id).exists() for shard_id in todo)
+        logger.info(f"Text cache holds {n_cached:,} of {len(todo):,} shards to process")
+    # joblib memory-maps large array arguments, so the workers share one copy
+    revisions = None
+    if previous is not None and todo:
+        revisions = (
+            previous_article_revisions(previous)
+            .select(pl.col("revision").unique().sort())
+            .collect()["revision"]
+            .to_numpy()
+        )
 
+    # loky hands shards out in order and they take similar time, so a worker's
+    # next shard is about one per worker further down the queue. Each task
+    # pages that one in, skipping shards the text cache will serve, so the
+    # read overlaps its own decompression instead of stalling the next task.
+    n_workers = effective_n_jobs(-1)
+    next_ranges = [
+        shards[todo[k + n_workers]]
+        if k + n_workers < len(todo)
+        and not (USE_TEXT_CACHE and text_cache_path(todo[k + n_workers]).exists())
+        else None
+        for k in range(len(todo))
+    ]
+
+    n_pages = sum(entry["pages"] for entry in done.values())
+    n_links = sum(entry["links"] for entry in done.values())
     results = Parallel(n_jobs=-1, return_as="generator_unordered", backend="loky")(
-        delayed(process_stream)(start, end) for start, end in offsets
+        delayed(process_shard)(shard_id, shards[shard_id], ahead, revisions)
+        for shard_id, ahead in zip(todo, next_ranges)
     )
-    for pages, links in tqdm(  # pyright: ignore[reportGeneralTypeIssues]
-        results, total=len(offsets), desc="Processing streams", unit=" streams"
-    ):
-        all_pages.extend(pages)
-        all_links.extend(links)
-
-    logger.info(f"Raw: {len(all_pages):,} pages, {len(all_links):,} links")
-
-    # Polars post-processing
-    logger.info("Loading pages and links into polars")
-    pages_df = pl.DataFrame(
-        all_pages,
-        schema=["title", "is_redirect", "redirect_target"],
-        orient="row",
-    )
-    links_df = pl.DataFrame(
-        all_links,
-        schema=["source", "target"],
-        orient="row",
+    with open(MANIFEST_PATH, "a") as manifest:
+        for shard_id, shard_pages, shard_links in tqdm(  # pyright: ignore[reportGeneralTypeIssues]
+            results, total=len(todo), desc="Processing shards", unit=" shards"
+        ):
+            entry = {
+                "shard": shard_id,
+                "start": shards[shard_id][0][0],
+                "pages": shard_pages,
+                "links": shard_links,
+            }
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+            n_pages += shard_pages
+            n_links += shard_links
+
+    pages_lf = pl.scan_parquet(
+        [shard_path("pages", shard_id) for shard_id in range(len(shards))]
     )
 
+    if n_carried is None:
+        n_carried = 0
+        if previous is not None:
+            # Exactly the articles the workers skipped: the revision id alone
+            # decides, and the previous title carries its links
+            unchanged_titles = (
+                previous_article_revisions(previous)
+                .join(
+                    pages_lf.filter(~pl.col("is_redirect")).select("revision"),
+                    on="revision",
+                    how="semi",
+                )
+                .select("title")
+                .collect()
+            )
+            logger.info(
+                f"Carrying over links of {len(unchanged_titles):,} unchanged articles"
+            )
+            n_carried = carry_links(previous, unchanged_titles)
+        with open(MANIFEST_PATH, "a") as manifest:
+            manifest.write(json.dumps({"carried": n_carried}) + "\n")
+
+    logger.info(f"Raw: {n_pages:,} pages, {n_links:,} links (excluding carried)")
+
     logger.info("Resolving redirects")
-    redirects_raw = dict(
-        pages_df.filter(pl.col("is_redirect"))
+    redirects = resolve_redirect_chains(
+        pages_lf.filter(pl.col("is_redirect"))
         .select(["title", "redirect_target"])
-        .iter_rows()
+        .collect()
+    )
+    logger.info(
+        f"Resolved {redirects['target'].count():,} of {len(redirects):,} redirects"
     )
-    redirects = resolve_redirect_chains(redirects_raw)
-    logger.info(f"Resolved {len(redirects):,} redirects")
 
     # Give compact node IDs in title-sorted order
     nodes_df = (
-        pages_df.filter(~pl.col("is_redirect"))
+        pages_lf.filter(~pl.col("is_redirect"))
         .select("title")
         .sort("title")
         .with_row_index("id")
         .with_columns(pl.col("id").cast(pl.UInt32))
+        .collect()
     )
     logger.info(f"Articles: {len(nodes_df):,}")
 
-    edges_df = (
-        links_df.with_columns(pl.col("target").replace(redirects).alias("target"))
-        .join(
-            nodes_df.rename({"title": "source", "id": "src"}), on="source", how="inner"
-        )
-        .join(
-            nodes_df.rename({"title": "target", "id": "dst"}), on="target", how="inner"
-        )
-        .select(["src", "dst"])
-        .filter(
-            pl.col("src") != pl.col("dst")
-        )  # drop self-loops from redirect collapse
-        .unique()
-    )
-    logger.info(f"Final edges: {len(edges_df):,}")
-
     # Redirect aliases for search indexing: map each redirect's (chain-resolved)
     # target title to its node id, keeping the redirect title as a searchable
     # alias. The inner join drops redirects whose target isn't a live node
@@ -254,15 +950,41 @@ if __name__ == "__main__":
     # article titles by construction, so an alias can never shadow a real node.
     logger.info("Mapping redirect aliases to node ids")
     redirect_aliases = (
-        pl.DataFrame(
-            {"alias": list(redirects.keys()), "target": list(redirects.values())},
-            schema={"alias": pl.Utf8, "target": pl.Utf8},
-        )
+        redirects.drop_nulls("target")
         .join(nodes_df.rename({"title": "target"}), on="target", how="inner")
         .select(["alias", "id"])
     )
     logger.info(f"Redirect aliases on live nodes: {len(redirect_aliases):,}")
 
+    # One title -> node id map with redirects already folded in, so each link
+    # endpoint is resolved by a single lookup and no string ever touches the
+    # link rows themselves.
+    title_map = pl.concat(
+        [nodes_df.select(["title", "id"]), redirect_aliases.rename({"alias": "title"})]
+    )
+
+    # Each shard resolves to packed (src << 32 | dst) keys; one sort-based
+    # unique over those u64s replaces a hash dedup over (src, dst) rows, and
+    # leaves the edges ordered by src then dst.
+    groups = [("", shard_id) for shard_id in range(len(shards))] + [
+        ("carried-", shard_id) for shard_id in range(n_carried)
+    ]
+    keys = np.concatenate(
+        [
+            resolve_shard_links(shard_id, title_map, prefix)
+            for prefix, shard_id in tqdm(groups, desc="Resolving links", unit=" shards")
+        ]
+    )
+    keys = np.unique(keys)
+    edges_df = pl.DataFrame(
+        {
+            "src": pl.Series((keys >> 32).astype(np.uint32)),
+            "dst": pl.Series((keys & MISSING_ID).astype(np.uint32)),
+        }
+    )
+    del keys
+    logger.info(f"Final edges: {len(edges_df):,}")
+
     logger.info("Writing parquets")
     nodes_df.write_parquet(NODES_OUTPUT_PATH, compression="zstd")
     edges_df.write_parquet(EDGES_OUTPUT_PATH, compression="zstd")
@@ -0,0 +1,76 @@
+"""Time the CPU ForceAtlas2 engine per iteration on synthetic graphs.
+
+Builds graphs of each size in NODES with communities of about COMMUNITY_SIZE,
+LINKS_PER_NODE links per node (a share of them to Zipf-distributed hubs
+anywhere) and positions already clustered by community, as a layout is after
+its first few hundred iterations. Times ITERATIONS iterations of the rough
+pass and of the prevent_overlapping pass, after one untimed iteration that
+compiles the kernels.
+
+    uv run python -m offline.graph.bench_force_atlas2
+"""
+
+import time
+
+import numba
+import numpy as np
+from loguru import logger
+
+from offline.graph.force_atlas2 import force_atlas2
+from offline.graph.louvain import undirected_csr
+
+NODES = (100_000, 400_000, 1_600_000)
+COMMUNITY_SIZE = 1_000
+LINKS_PER_NODE = 10
+HUB_SHARE = 0.2
+ITERATIONS = 10
+SEED = 0
+
+
+def synthetic_graph(
+    n: int,
+) -> tuple[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]:
+    """(undirected_csr graph, (n, 2) clustered positions) of `n` vertices."""
+    rng = np.random.default_rng(SEED)
+    communities = n // COMMUNITY_SIZE
+    community = rng.integers(communities, size=n)
+    members = np.argsort(community, kind="stable")
+    bounds = np.searchsorted(community[members], np.arange(communities + 1))
+
+    src = np.repeat(np.arange(n), LINKS_PER_NODE)
+    c = community[src]
+    local = bounds[c] + (rng.random(len(src)) * (bounds[c + 1] - bounds[c])).astype(
+        np.int64
+    )
+    dst = members[local]
+    hub = rng.random(len(src)) < HUB_SHARE
+    dst[hub] = np.minimum(rng.zipf(1.5, hub.sum()) - 1, n - 1)
+
+    center = rng.normal(0, np.sqrt(n), (communities, 2))
+    pos = center[community] + rng.normal(0, np.sqrt(COMMUNITY_SIZE), (n, 2))
+    return undirected_csr(src, dst), pos
+
+
+if __name__ == "__main__":
+    logger.info(f"ForceAtlas2 on {numba.get_num_threads()} threads")
+    for n in NODES:
+        (vertices, offsets, neighbors, weights), pos = synthetic_graph(n)
+        pos = pos[vertices]
+        radius = np.full(len(vertices), np.sqrt(COMMUNITY_SIZE) / 50)
+        logger.info(f"{len(vertices):,} vertices, {len(neighbors) // 2:,} edges")
+
+        for prevent_overlapping in (False, True):
+            kwargs = {
+                "pos": pos,
+                "scaling_ratio": 5.0,
+                "prevent_overlapping": prevent_overlapping,
+                "radius": radius,
+            }
+            force_atlas2(offsets, neighbors, weights, max_iter=1, **kwargs)
+            start = time.perf_counter()
+            force_atlas2(offsets, neighbors, weights, max_iter=ITERATIONS, **kwargs)
+            elapsed = (time.perf_counter() - start) / ITERATIONS
+            logger.info(
+                f"  prevent_overlapping={prevent_overlapping}: "
+                f"{elapsed:.2f}s per iteration"
+            )
@@ -0,0 +1,78 @@
+"""Time the CPU Louvain engine on synthetic graphs and, if present, the real one.
+
+Builds graphs of each size in NODES with planted communities of about
+COMMUNITY_SIZE and LINKS_PER_NODE links per node, a share of them to
+Zipf-distributed hubs anywhere, and times louvain() level by level. Then runs
+on the extracted edges when EDGES_INPUT_PATH exists, as compute_clusters does.
+
+    uv run python -m offline.graph.bench_louvain
+"""
+
+import os
+import time
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from offline.graph.louvain import louvain, undirected_csr
+from offline.process_graph import CLUSTERING_RESOLUTION, EDGES_INPUT_PATH
+
+NODES = (100_000, 400_000, 1_600_000)
+COMMUNITY_SIZE = 1_000
+LINKS_PER_NODE = 10
+HUB_SHARE = 0.2
+SEED = 0
+
+
+def synthetic_edges(n: int) -> tuple[np.ndarray, np.ndarray]:
+    """(src, dst) links of `n` vertices in planted communities."""
+    rng = np.random.default_rng(SEED)
+    communities = n // COMMUNITY_SIZE
+    community = rng.integers(communities, size=n)
+    members = np.argsort(community, kind="stable")
+    bounds = np.searchsorted(community[members], np.arange(communities + 1))
+
+    src = np.repeat(np.arange(n), LINKS_PER_NODE)
+    c = community[src]
+    local = bounds[c] + (rng.random(len(src)) * (bounds[c + 1] - bounds[c])).astype(
+        np.int64
+    )
+    dst = members[local]
+    hub = rng.random(len(src)) < HUB_SHARE
+    dst[hub] = np.minimum(rng.zipf(1.5, hub.sum()) - 1, n - 1)
+    return src, dst
+
+
+def bench(src: np.ndarray, dst: np.ndarray) -> None:
+    start = time.perf_counter()
+    graph = undirected_csr(src, dst)
+    build = time.perf_counter() - start
+    logger.info(
+        f"{len(graph[0]):,} vertices, {len(graph[2]) // 2:,} edges "
+        f"(CSR built in {build:.1f}s)"
+    )
+
+    trace: list[dict] = []
+    start = time.perf_counter()
+    _, partition, q = louvain(graph, resolution=CLUSTERING_RESOLUTION, trace=trace)
+    elapsed = time.perf_counter() - start
+    for record in trace:
+        logger.info(
+            f"  level {record['level']}: {record['vertices']:,} vertices -> "
+            f"{record['communities']:,} communities, Q = {record['modularity']:.4f}"
+        )
+    logger.info(
+        f"  {elapsed:.1f}s, {len(np.unique(partition)):,} communities, Q = {q:.4f}"
+    )
+
+
+if __name__ == "__main__":
+    logger.info(f"Louvain on {os.cpu_count()} cores")
+    for n in NODES:
+        bench(*synthetic_edges(n))
+
+    if EDGES_INPUT_PATH.exists():
+        logger.info(f"Extracted edges from {EDGES_INPUT_PATH}")
+        edges = pl.read_parquet(EDGES_INPUT_PATH, columns=["src", "dst"])
+        bench(edges["src"].to_numpy(), edges["dst"].to_numpy())
@@ -0,0 +1,70 @@
+"""Benchmark the CPU PageRank engine against cuGraph for accuracy and time.
+
+Runs both backends on the extracted edges when a GPU is available. Without
+one, compares against the cuGraph output already in PAGERANK_PATH.
+
+    uv run python -m offline.graph.bench_pagerank
+"""
+
+import time
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from offline.process_graph import (
+    EDGES_INPUT_PATH,
+    PAGERANK_PATH,
+    pagerank_cpu,
+    pagerank_cugraph,
+)
+
+TOP_K = 10_000
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    logger.info(f"Benchmarking PageRank on {EDGES_INPUT_PATH}")
+
+    cpu, cpu_time = timed(pagerank_cpu)
+    logger.info(f"CPU: {cpu_time:.1f}s for {len(cpu):,} vertices")
+
+    try:
+        reference, gpu_time = timed(pagerank_cugraph)
+        logger.info(f"cuGraph: {gpu_time:.1f}s for {len(reference):,} vertices")
+    except ImportError:
+        logger.info(f"cuGraph unavailable, comparing against {PAGERANK_PATH}")
+        reference = pl.read_parquet(PAGERANK_PATH)
+
+    joined = cpu.join(
+        reference.select(pl.col("id").cast(pl.UInt32), "pagerank"),
+        on="id",
+        how="full",
+        suffix="_ref",
+    )
+    n_unmatched = joined.filter(
+        pl.col("pagerank").is_null() | pl.col("pagerank_ref").is_null()
+    ).height
+    if n_unmatched:
+        logger.warning(f"{n_unmatched:,} vertices are ranked by only one backend")
+
+    joined = joined.drop_nulls()
+    cpu_ranks = joined["pagerank"].to_numpy().astype(np.float64)
+    ref_ranks = joined["pagerank_ref"].to_numpy().astype(np.float64)
+    rel = np.abs(cpu_ranks - ref_ranks) / ref_ranks
+
+    k = min(TOP_K, len(joined))
+    top_cpu = set(cpu.top_k(k, by="pagerank")["id"].to_list())
+    top_ref = set(reference.top_k(k, by="pagerank")["id"].to_list())
+
+    logger.info(f"L1 difference: {np.abs(cpu_ranks - ref_ranks).sum():.2e}")
+    logger.info(
+        f"Relative difference: median {np.median(rel):.2e}, "
+        f"p99 {np.quantile(rel, 0.99):.2e}, max {rel.max():.2e}"
+    )
+    logger.info(f"Top {k:,} overlap: {len(top_cpu & top_ref) / k:.2%}")
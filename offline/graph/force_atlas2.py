@@ -0,0 +1,559 @@
+"""CPU ForceAtlas2 with a Barnes–Hut quadtree, a drop-in for cugraph.force_atlas2.
+
+Follows Gephi's ForceAtlas2, as cuGraph does. The forces are:
+- repulsion kr·m_i·m_j / d between every pair (m = degree + 1),
+- attraction along each edge, linear in d or log(1 + d) with LinLog,
+- gravity towards the origin,
+- and Gephi's adaptive global and per-node speeds.
+
+prevent_overlapping is Gephi's adjustSizes. With g = d - r_i - r_j the gap
+between two circles, the pair repels with kr·m_i·m_j·d / g² while apart and
+with overlap_scaling_ratio·kr·m_i·m_j·d while they overlap (Gephi hardcodes
+100). An edge attracts only while its ends are apart, with g in place of d
+under LinLog, and no step moves a node more than 10 units. As in Gephi, tree
+cells far enough to act through their center of mass ignore the radii.
+
+Repulsion uses a Barnes–Hut quadtree. Bodies are sorted by Morton code, so
+every tree node is a contiguous run of bodies; each level's nodes are the runs
+of equal code prefixes within the last level's. The bodies of each leaf walk
+the tree together on one stack: a node far enough from all of them (width <
+theta·distance to their bounding box) acts through its center of mass, a near
+leaf is summed body by body, and any other near node opens into its children.
+The tree build, the walks and the attraction are compiled with numba (the cpu
+extra) and run in parallel over nodes, leaves and CSR rows.
+"""
+
+import numba
+import numpy as np
+from loguru import logger
+
+# Bodies per tree leaf; a near leaf's bodies are summed exactly.
+LEAF_SIZE = 16
+# Levels of the Morton grid; coincident bodies share the deepest leaf.
+MAX_DEPTH = 21
+# A walk opens one node at a time and pushes at most 4 children, so its stack
+# never holds more than 3 per opened level plus the last 4.
+STACK_SIZE = 3 * MAX_DEPTH + 4
+
+# Gephi's speed constants
+MIN_SPEED_EFFICIENCY = 0.05
+MAX_RISE = 0.5
+MAX_SPEED = 1000.0
+# Longest step of a node with prevent_overlapping (Gephi's adjustSizes)
+MAX_STEP = 10.0
+
+# Guards divisions by the distance of (nearly) coincident bodies
+EPSILON = 1e-9
+
+
+@numba.njit(parallel=True, cache=True)
+def morton_codes(x: np.ndarray, y: np.ndarray, depth: int) -> np.ndarray:
+    """Interleave the bits of x, y quantized to a square 2^depth grid over them."""
+    x0 = x.min()
+    y0 = y.min()
+    extent = max(x.max() - x0, y.max() - y0, EPSILON)
+    scale = (2**depth - 1) / extent
+
+    codes = np.empty(len(x), dtype=np.uint64)
+    for i in numba.prange(len(x)):
+        code = np.uint64(0)
+        for axis in range(2):
+            coord = x[i] - x0 if axis == 0 else y[i] - y0
+            v = np.uint64(coord * scale)
+            # Spread the low 32 bits apart so the two axes interleave
+            v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+            v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+            v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+            v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+            v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+            code |= v << np.uint64(axis)
+        codes[i] = code
+    return codes
+
+
+@numba.njit(cache=True)
+def split_nodes(
+    codes: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    split: np.ndarray,
+    shift: np.uint64,
+) -> tuple[np.ndarray, ...]:
+    """Children of the nodes flagged in `split`: runs of equal codes >> shift.
+
+    Returns (child_start, child_end, first, last); node k's children are
+    first[k]:last[k], an empty range for nodes not split.
+    """
+    first = np.zeros(len(start), dtype=np.int64)
+    last = np.zeros(len(start), dtype=np.int64)
+    count = 0
+    for k in range(len(start)):
+        if not split[k]:
+            continue
+        first[k] = count
+        count += 1
+        for s in range(start[k] + 1, end[k]):
+            if codes[s] >> shift != codes[s - 1] >> shift:
+                count += 1
+        last[k] = count
+
+    child_start = np.empty(count, dtype=np.int64)
+    child_end = np.empty(count, dtype=np.int64)
+    for k in range(len(start)):
+        c = first[k]
+        if c == last[k]:
+            continue
+        child_start[c] = start[k]
+        for s in range(start[k] + 1, end[k]):
+            if codes[s] >> shift != codes[s - 1] >> shift:
+                child_end[c] = s
+                c += 1
+                child_start[c] = s
+        child_end[c] = end[k]
+    return child_start, child_end, first, last
+
+
+@numba.njit(parallel=True, cache=True)
+def centers_of_mass(
+    level_bounds: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    first_child: np.ndarray,
+    last_child: np.ndarray,
+    leaf: np.ndarray,
+    m: np.ndarray,
+    mx: np.ndarray,
+    my: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Mass and center of mass of every node, from the deepest level up.
+
+    Leaves sum their (sorted) bodies' m, m·x and m·y; other nodes their
+    children's.
+    """
+    n_nodes = len(start)
+    node_mass = np.empty(n_nodes)
+    com_x = np.empty(n_nodes)
+    com_y = np.empty(n_nodes)
+    for level in range(len(level_bounds) - 2, -1, -1):
+        for k in numba.prange(level_bounds[level], level_bounds[level + 1]):
+            total = 0.0
+            sx = 0.0
+            sy = 0.0
+            if leaf[k]:
+                for s in range(start[k], end[k]):
+                    total += m[s]
+                    sx += mx[s]
+                    sy += my[s]
+            else:
+                for c in range(first_child[k], last_child[k]):
+                    total += node_mass[c]
+                    sx += node_mass[c] * com_x[c]
+                    sy += node_mass[c] * com_y[c]
+            node_mass[k] = total
+            com_x[k] = sx / total
+            com_y[k] = sy / total
+    return node_mass, com_x, com_y
+
+
+def build_quadtree(
+    x: np.ndarray, y: np.ndarray, mass: np.ndarray, order: np.ndarray
+) -> tuple[np.ndarray, ...]:
+    """Build a quadtree over the bodies, stored as flat per-node arrays.
+
+    `order` is any permutation of the bodies; passing the last iteration's,
+    whose codes are still nearly sorted, makes the sort cheap.
+
+    Returns (order, start, end, node_mass, com_x, com_y, width, first_child,
+    last_child, leaf): `order` sorts the bodies by Morton code and every node
+    holds the sorted bodies start:end. Nodes are numbered level by level from
+    the root, and a node's children are nodes first_child:last_child.
+    """
+    extent = max(np.ptp(x), np.ptp(y), EPSILON)
+    codes = morton_codes(x, y, MAX_DEPTH)
+    order = order[np.argsort(codes[order], kind="stable")]
+    codes = codes[order]
+    m = mass[order]
+
+    start = [np.zeros(1, dtype=np.int64)]
+    end = [np.full(1, len(codes), dtype=np.int64)]
+    width = [np.full(1, extent)]
+    first_child = []
+    last_child = []
+    offset = 1
+    for level in range(MAX_DEPTH + 1):
+        split = end[-1] - start[-1] > LEAF_SIZE
+        if level == MAX_DEPTH or not split.any():
+            first_child.append(np.zeros(len(split), dtype=np.int64))
+            last_child.append(np.zeros(len(split), dtype=np.int64))
+            break
+        shift = np.uint64(2 * (MAX_DEPTH - level - 1))
+        child_start, child_end, first, last = split_nodes(
+            codes, start[-1], end[-1], split, shift
+        )
+        first_child.append(offset + first)
+        last_child.append(offset + last)
+        offset += len(child_start)
+        start.append(child_start)
+        end.append(child_end)
+        width.append(np.full(len(child_start), extent / 2 ** (level + 1)))
+
+    level_bounds = np.cumsum([0] + [len(s) for s in start])
+    start, end, width, first_child, last_child = (
+        np.concatenate(arrays)
+        for arrays in (start, end, width, first_child, last_child)
+    )
+    leaf = first_child == last_child
+    node_mass, com_x, com_y = centers_of_mass(
+        level_bounds,
+        start,
+        end,
+        first_child,
+        last_child,
+        leaf,
+        m,
+        m * x[order],
+        m * y[order],
+    )
+    return (
+        order,
+        start,
+        end,
+        node_mass,
+        com_x,
+        com_y,
+        width,
+        first_child,
+        last_child,
+        leaf,
+    )
+
+
+@numba.njit(parallel=True, cache=True)
+def repulsion(
+    x: np.ndarray,
+    y: np.ndarray,
+    mass: np.ndarray,
+    radius: np.ndarray,
+    adjust_sizes: bool,
+    kr: float,
+    kr_overlap: float,
+    theta: float,
+    start: np.ndarray,
+    end: np.ndarray,
+    node_mass: np.ndarray,
+    com_x: np.ndarray,
+    com_y: np.ndarray,
+    width: np.ndarray,
+    first_child: np.ndarray,
+    last_child: np.ndarray,
+    leaf: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Repulsion on every body, walking the quadtree once per leaf.
+
+    The bodies are given in Morton order (x[s] is sorted body s), and
+    `radius` is only read with adjust_sizes. A leaf's bodies share one walk:
+    a node is far from all of them once it is far from their bounding box.
+    Returns the (fx, fy) forces, also in Morton order.
+    """
+    fx = np.zeros(len(x))
+    fy = np.zeros(len(x))
+    theta2 = theta * theta
+    leaves = np.flatnonzero(leaf)
+    for k in numba.prange(len(leaves)):
+        a = start[leaves[k]]
+        b = end[leaves[k]]
+        x_min = x[a:b].min()
+        x_max = x[a:b].max()
+        y_min = y[a:b].min()
+        y_max = y[a:b].max()
+        stack = np.empty(STACK_SIZE, dtype=np.int64)
+        stack[0] = 0
+        top = 1
+        while top > 0:
+            top -= 1
+            node = stack[top]
+            cx = com_x[node]
+            cy = com_y[node]
+            gx = max(x_min - cx, 0.0, cx - x_max)
+            gy = max(y_min - cy, 0.0, cy - y_max)
+            if width[node] * width[node] < theta2 * (gx * gx + gy * gy):
+                # Far nodes act through their center of mass
+                for i in range(a, b):
+                    dx = x[i] - cx
+                    dy = y[i] - cy
+                    f = kr * mass[i] * node_mass[node] / (dx * dx + dy * dy)
+                    fx[i] += f * dx
+                    fy[i] += f * dy
+            elif leaf[node]:
+                # Near leaves are summed body by body. A body's pair with
+                # itself has dx = dy = 0, so it adds nothing.
+                for i in range(a, b):
+                    sx = 0.0
+                    sy = 0.0
+                    if adjust_sizes:
+                        for j in range(start[node], end[node]):
+                            dx = x[i] - x[j]
+                            dy = y[i] - y[j]
+                            gap = np.sqrt(dx * dx + dy * dy) - radius[i] - radius[j]
+                            if gap > 0:
+                                f = kr * mass[j] / (gap * gap)
+                            elif gap < 0:
+                                f = kr_overlap * mass[j]
+                            else:
+                                f = 0.0
+                            sx += f * dx
+                            sy += f * dy
+                    else:
+                        for j in range(start[node], end[node]):
+                            dx = x[i] - x[j]
+                            dy = y[i] - y[j]
+                            f = kr * mass[j] / max(dx * dx + dy * dy, EPSILON)
+                            sx += f * dx
+                            sy += f * dy
+                    fx[i] += mass[i] * sx
+                    fy[i] += mass[i] * sy
+            else:
+                # Other near nodes open up into their children
+                for child in range(first_child[node], last_child[node]):
+                    stack[top] = child
+                    top += 1
+    return fx, fy
+
+
+@numba.njit(parallel=True, cache=True)
+def add_attraction(
+    fx: np.ndarray,
+    fy: np.ndarray,
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    weights: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    coefficient: np.ndarray,
+    radius: np.ndarray,
+    adjust_sizes: bool,
+    lin_log_mode: bool,
+) -> None:
+    """Add the edge attraction on each row of the symmetric CSR to fx, fy."""
+    for row in numba.prange(len(offsets) - 1):
+        ax = 0.0
+        ay = 0.0
+        for e in range(offsets[row], offsets[row + 1]):
+            col = neighbors[e]
+            # As in cuGraph, each stored edge pulls both of its ends with the
+            # source's coefficient, so a row gets its own and each neighbor's
+            w = weights[e] * (coefficient[row] + coefficient[col])
+            dx = x[row] - x[col]
+            dy = y[row] - y[col]
+            if adjust_sizes:
+                gap = np.sqrt(dx * dx + dy * dy) - radius[row] - radius[col]
+                if gap <= 0:
+                    continue
+                if lin_log_mode:
+                    w *= np.log1p(gap) / gap
+            elif lin_log_mode:
+                d = max(np.sqrt(dx * dx + dy * dy), EPSILON)
+                w *= np.log1p(d) / d
+            ax -= w * dx
+            ay -= w * dy
+        fx[row] += ax
+        fy[row] += ay
+
+
+def forces(
+    x: np.ndarray,
+    y: np.ndarray,
+    order: np.ndarray,
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    weights: np.ndarray,
+    mass: np.ndarray,
+    coefficient: np.ndarray,
+    radius: np.ndarray | None,
+    kr: float,
+    kr_overlap: float,
+    theta: float,
+    lin_log_mode: bool,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Repulsion plus attraction on every body, without gravity.
+
+    `order` is the last Morton order (see build_quadtree). Returns (fx, fy,
+    order).
+    """
+    adjust_sizes = radius is not None
+    if radius is None:
+        radius = np.zeros(0)
+    order, *tree = build_quadtree(x, y, mass, order)
+    sorted_fx, sorted_fy = repulsion(
+        x[order],
+        y[order],
+        mass[order],
+        radius[order] if adjust_sizes else radius,
+        adjust_sizes,
+        kr,
+        kr_overlap,
+        theta,
+        *tree,
+    )
+    fx = np.empty(len(x))
+    fy = np.empty(len(x))
+    fx[order] = sorted_fx
+    fy[order] = sorted_fy
+    add_attraction(
+        fx,
+        fy,
+        offsets,
+        neighbors,
+        weights,
+        x,
+        y,
+        coefficient,
+        radius,
+        adjust_sizes,
+        lin_log_mode,
+    )
+    return fx, fy, order
+
+
+def force_atlas2(
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    weights: np.ndarray,
+    max_iter: int = 500,
+    pos: np.ndarray | None = None,
+    scaling_ratio: float = 2.0,
+    gravity: float = 1.0,
+    strong_gravity_mode: bool = False,
+    lin_log_mode: bool = False,
+    edge_weight_influence: float = 1.0,
+    jitter_tolerance: float = 1.0,
+    barnes_hut_optimize: bool = True,
+    barnes_hut_theta: float = 0.5,
+    outbound_attraction_distribution: bool = True,
+    prevent_overlapping: bool = False,
+    radius: np.ndarray | None = None,
+    overlap_scaling_ratio: float = 100.0,
+    verbose: bool = False,
+    seed: int = 0,
+    state: dict | None = None,
+) -> np.ndarray:
+    """Lay out the undirected graph given as a symmetric CSR.
+
+    Parameters mirror cugraph.force_atlas2: `pos` is the (n, 2) warm start
+    (pos_list) and `radius` the per-vertex radius (vertex_radius) used with
+    prevent_overlapping. Without `pos` the vertices start uniformly at random.
+    Without barnes_hut_optimize every pair is summed exactly.
+
+    A run split over several calls restarts Gephi's adaptive speed each time,
+    as cuGraph's does, unless the calls share a `state` dict: the speed, speed
+    efficiency, last forces and Morton order are read from it when present and
+    written back, so the calls move the nodes as one longer run would.
+
+    Returns the (n, 2) float64 positions.
+    """
+    n = len(offsets) - 1
+    if pos is None:
+        pos = (np.random.default_rng(seed).random((n, 2)) - 0.5) * np.sqrt(n) * 10
+    x = np.array(pos[:, 0], dtype=np.float64)
+    y = np.array(pos[:, 1], dtype=np.float64)
+    if not prevent_overlapping:
+        radius = None
+    elif radius is None:
+        raise ValueError("prevent_overlapping needs a radius per vertex")
+    else:
+        radius = np.asarray(radius, dtype=np.float64)
+
+    degree = np.diff(offsets)
+    mass = degree + 1.0
+    weights = np.asarray(weights, dtype=np.float64) ** edge_weight_influence
+    if outbound_attraction_distribution:
+        coefficient = mass.mean() / mass
+    else:
+        coefficient = np.ones(n)
+    kr = scaling_ratio
+    kr_overlap = scaling_ratio * overlap_scaling_ratio
+    theta = barnes_hut_theta if barnes_hut_optimize else 0.0
+
+    if state is None:
+        state = {}
+    speed = state.get("speed", 1.0)
+    speed_efficiency = state.get("speed_efficiency", 1.0)
+    old_fx = state.get("fx", np.zeros(n))
+    old_fy = state.get("fy", np.zeros(n))
+    order = state.get("order", np.arange(n))
+
+    for iteration in range(max_iter):
+        fx, fy, order = forces(
+            x,
+            y,
+            order,
+            offsets,
+            neighbors,
+            weights,
+            mass,
+            coefficient,
+            radius,
+            kr,
+            kr_overlap,
+            theta,
+            lin_log_mode,
+        )
+
+        if strong_gravity_mode:
+            fx -= gravity * mass * x
+            fy -= gravity * mass * y
+        else:
+            d = np.maximum(np.sqrt(x * x + y * y), EPSILON)
+            fx -= gravity * mass * x / d
+            fy -= gravity * mass * y / d
+
+        # Gephi's adaptive speed: slow down nodes (and the whole layout)
+        # whose force keeps changing direction
+        swinging = mass * np.sqrt((old_fx - fx) ** 2 + (old_fy - fy) ** 2)
+        traction = mass * np.sqrt((old_fx + fx) ** 2 + (old_fy + fy) ** 2) / 2
+        total_swinging = swinging.sum()
+        total_traction = traction.sum()
+
+        estimated_jitter = 0.05 * np.sqrt(n)
+        jitter = jitter_tolerance * max(
+            np.sqrt(estimated_jitter),
+            min(10.0, estimated_jitter * total_traction / n**2),
+        )
+        if total_traction > 0 and total_swinging / total_traction > 2.0:
+            if speed_efficiency > MIN_SPEED_EFFICIENCY:
+                speed_efficiency *= 0.5
+            jitter = max(jitter, jitter_tolerance)
+        target_speed = (
+            jitter * speed_efficiency * total_traction / total_swinging
+            if total_swinging > 0
+            else speed
+        )
+        if total_swinging > jitter * total_traction:
+            if speed_efficiency > MIN_SPEED_EFFICIENCY:
+                speed_efficiency *= 0.7
+        elif speed < MAX_SPEED:
+            speed_efficiency *= 1.3
+        speed += min(target_speed - speed, MAX_RISE * speed)
+
+        factor = speed / (1 + np.sqrt(speed * swinging))
+        if radius is not None:
+            df = np.maximum(np.sqrt(fx * fx + fy * fy), EPSILON)
+            factor = np.minimum(0.1 * factor * df, MAX_STEP) / df
+        x += fx * factor
+        y += fy * factor
+        old_fx, old_fy = fx, fy
+
+        if verbose and (iteration + 1) % 100 == 0:
+            logger.info(
+                f"ForceAtlas2 iteration {iteration + 1}/{max_iter}: "
+                f"speed {speed:.3g}, swinging {total_swinging:.3g}"
+            )
+
+    state.update(
+        speed=speed,
+        speed_efficiency=speed_efficiency,
+        fx=old_fx,
+        fy=old_fy,
+        order=order,
+    )
+    return np.column_stack([x, y])
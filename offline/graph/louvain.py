@@ -0,0 +1,350 @@
+"""CPU Louvain community detection, a fallback for cugraph.leiden.
+
+Runs on the undirected edge set (each linked pair once, weight 1) in CSR form
+and maximizes modularity with resolution γ:
+
+    Q = 1/2m · Σ_ij [A_ij - γ·k_i·k_j / 2m] · δ(c_i, c_j)
+
+Each level alternates vectorized local-moving passes with aggregation:
+- A pass scores (vertex, neighboring community) pairs in bulk by the
+  modularity gain of moving the vertex there, and moves every vertex whose
+  best gain beats staying put. Moving all vertices at once makes neighbors
+  swap communities back and forth, so a pass visits a random 1/SUBSETS of the
+  vertices at a time; each subset's rows are cut into blocks of about equal
+  edge count and scored on a thread pool.
+- Once a pass gains less than LOCAL_MOVING_TOL in modularity, each community
+  is collapsed into one vertex (internal edges become a self-loop) and the
+  next level runs on that smaller graph.
+Stops at the first level that merges nothing.
+
+Like cuGraph, only vertices that appear in an edge are assigned a partition.
+"""
+
+import os
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from offline.build_graph_csr import build_csr
+from offline.graph.pagerank import CHUNKS_PER_CORE, split_rows
+
+LOCAL_MOVING_TOL = 1e-6
+MAX_PASSES = 64
+MAX_LEVELS = 32
+
+# Each pass moves a random 1/SUBSETS of the vertices at a time, so neighbors
+# rarely move at once and each subset sees where the previous one went.
+SUBSETS = 8
+
+
+def undirected_csr(
+    src: np.ndarray, dst: np.ndarray, weights: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Compact the linked vertices and build the symmetric CSR of their edge set.
+
+    Each unordered pair linked in either direction becomes one edge, stored in
+    both rows, of weight 1 or, given `weights`, the sum of its links' weights;
+    self-loops are dropped. Returns (vertices, offsets, neighbors, weights),
+    with `vertices` the original id of each compact vertex.
+    """
+    n = int(max(src.max(), dst.max())) + 1
+    present = np.zeros(n, dtype=bool)
+    present[src] = True
+    present[dst] = True
+    vertices = np.flatnonzero(present)
+
+    compact = np.zeros(n, dtype=np.int64)
+    compact[vertices] = np.arange(len(vertices))
+    lo = compact[np.minimum(src, dst)]
+    hi = compact[np.maximum(src, dst)]
+    pairs, inverse = np.unique((lo << 32) | hi, return_inverse=True)
+    keep = (pairs >> 32) != (pairs & 0xFFFFFFFF)
+    lo, hi = pairs[keep] >> 32, pairs[keep] & 0xFFFFFFFF
+
+    keys = np.concatenate([lo, hi])
+    vals = np.concatenate([hi, lo])
+    offsets, neighbors = build_csr(keys, vals, len(vertices))
+    if weights is None:
+        edge_weights = np.ones(len(neighbors))
+    else:
+        # Summed per pair, then put in build_csr's (row, neighbor) order
+        pair_weights = np.bincount(inverse, weights=weights, minlength=len(pairs))
+        pair_weights = pair_weights[keep]
+        edge_weights = np.concatenate([pair_weights, pair_weights])[
+            np.lexsort((vals, keys))
+        ]
+    return (
+        vertices,
+        offsets.astype(np.int64),
+        neighbors.astype(np.int64),
+        edge_weights,
+    )
+
+
+def select_rows(
+    offsets: np.ndarray, neighbors: np.ndarray, weights: np.ndarray, rows: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The CSR (offsets, neighbors, weights) of just `rows`, in that order."""
+    counts = np.diff(offsets)[rows]
+    sub_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    sub_offsets[1:] = np.cumsum(counts)
+    edges = np.repeat(offsets[rows] - sub_offsets[:-1], counts) + np.arange(
+        sub_offsets[-1]
+    )
+    return sub_offsets, neighbors[edges], weights[edges]
+
+
+def best_moves(
+    block: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    community: np.ndarray,
+    degree: np.ndarray,
+    community_degree: np.ndarray,
+    resolution: float,
+    two_m: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Find the vertices of one block of rows that gain by moving, and where to.
+
+    `block` is (rows, offsets, neighbors, weights): vertex ids and their CSR.
+    Returns (movers, targets).
+    """
+    rows, offsets, neighbors, weights = block
+    n_communities = len(community_degree)
+    local = np.repeat(np.arange(len(rows)), np.diff(offsets))
+    not_loop = neighbors != rows[local]
+
+    # Weight from each row to each neighboring community, summed over one sort
+    # of (row, community) keys
+    keys = local[not_loop] * n_communities + community[neighbors[not_loop]]
+    if len(keys) == 0:
+        # Only self-loops, e.g. components already collapsed to one vertex
+        return rows[:0], rows[:0]
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    to_community = np.add.reduceat(weights[not_loop][order], starts)
+    pair_local = keys[starts] // n_communities
+    pair_community = keys[starts] % n_communities
+
+    # Gain of joining each community once the row has left its own
+    pair_row = rows[pair_local]
+    own = community[pair_row]
+    pair_degree = degree[pair_row]
+    others_degree = community_degree[pair_community] - np.where(
+        pair_community == own, pair_degree, 0
+    )
+    gain = to_community - resolution * pair_degree * others_degree / two_m
+
+    stay = (
+        -resolution
+        * degree[rows]
+        * (community_degree[community[rows]] - degree[rows])
+        / two_m
+    )
+    is_own = pair_community == own
+    stay[pair_local[is_own]] = gain[is_own]
+
+    row_starts = np.flatnonzero(np.r_[True, pair_local[1:] != pair_local[:-1]])
+    best_gain = np.maximum.reduceat(gain, row_starts)
+    is_best = gain == np.repeat(best_gain, np.diff(np.r_[row_starts, len(gain)]))
+
+    # Ties go to the lowest community id, the first in each row's run
+    best = np.flatnonzero(is_best)
+    best = best[np.r_[True, pair_local[best][1:] != pair_local[best][:-1]]]
+    moves = (gain[best] > stay[pair_local[best]]) & ~is_own[best]
+    return pair_row[best][moves], pair_community[best][moves]
+
+
+def internal_weight(
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    weights: np.ndarray,
+    rows: tuple[int, int],
+    community: np.ndarray,
+) -> float:
+    """Total weight of one row range's edges that stay inside a community."""
+    a, b = rows
+    row = np.repeat(np.arange(a, b), np.diff(offsets[a : b + 1]))
+    inside = community[row] == community[neighbors[offsets[a] : offsets[b]]]
+    return float(weights[offsets[a] : offsets[b]][inside].sum())
+
+
+def modularity(
+    parallel: Parallel,
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    weights: np.ndarray,
+    community: np.ndarray,
+    community_degree: np.ndarray,
+    resolution: float,
+    two_m: float,
+) -> float:
+    internal = sum(
+        parallel(
+            delayed(internal_weight)(offsets, neighbors, weights, rows, community)
+            for rows in split_rows(offsets, (os.cpu_count() or 1) * CHUNKS_PER_CORE)
+        )
+    )
+    return (internal - resolution * (community_degree**2).sum() / two_m) / two_m
+
+
+def local_moving(
+    parallel: Parallel,
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    weights: np.ndarray,
+    resolution: float,
+    seed: int,
+) -> tuple[np.ndarray, float]:
+    """Move vertices between communities until modularity stops improving.
+
+    Starts from singletons. A pass that lowers modularity is undone and ends
+    the phase. Returns (community per vertex, modularity).
+    """
+    n = len(offsets) - 1
+    degree = np.bincount(
+        np.repeat(np.arange(n), np.diff(offsets)), weights=weights, minlength=n
+    )
+    two_m = float(degree.sum())
+
+    # Each subset's rows as a CSR of their own, cut into blocks for the threads
+    subset = np.random.default_rng(seed).integers(SUBSETS, size=n)
+    subsets = []
+    for rows in np.split(
+        np.argsort(subset, kind="stable"),
+        np.cumsum(np.bincount(subset, minlength=SUBSETS))[:-1],
+    ):
+        sub_offsets, sub_neighbors, sub_weights = select_rows(
+            offsets, neighbors, weights, rows
+        )
+        subsets.append(
+            [
+                (
+                    rows[a:b],
+                    sub_offsets[a : b + 1] - sub_offsets[a],
+                    sub_neighbors[sub_offsets[a] : sub_offsets[b]],
+                    sub_weights[sub_offsets[a] : sub_offsets[b]],
+                )
+                for a, b in split_rows(
+                    sub_offsets, (os.cpu_count() or 1) * CHUNKS_PER_CORE
+                )
+            ]
+        )
+
+    community = np.arange(n)
+    community_degree = degree.copy()
+    q = modularity(
+        parallel,
+        offsets,
+        neighbors,
+        weights,
+        community,
+        community_degree,
+        resolution,
+        two_m,
+    )
+    for _ in range(MAX_PASSES):
+        before = community.copy()
+        n_moved = 0
+        for blocks in subsets:
+            if not blocks:
+                continue
+            moves = parallel(
+                delayed(best_moves)(
+                    block, community, degree, community_degree, resolution, two_m
+                )
+                for block in blocks
+            )
+            movers = np.concatenate([m for m, _ in moves])
+            targets = np.concatenate([t for _, t in moves])
+            community_degree -= np.bincount(
+                community[movers], weights=degree[movers], minlength=n
+            )
+            community_degree += np.bincount(
+                targets, weights=degree[movers], minlength=n
+            )
+            community[movers] = targets
+            n_moved += len(movers)
+
+        q_pass = modularity(
+            parallel,
+            offsets,
+            neighbors,
+            weights,
+            community,
+            community_degree,
+            resolution,
+            two_m,
+        )
+        if q_pass < q:
+            # Simultaneous moves within a subset can cost more than they gain
+            return before, q
+        if n_moved == 0 or q_pass - q < LOCAL_MOVING_TOL:
+            return community, q_pass
+        q = q_pass
+
+    return community, q
+
+
+def aggregate(
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    weights: np.ndarray,
+    community: np.ndarray,
+    n_communities: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Collapse each community into one vertex, summing the edge weights.
+
+    Edges inside a community become its self-loop. Returns the CSR (offsets,
+    neighbors, weights) of the community graph.
+    """
+    row = np.repeat(community, np.diff(offsets))
+    keys = row * n_communities + community[neighbors]
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    new_weights = np.add.reduceat(weights[order], starts)
+    new_rows = keys[starts] // n_communities
+    new_offsets = np.zeros(n_communities + 1, dtype=np.int64)
+    new_offsets[1:] = np.cumsum(np.bincount(new_rows, minlength=n_communities))
+    return new_offsets, keys[starts] % n_communities, new_weights
+
+
+def louvain(
+    graph: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    resolution: float = 1.0,
+    trace: list[dict] | None = None,
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """Louvain communities of an undirected graph, given as undirected_csr's arrays.
+
+    Appends a record per level to `trace` when given. Returns (vertices,
+    partition, modularity): the partitioned vertex ids ascending, their
+    community ids (dense, from 0) and the final modularity.
+    """
+    vertices, offsets, neighbors, weights = graph
+    partition = np.arange(len(vertices))
+    q = 0.0
+
+    with Parallel(n_jobs=-1, prefer="threads") as parallel:
+        for level in range(MAX_LEVELS):
+            community, q = local_moving(
+                parallel, offsets, neighbors, weights, resolution, seed=level
+            )
+            ids, community = np.unique(community, return_inverse=True)
+            if trace is not None:
+                trace.append(
+                    {
+                        "level": level,
+                        "vertices": len(offsets) - 1,
+                        "communities": len(ids),
+                        "modularity": q,
+                    }
+                )
+            if len(ids) == len(offsets) - 1:
+                break
+
+            partition = community[partition]
+            offsets, neighbors, weights = aggregate(
+                offsets, neighbors, weights, community, len(ids)
+            )
+
+    return vertices, partition, q
@@ -0,0 +1,243 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+
+from offline.graph.force_atlas2 import (  # noqa: E402
+    LEAF_SIZE,
+    build_quadtree,
+    force_atlas2,
+    forces,
+)
+from offline.graph.louvain import undirected_csr  # noqa: E402
+
+KR = 2.0
+KR_OVERLAP = KR * 100.0
+
+
+def clustered_bodies(n: int, seed: int = 0) -> tuple[np.ndarray, ...]:
+    """(x, y, mass, radius) of bodies in a few Gaussian clumps around the origin.
+
+    One clump is packed tightly enough that its circles overlap, and a few
+    bodies sit exactly on top of each other.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 200, (8, 2))
+    spread = np.r_[0.5, np.full(7, 20.0)]
+    clump = rng.integers(8, size=n)
+    xy = centers[clump] + rng.normal(0, 1, (n, 2)) * spread[clump, None]
+    xy[1:4] = xy[0]
+    mass = rng.integers(1, 30, n).astype(np.float64)
+    radius = rng.uniform(0.1, 1.5, n)
+    return xy[:, 0].copy(), xy[:, 1].copy(), mass, radius
+
+
+def pairwise_repulsion(
+    x: np.ndarray, y: np.ndarray, mass: np.ndarray, radius: np.ndarray | None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Repulsion summed over every pair: Gephi's linRepulsion, or its
+    anti-collision variant given radii."""
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+    d2 = dx * dx + dy * dy
+    mm = mass[:, None] * mass[None, :]
+    apart = d2 > 0
+    if radius is None:
+        f = np.where(apart, KR * mm / np.where(apart, d2, 1), 0.0)
+    else:
+        gap = np.sqrt(d2) - radius[:, None] - radius[None, :]
+        f = np.select(
+            [gap > 0, gap < 0],
+            [KR * mm / np.where(gap > 0, gap, 1) ** 2, KR_OVERLAP * mm],
+        )
+    return (f * dx).sum(axis=1), (f * dy).sum(axis=1)
+
+
+def repulsion_only(
+    x: np.ndarray,
+    y: np.ndarray,
+    mass: np.ndarray,
+    radius: np.ndarray | None,
+    theta: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    n = len(x)
+    fx, fy, _ = forces(
+        x,
+        y,
+        np.arange(n),
+        np.zeros(n + 1, dtype=np.int64),
+        np.zeros(0, dtype=np.int64),
+        np.zeros(0),
+        mass,
+        np.ones(n),
+        radius,
+        KR,
+        KR_OVERLAP,
+        theta,
+        False,
+    )
+    return fx, fy
+
+
+@pytest.mark.parametrize("adjust_sizes", [False, True])
+def test_exact_repulsion_matches_pairwise(adjust_sizes):
+    x, y, mass, radius = clustered_bodies(1500)
+    radius = radius if adjust_sizes else None
+    fx, fy = repulsion_only(x, y, mass, radius, theta=0.0)
+    ex, ey = pairwise_repulsion(x, y, mass, radius)
+    scale = np.hypot(ex, ey).max()
+    np.testing.assert_allclose(fx, ex, rtol=1e-9, atol=1e-12 * scale)
+    np.testing.assert_allclose(fy, ey, rtol=1e-9, atol=1e-12 * scale)
+
+
+def test_barnes_hut_repulsion_is_close_to_pairwise():
+    x, y, mass, _ = clustered_bodies(3000, seed=1)
+    fx, fy = repulsion_only(x, y, mass, None, theta=0.5)
+    ex, ey = pairwise_repulsion(x, y, mass, None)
+    error = np.hypot(fx - ex, fy - ey) / np.hypot(ex, ey).clip(min=1e-12)
+    assert np.median(error) < 0.005
+    assert np.quantile(error, 0.99) < 0.02
+
+
+def test_barnes_hut_overlap_repulsion_is_close_to_pairwise():
+    # Far cells ignore the radii, as in Gephi, which only holds up while the
+    # circles are small next to the distance to any far cell
+    x, y, mass, radius = clustered_bodies(3000, seed=2)
+    radius /= 20
+    d = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+    overlapping = d < radius[:, None] + radius[None, :]
+    assert overlapping.sum() > 3000 + 12  # Not only self and coincident pairs
+
+    fx, fy = repulsion_only(x, y, mass, radius, theta=0.5)
+    ex, ey = pairwise_repulsion(x, y, mass, radius)
+    error = np.hypot(fx - ex, fy - ey) / np.hypot(ex, ey).clip(min=1e-12)
+    assert np.median(error) < 0.005
+
+
+def test_attraction_matches_edges():
+    x, y, mass, radius = clustered_bodies(200, seed=3)
+    rng = np.random.default_rng(3)
+    src, dst = rng.integers(0, 200, (2, 600))
+    _, offsets, neighbors, weights = undirected_csr(src, dst)
+    n = len(offsets) - 1
+    x, y, mass, radius = x[:n], y[:n], np.diff(offsets) + 1.0, radius[:n]
+    coefficient = mass.mean() / mass
+
+    row = np.repeat(np.arange(n), np.diff(offsets))
+    dx = x[row] - x[neighbors]
+    dy = y[row] - y[neighbors]
+    d = np.hypot(dx, dy)
+    gap = d - radius[row] - radius[neighbors]
+    w = weights * (coefficient[row] + coefficient[neighbors])
+    cases = [
+        (None, False, w),
+        (None, True, w * np.log1p(d) / d),
+        (radius, False, np.where(gap > 0, w, 0.0)),
+        (radius, True, np.where(gap > 0, w * np.log1p(gap) / gap, 0.0)),
+    ]
+    for r, lin_log_mode, pull in cases:
+        fx, fy, _ = forces(
+            x,
+            y,
+            np.arange(n),
+            offsets,
+            neighbors,
+            weights,
+            mass,
+            coefficient,
+            r,
+            0.0,
+            0.0,
+            0.5,
+            lin_log_mode,
+        )
+        np.testing.assert_allclose(fx, -np.bincount(row, pull * dx, n), atol=1e-9)
+        np.testing.assert_allclose(fy, -np.bincount(row, pull * dy, n), atol=1e-9)
+
+
+def test_quadtree_nodes_cover_their_bodies():
+    x, y, mass, _ = clustered_bodies(2000, seed=4)
+    rng = np.random.default_rng(4)
+    (
+        order,
+        start,
+        end,
+        node_mass,
+        com_x,
+        com_y,
+        width,
+        first_child,
+        last_child,
+        leaf,
+    ) = build_quadtree(x, y, mass, rng.permutation(len(x)))
+
+    assert np.array_equal(np.sort(order), np.arange(len(x)))
+    # Leaves tile the sorted bodies; only coincident bodies overfill one
+    leaves = np.flatnonzero(leaf)
+    assert np.array_equal(np.sort(start[leaves]), np.r_[0, np.sort(end[leaves])[:-1]])
+    assert (end[leaves] - start[leaves] <= LEAF_SIZE).sum() >= len(leaves) - 1
+    for k in np.flatnonzero(~leaf):
+        children = np.arange(first_child[k], last_child[k])
+        assert start[children[0]] == start[k] and end[children[-1]] == end[k]
+        assert np.all(width[children] == width[k] / 2)
+    for k in range(len(start)):
+        bodies = order[start[k] : end[k]]
+        assert node_mass[k] == pytest.approx(mass[bodies].sum())
+        assert com_x[k] == pytest.approx(np.average(x[bodies], weights=mass[bodies]))
+        assert com_y[k] == pytest.approx(np.average(y[bodies], weights=mass[bodies]))
+
+
+@pytest.mark.parametrize(
+    ("gravity", "expected"), [(0.0, 2.0), (1.0, (np.sqrt(17) - 1) / 2)]
+)
+def test_single_edge_settles_at_equilibrium(gravity, expected):
+    # Two vertices of mass 2 on one edge: repulsion 2·2·2/d against attraction
+    # 2·d (both ends' coefficient of 1), plus gravity 2 along the edge once the
+    # origin lies between them
+    _, offsets, neighbors, weights = undirected_csr(np.array([0]), np.array([1]))
+    pos = force_atlas2(offsets, neighbors, weights, max_iter=200, gravity=gravity)
+    assert np.hypot(*(pos[0] - pos[1])) == pytest.approx(expected)
+
+
+def test_prevent_overlapping_clears_a_packed_start():
+    edges = [(i, j) for c in (0, 10) for i in range(c, c + 10) for j in range(i)]
+    src, dst = np.array(edges + [(0, 10)]).T
+    _, offsets, neighbors, weights = undirected_csr(src, dst)
+    pos = np.random.default_rng(5).uniform(-1, 1, (20, 2))
+    pos = force_atlas2(
+        offsets,
+        neighbors,
+        weights,
+        max_iter=100,
+        pos=pos,
+        prevent_overlapping=True,
+        radius=np.ones(20),
+    )
+    d = np.hypot(*(pos[:, None, :] - pos[None, :, :]).transpose(2, 0, 1))
+    assert d[np.triu_indices(20, k=1)].min() > 2.0
+
+
+@pytest.mark.parametrize("prevent_overlapping", [False, True])
+def test_calls_sharing_state_continue_one_run(prevent_overlapping):
+    src, dst = np.random.default_rng(6).integers(0, 300, (2, 1200))
+    _, offsets, neighbors, weights = undirected_csr(src, dst)
+    kwargs = {
+        "prevent_overlapping": prevent_overlapping,
+        "radius": np.full(len(offsets) - 1, 0.5),
+    }
+    whole = force_atlas2(offsets, neighbors, weights, max_iter=60, **kwargs)
+
+    state: dict = {}
+    pos = force_atlas2(offsets, neighbors, weights, max_iter=20, state=state, **kwargs)
+    for _ in range(2):
+        pos = force_atlas2(
+            offsets, neighbors, weights, max_iter=20, pos=pos, state=state, **kwargs
+        )
+    assert np.array_equal(pos, whole)
+
+    restarted = force_atlas2(offsets, neighbors, weights, max_iter=20, **kwargs)
+    for _ in range(2):
+        restarted = force_atlas2(
+            offsets, neighbors, weights, max_iter=20, pos=restarted, **kwargs
+        )
+    assert not np.array_equal(restarted, whole)
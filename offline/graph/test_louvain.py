@@ -0,0 +1,208 @@
+import itertools
+
+import numpy as np
+import pytest
+from joblib import Parallel
+
+import offline.graph.louvain as louvain_module
+from offline.graph.louvain import (
+    local_moving,
+    louvain,
+    modularity,
+    undirected_csr,
+)
+
+
+def clique(vertices: range) -> list[tuple[int, int]]:
+    return list(itertools.combinations(vertices, 2))
+
+
+def ring_of_cliques(k: int, m: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """k cliques of m vertices, each joined to the next by one edge.
+
+    Returns (src, dst, membership).
+    """
+    edges = []
+    for c in range(k):
+        edges += clique(range(c * m, (c + 1) * m))
+        edges.append((c * m, ((c + 1) % k) * m + 1))
+    src, dst = np.array(edges).T
+    return src, dst, np.repeat(np.arange(k), m)
+
+
+def planted_partition(
+    sizes: list[int], p_in: float, p_out: float, seed: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Random graph with edges inside groups of `sizes` far likelier than across.
+
+    Returns (src, dst, membership).
+    """
+    rng = np.random.default_rng(seed)
+    membership = np.repeat(np.arange(len(sizes)), sizes)
+    i, j = np.triu_indices(len(membership), k=1)
+    p = np.where(membership[i] == membership[j], p_in, p_out)
+    keep = rng.random(len(p)) < p
+    return i[keep], j[keep], membership
+
+
+def closed_form_modularity(
+    src: np.ndarray, dst: np.ndarray, membership: np.ndarray
+) -> float:
+    """Q = Σ_c [L_c/m − (d_c/2m)²] of a simple undirected graph."""
+    m = len(src)
+    inside = membership[src] == membership[dst]
+    internal = np.bincount(membership[src][inside], minlength=membership.max() + 1)
+    degree = np.bincount(
+        np.concatenate([membership[src], membership[dst]]),
+        minlength=membership.max() + 1,
+    )
+    return float((internal / m - (degree / (2 * m)) ** 2).sum())
+
+
+def same_partition(a: np.ndarray, b: np.ndarray) -> bool:
+    """Whether two labelings group the vertices the same way."""
+    pairs = set(zip(a.tolist(), b.tolist()))
+    return len(pairs) == len(set(a.tolist())) == len(set(b.tolist()))
+
+
+def known_modularity(
+    graph: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    community: np.ndarray,
+) -> float:
+    """louvain.modularity of a given partition of undirected_csr's graph."""
+    _, offsets, neighbors, weights = graph
+    n = len(offsets) - 1
+    degree = np.bincount(
+        np.repeat(np.arange(n), np.diff(offsets)), weights=weights, minlength=n
+    )
+    community_degree = np.bincount(community, weights=degree, minlength=n)
+    with Parallel(n_jobs=-1, prefer="threads") as parallel:
+        return modularity(
+            parallel,
+            offsets,
+            neighbors,
+            weights,
+            community,
+            community_degree,
+            1.0,
+            float(degree.sum()),
+        )
+
+
+@pytest.mark.parametrize(("k", "m"), [(8, 5), (16, 6), (10, 4)])
+def test_ring_of_cliques(k, m):
+    src, dst, membership = ring_of_cliques(k, m)
+    graph = undirected_csr(src, dst)
+
+    edges = k * m * (m - 1) // 2 + k
+    expected = k * ((m * (m - 1) / 2) / edges - ((m * (m - 1) + 2) / (2 * edges)) ** 2)
+    assert closed_form_modularity(src, dst, membership) == pytest.approx(expected)
+    assert known_modularity(graph, membership) == pytest.approx(expected)
+
+    vertices, partition, q = louvain(graph)
+    assert np.array_equal(vertices, np.arange(k * m))
+    assert same_partition(partition, membership)
+    assert q == pytest.approx(expected)
+
+
+def test_ring_of_cliques_past_the_resolution_limit():
+    # Past k ≈ m(m − 1) + 2 cliques, joining neighbors in pairs scores higher
+    # than the cliques themselves, so Louvain should merge some of them
+    k, m = 30, 4
+    src, dst, membership = ring_of_cliques(k, m)
+    _, partition, q = louvain(undirected_csr(src, dst))
+
+    cliques = closed_form_modularity(src, dst, membership)
+    pairs = closed_form_modularity(src, dst, membership // 2)
+    assert pairs > cliques
+    assert q > cliques
+    # Every clique stays whole inside one community
+    assert same_partition(partition, partition[membership * m])
+    assert len(np.unique(partition)) < k
+
+
+@pytest.mark.parametrize(
+    ("sizes", "p_in", "p_out", "seed"),
+    [
+        ([32, 32, 32, 32], 0.5, 0.01, 0),
+        ([20, 40, 60], 0.4, 0.005, 1),
+    ],
+)
+def test_planted_partition(sizes, p_in, p_out, seed):
+    src, dst, membership = planted_partition(sizes, p_in, p_out, seed)
+    graph = undirected_csr(src, dst)
+    expected = closed_form_modularity(src, dst, membership)
+    assert known_modularity(graph, membership) == pytest.approx(expected)
+
+    vertices, partition, q = louvain(graph)
+    assert np.array_equal(vertices, np.arange(len(membership)))
+    assert same_partition(partition, membership)
+    assert q == pytest.approx(expected)
+
+
+def test_disconnected_graph():
+    # Three cliques and a lone edge with no links between them; the unlinked
+    # ids 5 and 16..19 aren't partitioned
+    edges = clique(range(0, 5)) + clique(range(6, 12)) + clique(range(12, 16))
+    edges.append((20, 21))
+    src, dst = np.array(edges).T
+    vertices, partition, q = louvain(undirected_csr(src, dst))
+
+    expected_vertices = np.r_[0:5, 6:16, 20:22]
+    membership = np.repeat(np.arange(4), [5, 6, 4, 2])
+    assert np.array_equal(vertices, expected_vertices)
+    assert same_partition(partition, membership)
+    compact = np.searchsorted(expected_vertices, src)
+    compact_dst = np.searchsorted(expected_vertices, dst)
+    assert q == pytest.approx(closed_form_modularity(compact, compact_dst, membership))
+
+
+def test_duplicate_and_reverse_links_are_one_edge():
+    src, dst, membership = ring_of_cliques(6, 5)
+    doubled = undirected_csr(np.r_[src, dst, src], np.r_[dst, src, dst])
+    _, partition, q = louvain(doubled)
+    assert same_partition(partition, membership)
+    assert q == pytest.approx(closed_form_modularity(src, dst, membership))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_modularity_never_decreases_across_levels(seed):
+    # Many small loose groups, so local moving leaves work for later levels
+    src, dst, _ = planted_partition([12] * 40, 0.3, 0.02, seed)
+    trace: list[dict] = []
+    _, partition, q = louvain(undirected_csr(src, dst), trace=trace)
+
+    assert len(trace) > 1
+    levels = [record["modularity"] for record in trace]
+    assert all(b >= a - 1e-12 for a, b in itertools.pairwise(levels))
+    assert q == levels[-1]
+    assert trace[-1]["communities"] == len(np.unique(partition))
+
+
+def test_a_pass_lowering_modularity_is_undone(monkeypatch):
+    # After the first pass, every vertex moves into community 0 (Q = 0)
+    best_moves = louvain_module.best_moves
+    modularity_calls = 0
+
+    def counted_modularity(*args):
+        nonlocal modularity_calls
+        modularity_calls += 1
+        return modularity(*args)
+
+    def sabotaged_moves(block, *args):
+        if modularity_calls < 2:
+            return best_moves(block, *args)
+        rows = block[0]
+        return rows, np.zeros_like(rows)
+
+    monkeypatch.setattr(louvain_module, "modularity", counted_modularity)
+    monkeypatch.setattr(louvain_module, "best_moves", sabotaged_moves)
+    src, dst, _ = ring_of_cliques(8, 5)
+    graph = undirected_csr(src, dst)
+    with Parallel(n_jobs=-1, prefer="threads") as parallel:
+        community, q = local_moving(parallel, *graph[1:], 1.0, seed=0)
+
+    assert modularity_calls == 3
+    assert len(np.unique(community)) > 1
+    assert q > 0
+    assert q == pytest.approx(known_modularity(graph, community))
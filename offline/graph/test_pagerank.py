@@ -0,0 +1,81 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from offline.graph.pagerank import in_edge_csr, pagerank, split_rows
+
+ALPHA = 0.85
+
+
+def random_graph(seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """A sparse directed graph with dangling vertices and a gap in the ids."""
+    rng = np.random.default_rng(seed)
+    src = rng.integers(0, 60, 400)
+    dst = rng.integers(0, 60, 400)
+    keep = (src != dst) & (src < 50)  # 50..59 only receive, so they dangle
+    src, dst = src[keep], dst[keep]
+    return np.where(src >= 20, src + 5, src), np.where(dst >= 20, dst + 5, dst)
+
+
+def dense_pagerank(src: np.ndarray, dst: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Exact PageRank of the vertices in an edge, by solving the linear system."""
+    vertices, inverse = np.unique(np.concatenate([src, dst]), return_inverse=True)
+    s, d = inverse.reshape(2, -1)
+    n = len(vertices)
+    links = np.zeros((n, n))
+    np.add.at(links, (d, s), 1.0)
+    out_degree = links.sum(axis=0)
+    dangling = out_degree == 0
+    transition = np.where(dangling, 1.0 / n, links / np.where(dangling, 1, out_degree))
+    ranks = np.linalg.solve(np.eye(n) - ALPHA * transition, np.full(n, (1 - ALPHA) / n))
+    return vertices, ranks / ranks.sum()
+
+
+def test_matches_exact_solution():
+    src, dst = random_graph()
+    vertices, ranks, iterations = pagerank(in_edge_csr(src, dst), tol=1e-12)
+    expected_vertices, expected = dense_pagerank(src, dst)
+    assert np.array_equal(vertices, expected_vertices)
+    np.testing.assert_allclose(ranks, expected, rtol=1e-9)
+    assert ranks.sum() == pytest.approx(1.0)
+    assert iterations > 1
+
+
+def test_warm_start_converges_faster():
+    src, dst = random_graph()
+    graph = in_edge_csr(src, dst)
+    vertices, ranks, cold = pagerank(graph, tol=1e-10)
+
+    nstart = np.zeros(int(vertices.max()) + 1)
+    nstart[vertices] = ranks * 7  # Any scale; the guess is normalized
+    _, warm_ranks, warm = pagerank(graph, tol=1e-10, nstart=nstart)
+    assert warm < cold
+    np.testing.assert_allclose(warm_ranks, ranks, rtol=1e-8)
+
+
+@pytest.mark.parametrize("fill", [np.nan, 0.0])
+def test_unusable_warm_start_falls_back_to_uniform(fill):
+    src, dst = random_graph()
+    graph = in_edge_csr(src, dst)
+    _, uniform, uniform_iterations = pagerank(graph)
+    nstart = np.full(int(max(src.max(), dst.max())) + 1, fill)
+    _, ranks, iterations = pagerank(graph, nstart=nstart)
+    assert np.array_equal(ranks, uniform)
+    assert iterations == uniform_iterations
+
+
+@pytest.mark.parametrize("max_iter", [0, 1])
+def test_not_converging_raises(max_iter):
+    src, dst = random_graph()
+    with pytest.raises(RuntimeError, match="did not converge"):
+        pagerank(in_edge_csr(src, dst), max_iter=max_iter)
+
+
+def test_split_rows_covers_every_row_once():
+    offsets = np.array([0, 0, 5, 5, 6, 20, 20, 21])
+    for n_chunks in range(1, 10):
+        ranges = split_rows(offsets, n_chunks)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(offsets) - 1
+        assert all(a < b for a, b in ranges)
+        assert all(b == c for (_, b), (c, _) in itertools.pairwise(ranges))
@@ -1,22 +1,53 @@
+import json
 import math
+import time
+from functools import cache
 from pathlib import Path
 
-import cudf  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
-import cugraph  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+import numpy as np
 import polars as pl
 from loguru import logger
 
+from offline.graph.louvain import louvain, undirected_csr
+from offline.graph.pagerank import in_edge_csr, pagerank
+from offline.remove_overlaps import candidate_pairs, grid_cell
+
 NODES_INPUT_PATH = Path("intermediates/extracted_nodes.parquet")
 EDGES_INPUT_PATH = Path("intermediates/extracted_edges.parquet")
 
 PAGERANK_PATH = Path("intermediates/pagerank.parquet")
 CLUSTERS_PATH = Path("intermediates/clusters.parquet")
 INITIAL_LAYOUT_PATH = Path("intermediates/initial_layout.parquet")
+LAYOUT_REPORT_PATH = Path("intermediates/layout_report.json")
 
 INITIAL_NODES_PATH = Path("intermediates/initial_enriched_nodes.parquet")
 
+# "cugraph" runs every stage on the GPU (cuda13 extra). "cpu" runs PageRank,
+# clustering (Louvain rather than Leiden) and the ForceAtlas2 layout with the
+# engines in offline.graph instead, so they need no GPU; the layout's is
+# compiled with numba (cpu extra).
+GRAPH_BACKEND = "cugraph"
+
 WORLD_EXTENT = 2**16
 
+PAGERANK_ALPHA = 0.85
+PAGERANK_TOL = 1e-6
+PAGERANK_MAX_ITER = 100
+
+# A previous run's nodes and PageRank, to warm-start PageRank on a dump
+# refresh. Ranks carry over by title; articles new in this dump start at the
+# mean. Month to month the graph barely changes, so this converges in a
+# fraction of the iterations. Without these files PageRank starts uniform.
+PREVIOUS_NODES_PATH = Path("intermediates/previous/extracted_nodes.parquet")
+PREVIOUS_PAGERANK_PATH = Path("intermediates/previous/pagerank.parquet")
+
+# Snapshot of the CPU engines' graph views (the in-edge CSR and the
+# symmetrized CSR) as .npy files, which later runs on the same edges
+# memory-map instead of rebuilding. cuGraph's graphs live on the GPU and are
+# always built from the edge list.
+USE_GRAPH_SNAPSHOT = False
+GRAPH_SNAPSHOT_DIR = Path("intermediates/graph_snapshot")
+
 CLUSTERING_RESOLUTION = 1.0
 
 PAGERANK_RADIUS_EXPONENT = 0.5
@@ -28,6 +59,151 @@ RADIUS_FLOOR_PERCENTILE = 0.10
 
 LAYOUT_RADIUS_INFLATION = 1.3
 
+# Seed pass 1 from the clusters instead of random positions. The cluster graph
+# (one vertex per partition, weighted by the links between them) is laid out
+# first, every node starts inside a disk around its cluster's position, and
+# the full graph only gets MULTILEVEL_REFINE_ITER iterations instead of 2000.
+MULTILEVEL_LAYOUT = False
+MULTILEVEL_REFINE_ITER = 300
+
+# Node spacing per sqrt(node count), in layout units: about the density that
+# pass 1 settles to at scaling_ratio=5. Sizes the multilevel cluster disks and
+# the incremental layout's rescaled previous positions.
+LAYOUT_NODE_SPACING = 10.0
+
+# A previous run's final nodes, to lay out a dump refresh incrementally. Nodes
+# keep their previous position (matched by title, then shifted and scaled as
+# a whole into layout units), new articles start at the centroid of their
+# placed neighbors, and pass 1 shrinks to a short INCREMENTAL_REFINE_ITER
+# relaxation, so the map stays put between releases. That relaxation runs over
+# every node: cuGraph's force_atlas2 can't hold vertices fixed, and a new
+# article displaces its neighbors' neighbors too. What keeps it local in
+# effect is the low jitter tolerance, which keeps the global speed down:
+# settled nodes, whose forces are near balance, barely move while the new
+# ones, with the largest forces, find their place. Pass 2 stays global as
+# well, since new nodes overlap settled ones anywhere on the map.
+# Takes precedence over MULTILEVEL_LAYOUT. Without this file, or when fewer
+# than INCREMENTAL_MIN_CARRIED of the nodes match it by title, the layout
+# starts from scratch: the short refinement only suits a map that barely
+# changed.
+PREVIOUS_ENRICHED_NODES_PATH = Path("intermediates/previous/enriched_nodes.parquet")
+INCREMENTAL_REFINE_ITER = 100
+INCREMENTAL_JITTER_TOLERANCE = 0.005
+INCREMENTAL_MIN_CARRIED = 0.5
+
+# New articles linked only to other new articles are placed in rounds, each
+# placing the ones with a neighbor placed by the last; any left after this
+# many rounds start at random.
+INCREMENTAL_PLACEMENT_ROUNDS = 8
+# Standard deviation (layout units) of the jitter added to each new article's
+# neighbor centroid, so siblings of one neighbor don't coincide
+INCREMENTAL_PLACEMENT_JITTER = LAYOUT_NODE_SPACING
+
+# Pass 2 stages as (jitter_tolerance, overlap_scaling_ratio, max_iter), each
+# run in chunks of OVERLAP_CHUNK_ITER iterations. After every chunk the
+# overlaps (at the unpadded radii) are counted and the nodes' mean
+# displacement measured. Pass 2 ends once at most OVERLAP_TARGET of the nodes
+# overlap (remove_overlaps resolves the rest); a stage ends early once the
+# mean displacement drops below OVERLAP_STALL_DISPLACEMENT median radii.
+#
+# Within a stage the CPU engine carries ForceAtlas2's adaptive speed from one
+# chunk to the next, so chunking leaves its run unchanged. cuGraph restarts
+# every call at speed 1. With overlap prevention the speed settles far lower
+# (about 0.01 on synthetic 20k-vertex graphs) within about 5 iterations, so a
+# restart costs a few oversized steps per chunk. Restarted 100-iteration
+# chunks ended with the same overlaps and layout quality as one run per
+# stage, which was the schedule before chunking.
+OVERLAP_STAGES = [
+    (0.05, 100.0, 500),
+    (0.01, 2000.0, 100),
+    (0.005, 2000.0, 100),
+    (0.0005, 2000.0, 100),
+    (0.00005, 2000.0, 100),
+    (0.000005, 2000.0, 100),
+    (0.000001, 2000.0, 100),
+    (0.0000001, 2000.0, 100),
+]
+OVERLAP_CHUNK_ITER = 100
+OVERLAP_TARGET = 0.001
+OVERLAP_STALL_DISPLACEMENT = 0.01
+
+
+@cache
+def edges() -> pl.DataFrame:
+    """The extracted (src, dst) edge list, read once per run."""
+    logger.info(f"Loading edges from {EDGES_INPUT_PATH}")
+    return pl.read_parquet(EDGES_INPUT_PATH, columns=["src", "dst"])
+
+
+@cache
+def directed_graph(backend: str):
+    """The directed graph, built once per run for PageRank.
+
+    A transposed cugraph.Graph for "cugraph"; in_edge_csr's arrays for "cpu".
+    """
+    if backend == "cugraph":
+        import cudf  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+        import cugraph  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+
+        G = cugraph.Graph(directed=True)
+        G.from_cudf_edgelist(
+            cudf.DataFrame.from_arrow(edges().to_arrow()),
+            source="src",
+            destination="dst",
+            store_transposed=True,
+        )
+        return G
+    if backend == "cpu":
+        return graph_snapshot(
+            "directed",
+            lambda: in_edge_csr(edges()["src"].to_numpy(), edges()["dst"].to_numpy()),
+        )
+    raise ValueError(f"Unknown GRAPH_BACKEND {backend!r}")
+
+
+@cache
+def undirected_graph(backend: str):
+    """The undirected graph, built once per run for clustering and layout."""
+    if backend == "cpu":
+        return graph_snapshot("undirected", lambda: build_undirected(edges(), backend))
+    return build_undirected(edges(), backend)
+
+
+def graph_snapshot(name: str, build) -> tuple[np.ndarray, ...]:
+    """`build()`'s arrays, memory-mapped from GRAPH_SNAPSHOT_DIR when it has them.
+
+    A view's snapshot is only used for the same edges file (size and mtime);
+    otherwise the view is rebuilt and its snapshot replaced.
+    """
+    if not USE_GRAPH_SNAPSHOT:
+        return build()
+
+    stat = EDGES_INPUT_PATH.stat()
+    key = {
+        "edges": str(EDGES_INPUT_PATH),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    key_path = GRAPH_SNAPSHOT_DIR / f"{name}.json"
+    if key_path.exists():
+        saved = json.loads(key_path.read_text())
+        if saved["key"] == key:
+            logger.info(f"Loading the {name} graph from {GRAPH_SNAPSHOT_DIR}")
+            return tuple(
+                np.load(GRAPH_SNAPSHOT_DIR / f"{name}-{i}.npy", mmap_mode="r")
+                for i in range(saved["arrays"])
+            )
+        # Drop the stale key first, so a crash below can't pair it with new arrays
+        key_path.unlink()
+
+    arrays = build()
+    GRAPH_SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    for i, array in enumerate(arrays):
+        np.save(GRAPH_SNAPSHOT_DIR / f"{name}-{i}.npy", array)
+    key_path.write_text(json.dumps({"key": key, "arrays": len(arrays)}))
+    logger.info(f"Saved the {name} graph to {GRAPH_SNAPSHOT_DIR}")
+    return arrays
+
 
 def compute_pagerank() -> None:
     """Compute PageRank on the directed graph.
@@ -38,57 +214,171 @@ def compute_pagerank() -> None:
         logger.info("PageRank already computed, skipping")
         return
 
-    logger.info("Computing PageRank")
-    edges_df = cudf.read_parquet(EDGES_INPUT_PATH)
+    logger.info(f"Computing PageRank ({GRAPH_BACKEND})")
+    start = time.perf_counter()
+    if GRAPH_BACKEND == "cugraph":
+        pagerank_df = pagerank_cugraph()
+    elif GRAPH_BACKEND == "cpu":
+        pagerank_df = pagerank_cpu()
+    else:
+        raise ValueError(f"Unknown GRAPH_BACKEND {GRAPH_BACKEND!r}")
+    logger.info(f"PageRank took {time.perf_counter() - start:.1f}s")
 
-    G = cugraph.Graph(directed=True)
-    G.from_cudf_edgelist(
-        edges_df,
-        source="src",
-        destination="dst",
-        store_transposed=True,
+    logger.info(
+        f"PageRank stats: min={pagerank_df['pagerank'].min():.2e}, "
+        f"max={pagerank_df['pagerank'].max():.2e}, "
+        f"mean={pagerank_df['pagerank'].mean():.2e}"
     )
 
-    pagerank = cugraph.pagerank(
+    pagerank_df.write_parquet(PAGERANK_PATH, compression="zstd")
+    logger.success(f"Wrote PageRank to {PAGERANK_PATH}")
+
+
+def pagerank_warm_start() -> pl.DataFrame | None:
+    """Initial (id, pagerank) guess from the previous run's ranks, if there is one."""
+    if not (PREVIOUS_NODES_PATH.exists() and PREVIOUS_PAGERANK_PATH.exists()):
+        return None
+
+    previous = (
+        pl.read_parquet(PREVIOUS_NODES_PATH)
+        .join(
+            pl.read_parquet(PREVIOUS_PAGERANK_PATH).with_columns(
+                pl.col("id").cast(pl.UInt32)
+            ),
+            on="id",
+        )
+        .select(["title", "pagerank"])
+    )
+    guess = pl.read_parquet(NODES_INPUT_PATH).join(previous, on="title", how="left")
+    n_matched = guess["pagerank"].count()
+    if n_matched == 0:
+        logger.warning(
+            f"No titles match {PREVIOUS_NODES_PATH}, starting PageRank uniform"
+        )
+        return None
+
+    logger.info(
+        f"Warm-starting PageRank from {PREVIOUS_PAGERANK_PATH}: "
+        f"{n_matched:,} of {len(guess):,} articles matched by title"
+    )
+    return guess.select(
+        "id", pl.col("pagerank").fill_null(pl.col("pagerank").mean())
+    ).sort("id")
+
+
+def pagerank_cugraph() -> pl.DataFrame:
+    """PageRank on the GPU with cuGraph."""
+    import cudf  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+    import cugraph  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+
+    G = directed_graph("cugraph")
+
+    nstart = None
+    warm_start = pagerank_warm_start()
+    if warm_start is not None:
+        nstart = cudf.DataFrame(
+            {
+                "vertex": warm_start["id"].to_numpy(),
+                "values": warm_start["pagerank"].to_numpy(),
+            }
+        )
+        nstart = nstart[nstart["vertex"].isin(G.nodes())]
+
+    start = time.perf_counter()
+    pagerank_df = cugraph.pagerank(
         G,
-        alpha=0.85,
-        tol=1e-6,
-        max_iter=100,
+        alpha=PAGERANK_ALPHA,
+        tol=PAGERANK_TOL,
+        max_iter=PAGERANK_MAX_ITER,
+        nstart=nstart,
     ).rename(columns={"vertex": "id"})
 
-    pagerank_column = pagerank["pagerank"]
-    assert pagerank_column is not None
+    # cuGraph doesn't report how many iterations it ran (only whether it
+    # converged, raising if not), so the solve time is what shows a warm
+    # start's savings here.
+    logger.info(
+        f"PageRank converged in {time.perf_counter() - start:.1f}s "
+        f"({'warm' if warm_start is not None else 'uniform'} start)"
+    )
+
+    return pl.from_arrow(pagerank_df.to_arrow())  # pyright: ignore[reportReturnType]
 
+
+def pagerank_cpu() -> pl.DataFrame:
+    """PageRank on the CPU with the NumPy power iteration in offline.graph."""
+    # Node ids are dense, so the sorted guess is already indexed by id
+    warm_start = pagerank_warm_start()
+    vertices, ranks, iterations = pagerank(
+        directed_graph("cpu"),
+        alpha=PAGERANK_ALPHA,
+        tol=PAGERANK_TOL,
+        max_iter=PAGERANK_MAX_ITER,
+        nstart=None if warm_start is None else warm_start["pagerank"].to_numpy(),
+    )
     logger.info(
-        f"PageRank stats: min={pagerank_column.min():.2e}, "
-        f"max={pagerank_column.max():.2e}, "
-        f"mean={pagerank_column.mean():.2e}"
+        f"PageRank converged in {iterations} iterations "
+        f"({'warm' if warm_start is not None else 'uniform'} start)"
     )
 
-    pagerank.to_parquet(PAGERANK_PATH, compression="zstd")
-    logger.success(f"Wrote PageRank to {PAGERANK_PATH}")
+    # Same schema as cuGraph's output
+    return pl.DataFrame(
+        {
+            "id": pl.Series(vertices.astype(np.uint32)),
+            "pagerank": pl.Series(ranks.astype(np.float32)),
+        }
+    )
 
 
 def compute_clusters() -> None:
-    """Run Leiden clustering on the undirected graph."""
+    """Cluster the undirected graph: Leiden on the GPU, Louvain on the CPU."""
     if CLUSTERS_PATH.exists():
         logger.info("Clusters already computed, skipping")
         return
 
-    logger.info("Computing Leiden clusters")
-    edges_df = cudf.read_parquet(EDGES_INPUT_PATH)
+    start = time.perf_counter()
+    if GRAPH_BACKEND == "cugraph":
+        logger.info("Computing Leiden clusters")
+        partitions, modularity = clusters_cugraph()
+    elif GRAPH_BACKEND == "cpu":
+        logger.info("Computing Louvain clusters (cpu)")
+        partitions, modularity = clusters_cpu()
+    else:
+        raise ValueError(f"Unknown GRAPH_BACKEND {GRAPH_BACKEND!r}")
+    logger.info(f"Clustering took {time.perf_counter() - start:.1f}s")
+
+    n_clusters = partitions["partition"].n_unique()
+    logger.info(f"Found {n_clusters:,} clusters, modularity = {modularity:.4f}")
+
+    partitions.write_parquet(CLUSTERS_PATH, compression="zstd")
+    logger.success(f"Wrote clusters to {CLUSTERS_PATH}")
+
 
-    G = cugraph.Graph(directed=False)
-    G.from_cudf_edgelist(edges_df, source="src", destination="dst")
+def clusters_cugraph() -> tuple[pl.DataFrame, float]:
+    """Leiden clusters on the GPU with cuGraph."""
+    import cugraph  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
 
-    partitions, modularity = cugraph.leiden(G, resolution=CLUSTERING_RESOLUTION)
+    partitions, modularity = cugraph.leiden(
+        undirected_graph("cugraph"), resolution=CLUSTERING_RESOLUTION
+    )
     partitions = partitions.rename(columns={"vertex": "id"})
 
-    n_clusters = int(partitions["partition"].nunique())  # pyright: ignore[reportOptionalMemberAccess, reportArgumentType]
-    logger.info(f"Found {n_clusters:,} clusters, modularity = {modularity:.4f}")
+    return pl.from_arrow(partitions.to_arrow()), modularity  # pyright: ignore[reportReturnType]
 
-    partitions.to_parquet(CLUSTERS_PATH, compression="zstd")
-    logger.success(f"Wrote clusters to {CLUSTERS_PATH}")
+
+def clusters_cpu() -> tuple[pl.DataFrame, float]:
+    """Louvain clusters on the CPU with the NumPy implementation in offline.graph."""
+    vertices, partition, modularity = louvain(
+        undirected_graph("cpu"), resolution=CLUSTERING_RESOLUTION
+    )
+
+    # Same schema as cuGraph's output
+    partitions = pl.DataFrame(
+        {
+            "id": pl.Series(vertices.astype(np.uint32)),
+            "partition": pl.Series(partition.astype(np.int32)),
+        }
+    )
+    return partitions, modularity
 
 
 def compute_layout() -> None:
@@ -97,20 +387,25 @@ def compute_layout() -> None:
     Pass 1 finds the natural layout; pass 2 re-runs from that position with
     overlap prevention enabled. Radii are computed in world coordinates from
     PageRank, converted into pass-1's layout space, then carried through pass 2
-    so they remain consistent with the final positions.
+    so they remain consistent with the final positions. Pass 2 stops once the
+    overlaps reach OVERLAP_TARGET; its per-chunk telemetry goes to
+    LAYOUT_REPORT_PATH.
     """
     if INITIAL_LAYOUT_PATH.exists():
         logger.info("Layout already computed, skipping")
         return
 
-    edges_df = cudf.read_parquet(EDGES_INPUT_PATH)
-    pagerank_df = cudf.read_parquet(PAGERANK_PATH)
+    pagerank_df = pl.read_parquet(PAGERANK_PATH)
 
     # Floor PageRank at its low percentile so the bottom decile collapses to a
     # single size. Compute the coefficient on the clamped values so total fill
     # stays at TARGET_NODE_FILL despite the floor enlarging the small nodes.
-    pr_floor = float(pagerank_df["pagerank"].quantile(RADIUS_FLOOR_PERCENTILE))
-    pr_eff = pagerank_df["pagerank"].clip(lower=pr_floor)
+    pr_floor = float(
+        pagerank_df["pagerank"].quantile(  # pyright: ignore[reportArgumentType]
+            RADIUS_FLOOR_PERCENTILE, interpolation="linear"
+        )
+    )
+    pr_eff = pagerank_df["pagerank"].clip(lower_bound=pr_floor)
     pr_pow_sum = float((pr_eff ** (2 * PAGERANK_RADIUS_EXPONENT)).sum())
     radius_coefficient = WORLD_EXTENT * math.sqrt(
         TARGET_NODE_FILL / (math.pi * pr_pow_sum)
@@ -123,26 +418,40 @@ def compute_layout() -> None:
 
     # World-space target radii. Converted into layout space after pass 1
     # and kept there through pass 2 and the parquet write.
-    vertex_radius = pagerank_df.rename(columns={"id": "vertex"}).assign(
-        radius=lambda d: (
-            d["pagerank"].clip(lower=pr_floor) ** PAGERANK_RADIUS_EXPONENT
+    vertex_radius = pagerank_df.select(
+        pl.col("id").alias("vertex"),
+        (
+            pl.col("pagerank").clip(lower_bound=pr_floor) ** PAGERANK_RADIUS_EXPONENT
             * radius_coefficient
-        )
-    )[["vertex", "radius"]]
-
-    G = cugraph.Graph(directed=False)
-    G.from_cudf_edgelist(edges_df, source="src", destination="dst")
+        ).alias("radius"),
+    )
 
-    logger.info("Running ForceAtlas2 (pass 1: rough layout)")
-    pos = cugraph.force_atlas2(
-        G,
-        max_iter=2000,
+    graph = undirected_graph(GRAPH_BACKEND)
+
+    start = time.perf_counter()
+    pos_list = None
+    max_iter = 2000
+    jitter_tolerance = 0.5
+    if PREVIOUS_ENRICHED_NODES_PATH.exists():
+        pos_list = incremental_start(edges())
+    if pos_list is not None:
+        max_iter = INCREMENTAL_REFINE_ITER
+        jitter_tolerance = INCREMENTAL_JITTER_TOLERANCE
+    elif MULTILEVEL_LAYOUT:
+        pos_list = multilevel_start(edges())
+        max_iter = MULTILEVEL_REFINE_ITER
+
+    logger.info(f"Running ForceAtlas2 (pass 1: rough layout, {GRAPH_BACKEND})")
+    pos = run_force_atlas2(
+        graph,
+        max_iter=max_iter,
+        pos_list=pos_list,
         scaling_ratio=5.0,
         gravity=1.0,
         strong_gravity_mode=False,
         lin_log_mode=False,
         edge_weight_influence=1.0,
-        jitter_tolerance=0.5,
+        jitter_tolerance=jitter_tolerance,
         barnes_hut_optimize=True,
         barnes_hut_theta=0.5,
         outbound_attraction_distribution=True,
@@ -150,29 +459,269 @@ def compute_layout() -> None:
         verbose=True,
     )
 
-    pos_x = pos["x"]
-    pos_y = pos["y"]
-    assert pos_x is not None and pos_y is not None
-
-    cx = float(pos_x.median())
-    cy = float(pos_y.median())
+    cx = float(pos["x"].median())  # pyright: ignore[reportArgumentType]
+    cy = float(pos["y"].median())  # pyright: ignore[reportArgumentType]
     max_abs = max(
-        float((pos_x - cx).abs().max()),
-        float((pos_y - cy).abs().max()),
+        float((pos["x"] - cx).abs().max()),  # pyright: ignore[reportArgumentType]
+        float((pos["y"] - cy).abs().max()),  # pyright: ignore[reportArgumentType]
     )
     scale_1 = (WORLD_EXTENT / 2) / max_abs
 
-    vertex_radius = vertex_radius.assign(radius=lambda d: d["radius"] / scale_1)
-    vertex_radius_padded = vertex_radius.assign(
-        radius=lambda d: d["radius"] * LAYOUT_RADIUS_INFLATION
+    vertex_radius = vertex_radius.with_columns(pl.col("radius") / scale_1)
+    vertex_radius_padded = vertex_radius.with_columns(
+        pl.col("radius") * LAYOUT_RADIUS_INFLATION
     )
 
+    overlaps = count_overlaps(pos, vertex_radius)
+    report = [
+        {
+            "stage": "rough",
+            "iterations": max_iter,
+            "overlaps": overlaps,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    ]
+
     logger.info("Running ForceAtlas2 (pass 2: overlap cleanup)")
-    logger.info("Running initial overlap pass (300 iters)")
-    pos = cugraph.force_atlas2(
-        G,
+    overlap_target = int(OVERLAP_TARGET * len(pos))
+    stall = OVERLAP_STALL_DISPLACEMENT * float(
+        vertex_radius["radius"].median()  # pyright: ignore[reportArgumentType]
+    )
+    for stage, (jitter_tolerance, overlap_scaling_ratio, stage_iter) in enumerate(
+        OVERLAP_STAGES
+    ):
+        if overlaps <= overlap_target:
+            logger.info(
+                f"Overlap target met ({overlaps:,} <= {overlap_target:,}), "
+                "ending pass 2"
+            )
+            break
+        iterations = 0
+        speed_state: dict = {}
+        while iterations < stage_iter:
+            chunk = min(OVERLAP_CHUNK_ITER, stage_iter - iterations)
+            chunk_start = time.perf_counter()
+            new_pos = run_force_atlas2(
+                graph,
+                max_iter=chunk,
+                pos_list=pos,
+                scaling_ratio=5.0,
+                gravity=1.0,
+                strong_gravity_mode=False,
+                lin_log_mode=False,
+                edge_weight_influence=1.0,
+                jitter_tolerance=jitter_tolerance,
+                barnes_hut_optimize=True,
+                barnes_hut_theta=0.5,
+                outbound_attraction_distribution=True,
+                prevent_overlapping=True,
+                vertex_radius=vertex_radius_padded,
+                overlap_scaling_ratio=overlap_scaling_ratio,
+                verbose=True,
+                speed_state=speed_state,
+            )
+            displacement = mean_displacement(pos, new_pos)
+            pos = new_pos
+            iterations += chunk
+            overlaps = count_overlaps(pos, vertex_radius)
+            report.append(
+                {
+                    "stage": stage,
+                    "jitter_tolerance": jitter_tolerance,
+                    "overlap_scaling_ratio": overlap_scaling_ratio,
+                    "iterations": chunk,
+                    "overlaps": overlaps,
+                    "mean_displacement": displacement,
+                    "seconds": round(time.perf_counter() - chunk_start, 3),
+                }
+            )
+            logger.info(
+                f"Stage {stage} (jt={jitter_tolerance}): {iterations} iters, "
+                f"{overlaps:,} overlaps, mean displacement {displacement:.3g}"
+            )
+            if overlaps <= overlap_target or displacement < stall:
+                break
+
+    LAYOUT_REPORT_PATH.write_text(json.dumps(report, indent=2))
+    logger.info(f"Wrote layout telemetry to {LAYOUT_REPORT_PATH}")
+    logger.info(f"Layout took {time.perf_counter() - start:.1f}s")
+
+    logger.info(
+        f"Raw layout extents: "
+        f"x: [{float(pos['x'].min()):.1f}, {float(pos['x'].max()):.1f}], "  # pyright: ignore[reportArgumentType]
+        f"y: [{float(pos['y'].min()):.1f}, {float(pos['y'].max()):.1f}]"  # pyright: ignore[reportArgumentType]
+    )
+
+    pos = pos.join(vertex_radius, on="vertex").rename({"vertex": "id"})
+    pos.write_parquet(INITIAL_LAYOUT_PATH, compression="zstd")
+    logger.success(f"Wrote layout to {INITIAL_LAYOUT_PATH}")
+
+
+def count_overlaps(pos: pl.DataFrame, vertex_radius: pl.DataFrame) -> int:
+    """Number of node pairs whose circles overlap at `pos`."""
+    nodes = pos.join(vertex_radius, on="vertex")
+    x = nodes["x"].cast(pl.Float64).to_numpy()
+    y = nodes["y"].cast(pl.Float64).to_numpy()
+    r = nodes["radius"].cast(pl.Float64).to_numpy()
+    i, j = candidate_pairs(x, y, r, grid_cell(r))
+    return int((np.hypot(x[i] - x[j], y[i] - y[j]) < r[i] + r[j]).sum())
+
+
+def mean_displacement(before: pl.DataFrame, after: pl.DataFrame) -> float:
+    """Mean distance the vertices moved between two (vertex, x, y) frames."""
+    moved = before.join(after, on="vertex", suffix="_after").select(
+        (
+            (pl.col("x_after") - pl.col("x")).cast(pl.Float64) ** 2
+            + (pl.col("y_after") - pl.col("y")).cast(pl.Float64) ** 2
+        )
+        .sqrt()
+        .mean()
+    )
+    return float(moved.item())
+
+
+def incremental_start(edges_df: pl.DataFrame) -> pl.DataFrame | None:
+    """Initial (vertex, x, y) positions carried over from the previous layout.
+
+    Matched nodes keep their previous x/y, moved together by one shift and
+    scale into layout units; new nodes start at the centroid of their placed
+    neighbors. None when fewer than INCREMENTAL_MIN_CARRIED of the nodes match.
+    """
+    vertices = pl.concat([edges_df["src"], edges_df["dst"]]).unique().to_frame("vertex")
+    previous = pl.read_parquet(
+        PREVIOUS_ENRICHED_NODES_PATH, columns=["title", "x", "y"]
+    )
+    pos = vertices.join(
+        pl.read_parquet(NODES_INPUT_PATH, columns=["id", "title"])
+        .join(previous, on="title")
+        .select(pl.col("id").alias("vertex"), pl.col("x", "y").cast(pl.Float64)),
+        on="vertex",
+        how="left",
+    )
+    n_carried = pos["x"].count()
+    if n_carried == 0 or n_carried < INCREMENTAL_MIN_CARRIED * len(pos):
+        logger.warning(
+            f"Only {n_carried:,} of {len(pos):,} nodes match "
+            f"{PREVIOUS_ENRICHED_NODES_PATH} by title, laying out from scratch"
+        )
+        return None
+    logger.info(
+        f"Incremental layout from {PREVIOUS_ENRICHED_NODES_PATH}: "
+        f"{n_carried:,} of {len(pos):,} nodes matched by title"
+    )
+
+    # The previous positions are in world units; bring them back to layout
+    # units, centered and with pass 1's usual spread (the RMS radius of a
+    # uniform disk of LAYOUT_NODE_SPACING per sqrt(node))
+    placed = pos.drop_nulls()
+    cx = float(placed["x"].median())  # pyright: ignore[reportArgumentType]
+    cy = float(placed["y"].median())  # pyright: ignore[reportArgumentType]
+    rms = float(
+        placed.select(
+            ((pl.col("x") - cx) ** 2 + (pl.col("y") - cy) ** 2).mean().sqrt()
+        ).item()
+    )
+    scale = LAYOUT_NODE_SPACING * math.sqrt(len(pos) / 2) / rms
+    pos = pos.with_columns((pl.col("x") - cx) * scale, (pl.col("y") - cy) * scale)
+
+    # New nodes start at the centroid of their placed neighbors, jittered so
+    # siblings of one neighbor don't coincide
+    rng = np.random.default_rng(0)
+    links = pl.concat(
+        [
+            edges_df.select(
+                pl.col("src").alias("vertex"), pl.col("dst").alias("other")
+            ),
+            edges_df.select(
+                pl.col("dst").alias("vertex"), pl.col("src").alias("other")
+            ),
+        ]
+    )
+    for _ in range(INCREMENTAL_PLACEMENT_ROUNDS):
+        missing = pos.filter(pl.col("x").is_null()).select("vertex")
+        if missing.is_empty():
+            break
+        centroids = (
+            links.join(missing, on="vertex")
+            .join(
+                pos.drop_nulls().rename({"vertex": "other"}),
+                on="other",
+            )
+            .group_by("vertex")
+            .agg(pl.col("x").mean(), pl.col("y").mean())
+        )
+        if centroids.is_empty():
+            break
+        jitter = rng.normal(
+            scale=INCREMENTAL_PLACEMENT_JITTER, size=(len(centroids), 2)
+        )
+        centroids = centroids.with_columns(
+            pl.col("x") + jitter[:, 0], pl.col("y") + jitter[:, 1]
+        )
+        pos = pos.update(centroids, on="vertex")
+
+    # Anything still unplaced starts at random, as in a fresh layout
+    missing = pos["x"].is_null()
+    n_random = int(missing.sum())
+    lo = pos.select(pl.col("x").min(), pl.col("y").min()).row(0)
+    hi = pos.select(pl.col("x").max(), pl.col("y").max()).row(0)
+    random_xy = rng.uniform(lo, hi, size=(len(pos), 2))
+    pos = pos.with_columns(
+        pl.when(missing).then(pl.Series(random_xy[:, 0])).otherwise("x").alias("x"),
+        pl.when(missing).then(pl.Series(random_xy[:, 1])).otherwise("y").alias("y"),
+    )
+    logger.info(
+        f"Placed {len(pos) - n_carried - n_random:,} new nodes near their "
+        f"neighbors and {n_random:,} at random"
+    )
+    return pos
+
+
+def multilevel_start(edges_df: pl.DataFrame) -> pl.DataFrame:
+    """Initial (vertex, x, y) positions from a layout of the cluster graph."""
+    clusters = pl.read_parquet(CLUSTERS_PATH).select(
+        pl.col("id").cast(pl.UInt32), "partition"
+    )
+    sizes = clusters.group_by("partition").len("size")
+
+    # Links between two clusters become one edge weighted by their count
+    cluster_edges = (
+        edges_df.join(clusters.rename({"id": "src", "partition": "a"}), on="src")
+        .join(clusters.rename({"id": "dst", "partition": "b"}), on="dst")
+        .filter(pl.col("a") != pl.col("b"))
+        .group_by(
+            pl.min_horizontal("a", "b").cast(pl.UInt32).alias("src"),
+            pl.max_horizontal("a", "b").cast(pl.UInt32).alias("dst"),
+        )
+        .agg(pl.len().cast(pl.Float32).alias("weight"))
+    )
+    logger.info(f"Cluster graph: {len(sizes):,} clusters, {len(cluster_edges):,} edges")
+
+    cluster_radius = sizes.select(
+        pl.col("partition").cast(pl.UInt32).alias("vertex"),
+        (pl.col("size").sqrt() * LAYOUT_NODE_SPACING).alias("radius"),
+    )
+    graph = build_undirected(cluster_edges, GRAPH_BACKEND)
+    cluster_pos = run_force_atlas2(
+        graph,
+        max_iter=2000,
+        scaling_ratio=5.0,
+        gravity=1.0,
+        strong_gravity_mode=False,
+        lin_log_mode=False,
+        edge_weight_influence=1.0,
+        jitter_tolerance=0.5,
+        barnes_hut_optimize=True,
+        barnes_hut_theta=0.5,
+        outbound_attraction_distribution=True,
+        prevent_overlapping=False,
+        verbose=False,
+    )
+    # Spread the clusters apart so their disks hold their nodes
+    cluster_pos = run_force_atlas2(
+        graph,
         max_iter=500,
-        pos_list=pos,
+        pos_list=cluster_pos,
         scaling_ratio=5.0,
         gravity=1.0,
         strong_gravity_mode=False,
@@ -183,53 +732,134 @@ def compute_layout() -> None:
         barnes_hut_theta=0.5,
         outbound_attraction_distribution=True,
         prevent_overlapping=True,
-        vertex_radius=vertex_radius_padded,
+        vertex_radius=cluster_radius,
         overlap_scaling_ratio=100.0,
-        verbose=True,
+        verbose=False,
     )
 
-    for jitter_tolerance in [
-        0.01,
-        0.005,
-        0.0005,
-        0.00005,
-        0.000005,
-        0.000001,
-        0.0000001,
-    ]:
-        logger.info(f"Running 50 iter overlap pass with jt={jitter_tolerance}")
-        pos = cugraph.force_atlas2(
-            G,
-            max_iter=100,
-            pos_list=pos,
-            scaling_ratio=5.0,
-            gravity=1.0,
-            strong_gravity_mode=False,
-            lin_log_mode=False,
-            edge_weight_influence=1.0,
-            jitter_tolerance=jitter_tolerance,
-            barnes_hut_optimize=True,
-            barnes_hut_theta=0.5,
-            outbound_attraction_distribution=True,
-            prevent_overlapping=True,
-            vertex_radius=vertex_radius_padded,
-            overlap_scaling_ratio=2000.0,
-            verbose=True,
-        )
-
-    pos_x = pos["x"]
-    pos_y = pos["y"]
-    assert pos_x is not None and pos_y is not None
-
+    # Clusters linked to no other cluster aren't in the cluster graph; they
+    # start at random within its extent, as ForceAtlas2 would start them
+    rng = np.random.default_rng(0)
+    cluster_pos = cluster_radius.join(cluster_pos, on="vertex", how="left")
+    missing = cluster_pos["x"].is_null()
+    lo = cluster_pos.select(pl.col("x").min(), pl.col("y").min()).row(0)
+    hi = cluster_pos.select(pl.col("x").max(), pl.col("y").max()).row(0)
+    random_xy = rng.uniform(lo, hi, size=(len(cluster_pos), 2))
+    cluster_pos = cluster_pos.with_columns(
+        pl.when(missing).then(pl.Series(random_xy[:, 0])).otherwise("x").alias("x"),
+        pl.when(missing).then(pl.Series(random_xy[:, 1])).otherwise("y").alias("y"),
+    )
     logger.info(
-        f"Raw layout extents: "
-        f"x: [{float(pos_x.min()):.1f}, {float(pos_x.max()):.1f}], "
-        f"y: [{float(pos_y.min()):.1f}, {float(pos_y.max()):.1f}]"
+        f"Laid out the cluster graph; {int(missing.sum()):,} isolated clusters "
+        "placed at random"
     )
 
-    pos = pos.merge(vertex_radius, on="vertex").rename(columns={"vertex": "id"})
-    pos.to_parquet(INITIAL_LAYOUT_PATH, compression="zstd")
-    logger.success(f"Wrote layout to {INITIAL_LAYOUT_PATH}")
+    # Each node starts uniformly inside its cluster's disk
+    nodes = clusters.join(
+        cluster_pos.with_columns(pl.col("vertex").cast(pl.Int32)).rename(
+            {"vertex": "partition"}
+        ),
+        on="partition",
+        how="left",
+    )
+    angle = rng.uniform(0, 2 * np.pi, len(nodes))
+    distance = nodes["radius"].to_numpy() * np.sqrt(rng.uniform(size=len(nodes)))
+    return nodes.select(
+        pl.col("id").alias("vertex"),
+        pl.col("x") + distance * np.cos(angle),
+        pl.col("y") + distance * np.sin(angle),
+    )
+
+
+def build_undirected(edges_df: pl.DataFrame, backend: str):
+    """The undirected graph of an edge list in `backend`'s form.
+
+    A cugraph.Graph for "cugraph"; undirected_csr's (vertices, offsets,
+    neighbors, weights) for "cpu". An optional "weight" column weights the edges.
+    """
+    weighted = "weight" in edges_df.columns
+    if backend == "cugraph":
+        import cudf  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+        import cugraph  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+
+        G = cugraph.Graph(directed=False)
+        G.from_cudf_edgelist(
+            cudf.DataFrame.from_arrow(edges_df.to_arrow()),
+            source="src",
+            destination="dst",
+            edge_attr="weight" if weighted else None,
+        )
+        return G
+    if backend == "cpu":
+        return undirected_csr(
+            edges_df["src"].to_numpy(),
+            edges_df["dst"].to_numpy(),
+            edges_df["weight"].to_numpy() if weighted else None,
+        )
+    raise ValueError(f"Unknown GRAPH_BACKEND {backend!r}")
+
+
+def run_force_atlas2(
+    graph,
+    pos_list: pl.DataFrame | None = None,
+    vertex_radius: pl.DataFrame | None = None,
+    speed_state: dict | None = None,
+    **kwargs,
+) -> pl.DataFrame:
+    """cugraph.force_atlas2 on GRAPH_BACKEND, taking and returning polars frames.
+
+    `pos_list` is a (vertex, x, y) warm start and `vertex_radius` a (vertex,
+    radius) frame, as in cuGraph. Calls sharing a `speed_state` dict continue
+    one run's adaptive speed on the CPU engine (its `state`); cuGraph has no
+    such state and restarts every call. Returns the (vertex, x, y) positions.
+    """
+    if GRAPH_BACKEND == "cugraph":
+        import cudf  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+        import cugraph  # pyright: ignore[reportMissingImports]  # GPU-only (cuda13 extra)
+
+        pos = cugraph.force_atlas2(
+            graph,
+            pos_list=None
+            if pos_list is None
+            else cudf.DataFrame.from_arrow(pos_list.to_arrow()),
+            vertex_radius=None
+            if vertex_radius is None
+            else cudf.DataFrame.from_arrow(vertex_radius.to_arrow()),
+            **kwargs,
+        )
+        return pl.from_arrow(pos.to_arrow())  # pyright: ignore[reportReturnType]
+
+    from offline.graph.force_atlas2 import force_atlas2  # Needs numba (cpu extra)
+
+    # Align the frames with the CSR's compact vertices
+    vertices, offsets, neighbors, weights = graph
+    order = pl.DataFrame({"vertex": pl.Series(vertices.astype(np.uint32))})
+    pos = None
+    if pos_list is not None:
+        pos = (
+            order.join(pos_list, on="vertex", how="left", maintain_order="left")
+            .select("x", "y")
+            .to_numpy()
+        )
+    radius = None
+    if vertex_radius is not None:
+        radius = order.join(
+            vertex_radius, on="vertex", how="left", maintain_order="left"
+        )["radius"].to_numpy()
+
+    xy = force_atlas2(
+        offsets,
+        neighbors,
+        weights,
+        pos=pos,
+        radius=radius,
+        state=speed_state,
+        **kwargs,
+    )
+    return order.with_columns(
+        pl.Series("x", xy[:, 0].astype(np.float32)),
+        pl.Series("y", xy[:, 1].astype(np.float32)),
+    )
 
 
 def normalize_layout(layout: pl.DataFrame) -> pl.DataFrame:
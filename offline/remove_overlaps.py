@@ -1,18 +1,311 @@
+import json
+import time
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
 
 import numpy as np
 import polars as pl
+from joblib import Parallel, delayed
 from loguru import logger
 
 INPUT_PATH = Path("intermediates/initial_enriched_nodes.parquet")
 OUTPUT_PATH = Path("intermediates/enriched_nodes.parquet")
+RELAX_TRACE_PATH = Path("intermediates/relax_trace.json")
 
+# "jacobi" moves each node by its summed pushes times DAMPING. "momentum" adds
+# MOMENTUM times the node's previous move (heavy-ball), which carries a dense
+# cluster's slow expansion across iterations instead of re-deriving it from one
+# layer of penetrations at a time; a node whose push reverses has overshot, so
+# its carried move is dropped.
+SOLVER = "jacobi"
 DAMPING = 1.5
+MOMENTUM = 0.5
+MOMENTUM_DAMPING = 2.0
 
 SEPARATION_PADDING = 0.02
 
 MAX_ITERS = 500
 
+# With more than this fraction of the nodes active, pairing every cell of the
+# index is cheaper than looking up the active nodes' cells one by one.
+FULL_SCAN_ACTIVE_FRACTION = 0.15
+
+# Relax in parallel over spatial tiles first, then finish serially. The world
+# is cut into TILES_PER_SIDE² tiles of about equal node count, each relaxed by
+# a worker process over x/y/r in shared memory. A tile relaxes its own nodes
+# plus a halo one max padded diameter deep, so it sees every node that can
+# overlap one of its own, but writes back only its own. Tiles are re-cut each
+# round, which reconciles nodes pushed across a boundary.
+PARTITIONED_RELAX = False
+TILES_PER_SIDE = 8
+PARTITION_ROUNDS = 20
+PARTITION_ROUND_ITERS = 50
+
+
+# Cell keys pack (level, cx, cy) into a u64: 6 bits of level, then each cell
+# coordinate offset into 29 bits, so one level's cells sort column by column.
+CELL_OFFSET = 2**28
+
+
+def grid_cell(r: np.ndarray) -> float:
+    """Level-0 cell size: small enough that most nodes sit alone in a cell."""
+    return 2.0 * float(np.median(r))
+
+
+def node_levels(r: np.ndarray, cell: float) -> np.ndarray:
+    """Each node's grid level: the finest whose cells (cell·2^level) fit its
+    diameter, so a node covers at most 2×2 cells of its own level."""
+    ratio = np.maximum(2 * r / cell, 1.0)
+    return np.ceil(np.log2(ratio)).astype(np.int64)
+
+
+def cell_bounds(
+    x: np.ndarray, y: np.ndarray, r: np.ndarray, cell: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(cx_min, cx_max, cy_min, cy_max): the level-0 cells each node's bbox
+    covers. Cell sizes double per level, so its cells at level l are these
+    shifted right by l."""
+    return (
+        np.floor((x - r) / cell).astype(np.int64),
+        np.floor((x + r) / cell).astype(np.int64),
+        np.floor((y - r) / cell).astype(np.int64),
+        np.floor((y + r) / cell).astype(np.int64),
+    )
+
+
+def level_rect(
+    bounds: tuple[np.ndarray, ...], nodes: np.ndarray, level: np.ndarray | int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """The cells `nodes`' bboxes cover at `level`."""
+    return tuple(bound[nodes] >> level for bound in bounds)
+
+
+def cell_keys(level: np.ndarray | int, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+    return (
+        (np.asarray(level).astype(np.uint64) << np.uint64(58))
+        | ((cx + CELL_OFFSET).astype(np.uint64) << np.uint64(29))
+        | (cy + CELL_OFFSET).astype(np.uint64)
+    )
+
+
+def cell_entries(
+    nodes: np.ndarray, bounds: tuple[np.ndarray, ...], level: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """One (cell key, node) entry per cell of each node's bbox at its own
+    level, sorted by key."""
+    cx_min, cx_max, cy_min, cy_max = level_rect(bounds, nodes, level[nodes])
+    width = cx_max - cx_min + 1
+    counts = width * (cy_max - cy_min + 1)
+    owner = np.repeat(np.arange(len(nodes)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    keys = cell_keys(
+        level[nodes][owner],
+        cx_min[owner] + k % width[owner],
+        cy_min[owner] + k // width[owner],
+    )
+    order = np.argsort(keys, kind="stable")
+    return keys[order], nodes[owner[order]]
+
+
+def build_cell_index(
+    x: np.ndarray, y: np.ndarray, r: np.ndarray, cell: float
+) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...], np.ndarray]:
+    """Index the nodes in a hierarchy of grids, one per radius class.
+
+    Level l has cells of cell·2^l and holds the nodes whose diameter fits
+    them, so every node, hubs included, has at most four entries. Returns
+    (keys, nodes, bounds, level): every (cell, node) entry sorted by cell key,
+    so each cell's occupants are one contiguous run, plus each node's
+    cell_bounds and level.
+    """
+    level = node_levels(r, cell)
+    bounds = cell_bounds(x, y, r, cell)
+    keys, nodes = cell_entries(np.arange(len(x)), bounds, level)
+    return keys, nodes, bounds, level
+
+
+def update_cell_index(
+    index: tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...], np.ndarray],
+    x: np.ndarray,
+    y: np.ndarray,
+    r: np.ndarray,
+    cell: float,
+    candidates: np.ndarray,
+) -> tuple[tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...], np.ndarray], int]:
+    """Re-index the `candidates` (nodes that may have moved) whose cells changed.
+
+    Their bounds are updated in place; the nodes whose cells at their own
+    level changed have their old entries dropped and their new ones merged
+    into the sorted entries, so a step that moves few nodes across cells
+    costs a copy rather than a full sort. Returns (index, number of nodes
+    re-indexed).
+    """
+    keys, nodes, bounds, level = index
+    new_bounds = cell_bounds(x[candidates], y[candidates], r[candidates], cell)
+    shift = level[candidates]
+    differs = np.zeros(len(candidates), dtype=bool)
+    for old, new in zip(bounds, new_bounds):
+        differs |= (old[candidates] >> shift) != (new >> shift)
+        old[candidates] = new
+    changed = candidates[differs]
+    if len(changed) == 0:
+        return index, 0
+
+    moved = np.zeros(len(x), dtype=bool)
+    moved[changed] = True
+    keep = ~moved[nodes]
+    keys, nodes = keys[keep], nodes[keep]
+    add_keys, add_nodes = cell_entries(changed, bounds, level)
+    at = np.searchsorted(keys, add_keys)
+    keys = np.insert(keys, at, add_keys)
+    nodes = np.insert(nodes, at, add_nodes)
+    return (keys, nodes, bounds, level), len(changed)
+
+
+def rect_entries(
+    keys: np.ndarray,
+    level: int,
+    rect: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Index entries in the cells of each query rectangle of one grid level.
+
+    A rectangle's cells in one column have consecutive keys, so each column
+    is one binary search for either end. Returns (query, position) pairs.
+    """
+    cx_min, cx_max, cy_min, cy_max = rect
+    width = cx_max - cx_min + 1
+    query = np.repeat(np.arange(len(cx_min)), width)
+    cx = cx_min[query] + (
+        np.arange(width.sum()) - np.repeat(np.cumsum(width) - width, width)
+    )
+    lo = np.searchsorted(keys, cell_keys(level, cx, cy_min[query]), side="left")
+    hi = np.searchsorted(keys, cell_keys(level, cx, cy_max[query]), side="right")
+    counts = hi - lo
+    position = np.repeat(lo, counts) + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    return np.repeat(query, counts), position
+
+
+def level_pairs(
+    index: tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...], np.ndarray],
+    queries: np.ndarray,
+    level: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(query node, node of `level`) pairs whose bboxes share a cell of `level`.
+
+    Two nodes whose bboxes share several cells share a rectangle of them, so
+    a pair is kept only in the lowest cell they share; that makes it unique.
+    """
+    keys, nodes, bounds, _ = index
+    rect = level_rect(bounds, queries, level)
+    query, position = rect_entries(keys, level, rect)
+    i = queries[query]
+    j = nodes[position]
+    lowest = cell_keys(
+        level,
+        np.maximum(rect[0][query], bounds[0][j] >> level),
+        np.maximum(rect[2][query], bounds[2][j] >> level),
+    )
+    keep = (lowest == keys[position]) & (i != j)
+    return i[keep], j[keep]
+
+
+def level_members(level: np.ndarray, nodes: np.ndarray) -> list[np.ndarray]:
+    """`nodes` split by level, indexable by level."""
+    return np.split(
+        nodes[np.argsort(level[nodes], kind="stable")],
+        np.cumsum(np.bincount(level[nodes], minlength=level.max() + 1)),
+    )
+
+
+def index_pairs(
+    index: tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...], np.ndarray],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Unique (i < j) node pairs whose bboxes share a cell of the index.
+
+    Nodes of the same level pair up within each cell's run. Across two levels,
+    the side with fewer cells to look up is looked up in the other's grid:
+    usually the fine nodes (2×2 coarse cells each), but the coarse ones when
+    there are few of them, so a few hubs never cost a lookup per small node.
+    """
+    keys, nodes, (cx_min, _, cy_min, _), level = index
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    run_end = np.repeat(ends, ends - starts)
+    position = np.arange(len(keys))
+    counts = run_end - position - 1
+    first = np.repeat(position, counts)
+    second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second += first + 1
+
+    i = nodes[first]
+    j = nodes[second]
+    shift = level[i]
+    lowest = cell_keys(
+        shift,
+        np.maximum(cx_min[i], cx_min[j]) >> shift,
+        np.maximum(cy_min[i], cy_min[j]) >> shift,
+    )
+    keep = lowest == keys[first]
+    pairs_i = [i[keep]]
+    pairs_j = [j[keep]]
+
+    members = level_members(level, np.arange(len(level)))
+    levels = np.flatnonzero(np.bincount(level))
+    for k, fine in enumerate(levels):
+        for coarse in levels[k + 1 :]:
+            if len(members[coarse]) << (coarse - fine) < len(members[fine]):
+                i, j = level_pairs(index, members[coarse], int(fine))
+            else:
+                i, j = level_pairs(index, members[fine], int(coarse))
+            pairs_i.append(i)
+            pairs_j.append(j)
+
+    i = np.concatenate(pairs_i)
+    j = np.concatenate(pairs_j)
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def active_pairs(
+    index: tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...], np.ndarray],
+    active: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Unique (i < j) node pairs sharing a cell with at least one node `active`.
+
+    Looks up the active nodes' cells by binary search, so the cost follows the
+    active nodes and their cells' occupants rather than the whole index. An
+    active node is looked up in the grid of every level from its own; a pair
+    of two active nodes is kept from one side only.
+    """
+    level = index[3]
+    is_active = np.zeros(len(level), dtype=bool)
+    is_active[active] = True
+    members = level_members(level, active)
+    levels = np.flatnonzero(np.bincount(level))
+    pairs_i = []
+    pairs_j = []
+    for k, fine in enumerate(levels):
+        i, j = level_pairs(index, members[fine], int(fine))
+        keep = ~is_active[j] | (i < j)
+        pairs_i.append(i[keep])
+        pairs_j.append(j[keep])
+
+        for coarse in levels[k + 1 :]:
+            i, j = level_pairs(index, members[fine], int(coarse))
+            pairs_i.append(i)
+            pairs_j.append(j)
+
+            # Active coarse nodes take their pairs with the inactive fine ones
+            i, j = level_pairs(index, members[coarse], int(fine))
+            keep = ~is_active[j]
+            pairs_i.append(i[keep])
+            pairs_j.append(j[keep])
+
+    i = np.concatenate(pairs_i)
+    j = np.concatenate(pairs_j)
+    return np.minimum(i, j), np.maximum(i, j)
+
 
 def candidate_pairs(
     x: np.ndarray, y: np.ndarray, r: np.ndarray, cell: float
@@ -23,52 +316,58 @@ def candidate_pairs(
     bboxes ⇒ a shared cell, for any cell size). The caller applies the exact
     circle test.
     """
-    n = len(x)
-    base = pl.DataFrame(
-        {"i": np.arange(n, dtype=np.int64), "x": x, "y": y, "r": r}
-    ).with_columns(
-        ((pl.col("x") - pl.col("r")) / cell).floor().cast(pl.Int32).alias("cx_min"),
-        ((pl.col("x") + pl.col("r")) / cell).floor().cast(pl.Int32).alias("cx_max"),
-        ((pl.col("y") - pl.col("r")) / cell).floor().cast(pl.Int32).alias("cy_min"),
-        ((pl.col("y") + pl.col("r")) / cell).floor().cast(pl.Int32).alias("cy_max"),
-    )
-    exploded = (
-        base.with_columns(
-            pl.int_ranges(pl.col("cx_min"), pl.col("cx_max") + 1).alias("cx")
-        )
-        .explode("cx")
-        .with_columns(pl.int_ranges(pl.col("cy_min"), pl.col("cy_max") + 1).alias("cy"))
-        .explode("cy")
-        .select(["i", "cx", "cy"])
-    )
-    pairs = (
-        exploded.join(exploded, on=["cx", "cy"], suffix="_j")
-        .filter(pl.col("i") < pl.col("i_j"))
-        .select("i", pl.col("i_j").alias("j"))
-        .unique()
-    )
-    return pairs["i"].to_numpy(), pairs["j"].to_numpy()
+    return index_pairs(build_cell_index(x, y, r, cell))
 
 
-def relax(x: np.ndarray, y: np.ndarray, r: np.ndarray) -> None:
-    """Push overlapping nodes apart in place until none overlap."""
+def relax(
+    x: np.ndarray,
+    y: np.ndarray,
+    r: np.ndarray,
+    max_iters: int = MAX_ITERS,
+    verbose: bool = True,
+    solver: str = SOLVER,
+    trace: list[dict] | None = None,
+) -> int:
+    """Push overlapping nodes apart in place until none overlap.
+
+    Appends a record per iteration to `trace` when given. Returns the number
+    of overlaps left after `max_iters` iterations.
+    """
+    if solver not in ("jacobi", "momentum"):
+        raise ValueError(f"Unknown solver {solver!r}")
     n = len(x)
 
     # The target separation per pair includes the padding, so size the detection
     # grid (and the bbox explode) to the padded radii — no near pair is missed.
     r_pad = r * (1.0 + SEPARATION_PADDING)
-    # Small enough that most nodes sit alone in a cell, but floored so the
-    # biggest node spans at most ~64 cells across its diameter.
-    cell = max(2.0 * float(np.median(r_pad)), float(r_pad.max()) / 32.0)
-    logger.info(
-        f"{n:,} nodes, grid cell = {cell:.3f} "
-        f"(r median={np.median(r):.3f}, max={r.max():.3f}), "
-        f"damping={DAMPING}, padding={SEPARATION_PADDING:.0%}"
-    )
+    cell = grid_cell(r_pad)
+    if verbose:
+        logger.info(
+            f"{n:,} nodes, grid cell = {cell:.3f} "
+            f"(r median={np.median(r):.3f}, max={r.max():.3f}), "
+            f"{solver} solver, padding={SEPARATION_PADDING:.0%}"
+        )
 
+    # Built once; each iteration re-indexes only the nodes that changed cells.
+    # Only pairs with a node that moved in the last step can start or still
+    # overlap, so each iteration after the first tests just those: the active
+    # set shrinks with the remaining overlaps.
+    index = build_cell_index(x, y, r_pad, cell)
+    active = np.arange(n)
+    n_reindexed = n
     n_overlap = 0
-    for it in range(1, MAX_ITERS + 1):
-        i, j = candidate_pairs(x, y, r_pad, cell)
+
+    # Each node's last move; zero unless it moved in the previous step
+    last_dx = np.zeros(n)
+    last_dy = np.zeros(n)
+    last_moved = np.zeros(0, dtype=np.int64)
+
+    for it in range(1, max_iters + 1):
+        start = time.perf_counter()
+        if len(active) > FULL_SCAN_ACTIVE_FRACTION * n:
+            i, j = index_pairs(index)
+        else:
+            i, j = active_pairs(index, active)
         dx = x[i] - x[j]
         dy = y[i] - y[j]
         d = np.hypot(dx, dy)
@@ -77,17 +376,35 @@ def relax(x: np.ndarray, y: np.ndarray, r: np.ndarray) -> None:
         # the push, so nodes are nudged a hair past touching.
         true_pen = (r[i] + r[j]) - d
         n_overlap = int((true_pen > 0).sum())
+        max_pen = float(true_pen.max()) if n_overlap else 0.0
+        record = {
+            "iteration": it,
+            "overlaps": n_overlap,
+            "max_penetration": max_pen,
+            "active": len(active),
+        }
         if n_overlap == 0:
-            logger.success(f"iter {it}: no overlaps remain")
-            return
-        logger.info(
-            f"iter {it}: {n_overlap:,} overlaps, max pen = {true_pen.max():.4f}"
-        )
+            if trace is not None:
+                record |= {
+                    "mean_displacement": 0.0,
+                    "max_displacement": 0.0,
+                    "seconds": time.perf_counter() - start,
+                }
+                trace.append(record)
+            if verbose:
+                logger.success(f"iter {it}: no overlaps remain")
+            return 0
+        if verbose:
+            logger.info(
+                f"iter {it}: {n_overlap:,} overlaps, "
+                f"max pen = {max_pen:.4f}, {len(active):,} active, "
+                f"{n_reindexed:,} nodes re-indexed"
+            )
 
         pad_pen = (r_pad[i] + r_pad[j]) - d
-        active = pad_pen > 0
-        i, j = i[active], j[active]
-        dx, dy, d, pad_pen = dx[active], dy[active], d[active], pad_pen[active]
+        pushed = pad_pen > 0
+        i, j = i[pushed], j[pushed]
+        dx, dy, d, pad_pen = dx[pushed], dy[pushed], d[pushed], pad_pen[pushed]
 
         # Unit push direction from j toward i. Coincident centers (d≈0) have no
         # defined direction — the analysis finds none, but give them a random
@@ -105,30 +422,195 @@ def relax(x: np.ndarray, y: np.ndarray, r: np.ndarray) -> None:
         # hub barely budges. The two weights sum to 1, so a damping of 1 would
         # separate the pair exactly in one step.
         rs = r_pad[i] + r_pad[j]
-        step = DAMPING * pad_pen
-        mi = step * (r_pad[j] / rs)
-        mj = step * (r_pad[i] / rs)
+        mi = pad_pen * (r_pad[j] / rs)
+        mj = pad_pen * (r_pad[i] / rs)
 
-        # Jacobi update: accumulate every pair's contribution per node, apply once.
-        x += np.bincount(i, mi * ux, n) - np.bincount(j, mj * ux, n)
-        y += np.bincount(i, mi * uy, n) - np.bincount(j, mj * uy, n)
+        # Jacobi update: accumulate every pair's contribution per node, apply
+        # once. Only the pushed nodes move; they are the next active set.
+        active, inverse = np.unique(np.concatenate([i, j]), return_inverse=True)
+        pi, pj = inverse[: len(i)], inverse[len(i) :]
+        k = len(active)
+        mx = np.bincount(pi, mi * ux, k) - np.bincount(pj, mj * ux, k)
+        my = np.bincount(pi, mi * uy, k) - np.bincount(pj, mj * uy, k)
 
-    logger.warning(f"Hit MAX_ITERS={MAX_ITERS} with {n_overlap:,} overlaps remaining")
+        if solver == "momentum":
+            vx, vy = last_dx[active], last_dy[active]
+            reverses = vx * mx + vy * my < 0
+            vx[reverses] = 0.0
+            vy[reverses] = 0.0
+            mx = MOMENTUM * vx + MOMENTUM_DAMPING * mx
+            my = MOMENTUM * vy + MOMENTUM_DAMPING * my
+        else:
+            mx *= DAMPING
+            my *= DAMPING
+        last_dx[last_moved] = 0.0
+        last_dy[last_moved] = 0.0
+        last_dx[active], last_dy[active] = mx, my
+        last_moved = active
+
+        x[active] += mx
+        y[active] += my
+        index, n_reindexed = update_cell_index(index, x, y, r_pad, cell, active)
+        if trace is not None:
+            moved = np.hypot(mx, my)
+            record |= {
+                "mean_displacement": float(moved.mean()),
+                "max_displacement": float(moved.max()),
+                "seconds": time.perf_counter() - start,
+            }
+            trace.append(record)
+
+    if verbose:
+        logger.warning(
+            f"Hit max_iters={max_iters} with {n_overlap:,} overlaps remaining"
+        )
+    return n_overlap
+
+
+def spatial_tiles(
+    x: np.ndarray, y: np.ndarray, tiles_per_side: int
+) -> list[tuple[np.ndarray, tuple[float, float, float, float]]]:
+    """Cut the nodes into tiles of about equal count: columns by x quantile,
+    then rows by y quantile within each column.
+
+    Returns (owned nodes, (x0, x1, y0, y1) bounds) per tile.
+    """
+    fractions = np.linspace(0, 1, tiles_per_side + 1)[1:-1]
+    x_cuts = np.r_[-np.inf, np.quantile(x, fractions), np.inf]
+    column = np.searchsorted(x_cuts[1:-1], x, side="right")
+    tiles = []
+    for c in range(tiles_per_side):
+        in_column = np.flatnonzero(column == c)
+        if len(in_column) == 0:
+            continue
+        y_cuts = np.r_[-np.inf, np.quantile(y[in_column], fractions), np.inf]
+        row = np.searchsorted(y_cuts[1:-1], y[in_column], side="right")
+        for k in range(tiles_per_side):
+            owned = in_column[row == k]
+            if len(owned):
+                bounds = (x_cuts[c], x_cuts[c + 1], y_cuts[k], y_cuts[k + 1])
+                tiles.append((owned, bounds))
+    return tiles
+
+
+def relax_tile(
+    names: tuple[str, ...],
+    n: int,
+    owned: np.ndarray,
+    region: np.ndarray,
+    max_iters: int,
+) -> int:
+    """Relax one tile's region (owned + halo nodes) and write back the owned.
+
+    Runs in a worker process on the shared arrays named `names`: it reads the
+    round's x/y/r, relaxes for up to `max_iters` iterations and writes its
+    owned nodes into the next round's x/y, so tiles never see each other's
+    half-finished moves. Returns the overlaps left in the region.
+    """
+    blocks = [SharedMemory(name=name, track=False) for name in names]
+    try:
+        x, y, r, x_next, y_next = (
+            np.ndarray(n, dtype=np.float64, buffer=b.buf) for b in blocks
+        )
+        xs, ys = x[region], y[region]
+        remaining = relax(xs, ys, r[region], max_iters, verbose=False)
+        own = np.isin(region, owned, assume_unique=True)
+        x_next[region[own]] = xs[own]
+        y_next[region[own]] = ys[own]
+        del x, y, r, x_next, y_next
+    finally:
+        for b in blocks:
+            b.close()
+    return remaining
+
+
+def relax_partitioned(
+    x: np.ndarray, y: np.ndarray, r: np.ndarray, trace: list[dict] | None = None
+) -> None:
+    """relax() run tile by tile in parallel worker processes, then serially.
+
+    Nodes that only ever meet across tile boundaries, and whatever the rounds
+    leave, are resolved by the final serial relax, which stops at once when
+    the tiles already cleared everything. Only that relax is traced.
+    """
+    n = len(x)
+    halo = 2 * float(r.max()) * (1.0 + SEPARATION_PADDING)
+    logger.info(
+        f"Relaxing {n:,} nodes over {TILES_PER_SIDE}x{TILES_PER_SIDE} tiles, "
+        f"halo {halo:.3f}"
+    )
+
+    blocks = [SharedMemory(create=True, size=n * 8) for _ in range(5)]
+    try:
+        xs, ys, rs, xs_next, ys_next = (
+            np.ndarray(n, dtype=np.float64, buffer=b.buf) for b in blocks
+        )
+        xs[:], ys[:], rs[:] = x, y, r
+        names = tuple(b.name for b in blocks)
+        with Parallel(n_jobs=-1, backend="loky") as parallel:
+            for round_ in range(1, PARTITION_ROUNDS + 1):
+                jobs = []
+                for owned, (x0, x1, y0, y1) in spatial_tiles(xs, ys, TILES_PER_SIDE):
+                    region = np.flatnonzero(
+                        (xs >= x0 - halo)
+                        & (xs < x1 + halo)
+                        & (ys >= y0 - halo)
+                        & (ys < y1 + halo)
+                    )
+                    jobs.append(
+                        delayed(relax_tile)(
+                            names, n, owned, region, PARTITION_ROUND_ITERS
+                        )
+                    )
+                remaining = parallel(jobs)
+                xs[:], ys[:] = xs_next, ys_next
+                n_overlap = sum(remaining)
+                logger.info(
+                    f"round {round_}: {n_overlap:,} overlaps left in tile regions"
+                )
+                if n_overlap == 0:
+                    break
+        x[:], y[:] = xs, ys
+        del xs, ys, rs, xs_next, ys_next
+    finally:
+        for b in blocks:
+            b.close()
+            b.unlink()
+
+    relax(x, y, r, trace=trace)
+
+
+def rounded_overlaps(x: pl.Series, y: pl.Series, r: np.ndarray) -> int:
+    """Overlapping pairs among nodes at x/y as stored (e.g. rounded to float32)."""
+    xf = x.cast(pl.Float64).to_numpy()
+    yf = y.cast(pl.Float64).to_numpy()
+    r_pad = r * (1.0 + SEPARATION_PADDING)
+    vi, vj = candidate_pairs(xf, yf, r_pad, grid_cell(r_pad))
+    return int(((r[vi] + r[vj]) - np.hypot(xf[vi] - xf[vj], yf[vi] - yf[vj]) > 0).sum())
 
 
 def remove_overlaps(nodes: pl.DataFrame) -> pl.DataFrame:
     """Return nodes with x/y nudged until no two node circles overlap.
 
-    Relaxes in float64, then verifies the values are still overlap-free once
-    rounded back to the stored x/y dtype (float32 rounding near the world edge
-    can be comparable to the smallest gaps).
+    Relaxes in float64, tracing each iteration to RELAX_TRACE_PATH, then
+    verifies the values are still overlap-free once rounded back to the stored
+    x/y dtype (float32 rounding near the world edge can be comparable to the
+    smallest gaps).
     """
     x = nodes["x"].cast(pl.Float64).to_numpy().copy()
     y = nodes["y"].cast(pl.Float64).to_numpy().copy()
     r = nodes["radius"].cast(pl.Float64).to_numpy()
     x0, y0 = x.copy(), y.copy()
 
-    relax(x, y, r)
+    trace = []
+    if PARTITIONED_RELAX:
+        relax_partitioned(x, y, r, trace)
+    else:
+        relax(x, y, r, trace=trace)
+    RELAX_TRACE_PATH.write_text(json.dumps(trace, indent=2))
+    logger.info(
+        f"Wrote {len(trace)} iterations of relax telemetry to {RELAX_TRACE_PATH}"
+    )
 
     disp = np.hypot(x - x0, y - y0)
     logger.info(
@@ -140,14 +622,7 @@ def remove_overlaps(nodes: pl.DataFrame) -> pl.DataFrame:
     dtype = nodes["x"].dtype
     x_out = pl.Series("x", x).cast(dtype)
     y_out = pl.Series("y", y).cast(dtype)
-    xf = x_out.cast(pl.Float64).to_numpy()
-    yf = y_out.cast(pl.Float64).to_numpy()
-    r_pad = r * (1.0 + SEPARATION_PADDING)
-    cell = max(2.0 * float(np.median(r_pad)), float(r_pad.max()) / 32.0)
-    vi, vj = candidate_pairs(xf, yf, r_pad, cell)
-    residual = int(
-        ((r[vi] + r[vj]) - np.hypot(xf[vi] - xf[vj], yf[vi] - yf[vj]) > 0).sum()
-    )
+    residual = rounded_overlaps(x_out, y_out, r)
     if residual:
         logger.warning(f"{residual:,} overlaps remain after {dtype} rounding")
     else:
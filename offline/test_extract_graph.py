@@ -0,0 +1,216 @@
+import html
+
+import numpy as np
+import polars as pl
+import pytest
+from loguru import logger
+
+from offline.bench_extract_links import (
+    fused_extract_pages,
+    legacy_extract_pages,
+    load_golden_corpus,
+)
+from offline.extract_graph import (
+    REDIRECT_MAX_HOPS,
+    extract_pages,
+    redirect_target,
+    resolve_redirect_chains,
+    scan_links,
+)
+
+
+@pytest.fixture
+def warnings():
+    """Messages logged at WARNING or above while the test runs."""
+    messages: list[str] = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(sink)
+
+
+def redirects(*pairs: tuple[str, str]) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "title": [a for a, _ in pairs],
+            "redirect_target": [b for _, b in pairs],
+        }
+    )
+
+
+def chain(length: int, prefix: str = "") -> list[tuple[str, str]]:
+    """R0 -> R1 -> ... -> R{length}, with R{length} not a redirect."""
+    return [(f"{prefix}R{k}", f"{prefix}R{k + 1}") for k in range(length)]
+
+
+def resolved(df: pl.DataFrame) -> dict[str, tuple[str | None, int | None]]:
+    return {alias: (target, hops) for alias, target, hops in df.iter_rows()}
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 7, REDIRECT_MAX_HOPS])
+def test_chain_collapses_to_its_end(length, warnings):
+    out = resolved(resolve_redirect_chains(redirects(*chain(length))))
+    assert out == {f"R{k}": (f"R{length}", length - k) for k in range(length)}
+    assert warnings == []
+
+
+def test_chains_sharing_a_tail():
+    out = resolved(
+        resolve_redirect_chains(redirects(("A", "C"), ("B", "C"), ("C", "D")))
+    )
+    assert out == {"A": ("D", 2), "B": ("D", 2), "C": ("D", 1)}
+
+
+def test_missing_target_is_kept(warnings):
+    # Whether the target exists is settled when edges are resolved, not here
+    out = resolved(resolve_redirect_chains(redirects(("A", "B"), ("B", "Nowhere"))))
+    assert out == {"A": ("Nowhere", 2), "B": ("Nowhere", 1)}
+    assert warnings == []
+
+
+def test_self_redirect_is_reported(warnings):
+    out = resolved(resolve_redirect_chains(redirects(("A", "A"), ("B", "C"))))
+    assert out == {"A": (None, None), "B": ("C", 1)}
+    assert len(warnings) == 1
+    assert "1 redirects are cyclic" in warnings[0]
+    assert "A" in warnings[0]
+
+
+@pytest.mark.parametrize("length", [2, 3, 5, 16])
+def test_cycle_is_reported(length, warnings):
+    cycle = [(f"C{k}", f"C{(k + 1) % length}") for k in range(length)]
+    out = resolved(resolve_redirect_chains(redirects(*cycle)))
+    assert out == {f"C{k}": (None, None) for k in range(length)}
+    assert len(warnings) == 1
+    assert f"{length} redirects are cyclic" in warnings[0]
+
+
+def test_chain_into_a_cycle_is_cyclic(warnings):
+    out = resolved(
+        resolve_redirect_chains(
+            redirects(("A", "B"), ("B", "C"), ("C", "D"), ("D", "C"), ("E", "F"))
+        )
+    )
+    assert out == {
+        "A": (None, None),
+        "B": (None, None),
+        "C": (None, None),
+        "D": (None, None),
+        "E": ("F", 1),
+    }
+    assert len(warnings) == 1
+    assert "4 redirects are cyclic" in warnings[0]
+
+
+def test_too_long_chain_is_reported(warnings):
+    length = REDIRECT_MAX_HOPS + 2
+    out = resolved(resolve_redirect_chains(redirects(*chain(length))))
+
+    # Only the aliases more than REDIRECT_MAX_HOPS from the end are dropped;
+    # they keep their hop count so the report can say how far off they were
+    assert out == {
+        f"R{k}": (None if length - k > REDIRECT_MAX_HOPS else f"R{length}", length - k)
+        for k in range(length)
+    }
+    assert len(warnings) == 1
+    assert "2 redirect chains exceed" in warnings[0]
+
+
+def test_long_chains_mixed_with_cycles(warnings):
+    pairs = chain(REDIRECT_MAX_HOPS + 1, "L") + chain(3, "S") + [("Z", "Z")]
+    out = resolved(resolve_redirect_chains(redirects(*pairs)))
+    assert out["LR0"] == (None, REDIRECT_MAX_HOPS + 1)
+    assert out["LR1"] == (f"LR{REDIRECT_MAX_HOPS + 1}", REDIRECT_MAX_HOPS)
+    assert out["SR0"] == ("SR3", 3)
+    assert out["Z"] == (None, None)
+    assert len(warnings) == 2
+
+
+def links(text: str) -> list[str]:
+    """scan_links on `text` escaped as in the dump."""
+    return list(scan_links(html.escape(text)))
+
+
+def test_golden_corpus_matches_legacy_rules():
+    pages_text = load_golden_corpus()
+    legacy_pages, legacy_links = legacy_extract_pages(pages_text)
+    fused_pages, fused_links = fused_extract_pages(pages_text)
+    assert fused_pages == legacy_pages
+    assert fused_links == legacy_links
+
+
+def test_links_stop_at_a_truncating_header():
+    assert links("[[A]]\n== References ==\n[[B]]") == ["A"]
+    assert links("[[A]]\n== See also ==\n[[B]]") == ["A", "B"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "[[Open|label\n== References ==\n[[B]] [[C]]",
+        "[[Open#anchor\n== Notes ==\n]] [[C]]",
+        "[[Open==Notes==]] [[C]]",
+    ],
+)
+def test_open_link_does_not_cross_a_truncating_header(text):
+    assert links(text) == []
+
+
+def test_ref_in_a_label_is_skipped():
+    assert links("[[A|x<ref>[http://example.com y] z</ref> w]] [[B]]") == ["A", "B"]
+    assert links("[[A|x<ref name=n>== Notes ==</ref>]] [[B]]") == ["A", "B"]
+
+
+def test_refs_are_skipped():
+    assert links("[[A]]<ref>[[Publisher]]</ref><ref name=x /> [[B]]") == ["A", "B"]
+
+
+@pytest.mark.parametrize(
+    ("text", "legacy", "fused"),
+    [
+        # The legacy rules stripped refs before anything else, so a ref inside
+        # a link's title or a header's name was spliced out and the halves
+        # joined up. The fused scan leaves them apart, as MediaWiki renders them.
+        ("[[Fo<ref>x</ref>o]] [[B]]", ["Foo", "B"], ["B"]),
+        ("[[A]]\n== Refer<ref name=x/>ences ==\n[[B]]", ["A"], ["A", "B"]),
+    ],
+)
+def test_ref_splitting_a_title_or_header_is_not_stitched(text, legacy, fused):
+    _, legacy_links = legacy_extract_pages([("Page", 1, html.escape(text))])
+    assert [target for _, target in legacy_links] == legacy
+    assert links(text) == fused
+
+
+@pytest.mark.parametrize(
+    ("text", "target"),
+    [
+        ("#REDIRECT [[United states]]", "United states"),
+        ("#redirect[[rock music#History]]", "Rock music"),
+        ("<ref>x</ref>#REDIRECT [[Behind ref]]", "Behind ref"),
+        ("#REDIRECT [[AT&T]]", "AT&T"),
+        ("x" * 300 + "#REDIRECT [[Too late]]", None),
+        ("[[A]]\n== References ==\n#REDIRECT [[Cut]]", None),
+    ],
+)
+def test_redirect_target(text, target):
+    assert redirect_target(html.escape(text)) == target
+
+
+def test_unchanged_revisions_skip_link_extraction():
+    pages_text = [
+        ("Kept", 7, "[[A]] [[B]]"),
+        ("Edited", 8, "[[C]]"),
+        ("Alias", 7, "#REDIRECT [[Kept]]"),
+    ]
+    title_ids: dict[str, int] = {}
+    pages, src, dst = extract_pages(pages_text, title_ids, np.array([3, 7]))
+    assert pages == [
+        ("Kept", False, None, 7),
+        ("Edited", False, None, 8),
+        ("Alias", True, "Kept", 7),
+    ]
+    titles = list(title_ids)
+    assert [(titles[s], titles[d]) for s, d in zip(src, dst)] == [("Edited", "C")]
+
+    # Without previous revisions every article is scanned
+    _, src, _ = extract_pages(pages_text, {})
+    assert len(src) == 3
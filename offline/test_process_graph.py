@@ -0,0 +1,105 @@
+import numpy as np
+import polars as pl
+import pytest
+from loguru import logger
+
+import offline.process_graph as process_graph
+from offline.process_graph import incremental_start
+
+
+@pytest.fixture
+def warnings():
+    """Messages logged at WARNING or above while the test runs."""
+    messages: list[str] = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(sink)
+
+
+@pytest.fixture
+def previous_map(tmp_path, monkeypatch):
+    """Write 10 linked articles, and a previous map holding the given titles."""
+    nodes_path = tmp_path / "extracted_nodes.parquet"
+    previous_path = tmp_path / "previous_enriched_nodes.parquet"
+    monkeypatch.setattr(process_graph, "NODES_INPUT_PATH", nodes_path)
+    monkeypatch.setattr(process_graph, "PREVIOUS_ENRICHED_NODES_PATH", previous_path)
+    pl.DataFrame(
+        {"id": pl.Series(range(10), dtype=pl.UInt32), "title": list("ABCDEFGHIJ")}
+    ).write_parquet(nodes_path)
+
+    def write(titles: str) -> None:
+        pl.DataFrame(
+            {
+                "title": list(titles),
+                "x": [float(k) for k in range(len(titles))],
+                "y": [float(k * k) for k in range(len(titles))],
+            },
+            schema={"title": pl.String, "x": pl.Float32, "y": pl.Float32},
+        ).write_parquet(previous_path)
+
+    return write
+
+
+def ring_edges() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "src": pl.Series(range(10), dtype=pl.UInt32),
+            "dst": pl.Series([(k + 1) % 10 for k in range(10)], dtype=pl.UInt32),
+        }
+    )
+
+
+@pytest.mark.parametrize("titles", ["", "XYZ", "AB"])
+def test_incremental_start_falls_back_when_too_few_titles_match(
+    titles, previous_map, warnings
+):
+    previous_map(titles)
+    assert incremental_start(ring_edges()) is None
+    assert len(warnings) == 1
+    assert "laying out from scratch" in warnings[0]
+
+
+def test_incremental_start_places_every_node(previous_map, warnings):
+    previous_map("ABCDEFG")
+    pos = incremental_start(ring_edges())
+    assert pos is not None
+    assert pos.height == 10
+    assert pos["x"].null_count() == pos["y"].null_count() == 0
+    assert warnings == []
+
+
+def positions(pos: pl.DataFrame) -> np.ndarray:
+    """(10, 2) x, y of vertices 0..9."""
+    return pos.sort("vertex").select("x", "y").to_numpy()
+
+
+def test_carried_nodes_keep_their_previous_positions(previous_map):
+    # Previous positions are listed by title in reverse, so A (id 0) was at (6, 36)
+    previous_map("GFEDCBA")
+    pos = positions(incremental_start(ring_edges()))
+    previous = np.c_[np.arange(6, -1, -1), np.arange(6, -1, -1) ** 2].astype(float)
+
+    # One shift and one scale map the whole previous layout into layout units
+    scale = (pos[1] - pos[0]) / (previous[1] - previous[0])
+    assert scale[0] == pytest.approx(scale[1]) and scale[0] > 0
+    np.testing.assert_allclose(
+        pos[:7], (previous - previous[0]) * scale + pos[0], atol=1e-9
+    )
+
+
+def test_new_nodes_start_at_their_placed_neighbors_centroid(previous_map, monkeypatch):
+    monkeypatch.setattr(process_graph, "INCREMENTAL_PLACEMENT_JITTER", 0.0)
+    previous_map("ABCDEFG")
+    # A..G in a ring; H links A and B, I links C and D, and J links only H
+    src, dst = np.array(
+        [(k, (k + 1) % 7) for k in range(7)] + [(7, 0), (7, 1), (8, 2), (8, 3), (9, 7)]
+    ).T
+    edges = pl.DataFrame(
+        {"src": pl.Series(src, dtype=pl.UInt32), "dst": pl.Series(dst, dtype=pl.UInt32)}
+    )
+    pos = positions(incremental_start(edges))
+
+    np.testing.assert_allclose(pos[7], pos[[0, 1]].mean(axis=0))
+    np.testing.assert_allclose(pos[8], pos[[2, 3]].mean(axis=0))
+    # J is placed in the second round, from H
+    np.testing.assert_allclose(pos[9], pos[7])
@@ -0,0 +1,307 @@
+import itertools
+import json
+
+import numpy as np
+import polars as pl
+import pytest
+from loguru import logger
+
+import offline.remove_overlaps as remove_overlaps
+from offline.bench_remove_overlaps import dense_clusters
+from offline.remove_overlaps import (
+    CELL_OFFSET,
+    MAX_ITERS,
+    SEPARATION_PADDING,
+    active_pairs,
+    build_cell_index,
+    candidate_pairs,
+    cell_bounds,
+    cell_keys,
+    grid_cell,
+    node_levels,
+    relax,
+    relax_partitioned,
+    rounded_overlaps,
+    spatial_tiles,
+    update_cell_index,
+)
+
+
+def mixed_nodes(n: int, seed: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(x, y, r) of clustered circles on both sides of both axes.
+
+    Lognormal radii plus a few hubs up to 100× the median, so the nodes spread
+    over several radius classes, and one cluster straddles the origin.
+    """
+    rng = np.random.default_rng(seed)
+    r = rng.lognormal(0.0, 0.5, n)
+    r[rng.choice(n, n // 50, replace=False)] *= rng.uniform(5, 100, n // 50)
+    centers = np.r_[[[0.0, 0.0]], rng.uniform(-300, 300, (5, 2))]
+    cluster = rng.integers(len(centers), size=n)
+    xy = centers[cluster] + rng.normal(0, 25, (n, 2))
+    return xy[:, 0].copy(), xy[:, 1].copy(), r
+
+
+def pair_set(i: np.ndarray, j: np.ndarray) -> set[tuple[int, int]]:
+    return set(zip(i.tolist(), j.tolist()))
+
+
+def brute_force_bounds(
+    x: np.ndarray, y: np.ndarray, r: np.ndarray, cell: float
+) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
+    """(pairs whose bboxes overlap, pairs whose cells meet at either's level).
+
+    Every candidate pair set must contain the first; any pair outside the
+    second shares no cell of the index.
+    """
+    i, j = np.triu_indices(len(x), k=1)
+    bboxes_overlap = (np.abs(x[i] - x[j]) <= r[i] + r[j]) & (
+        np.abs(y[i] - y[j]) <= r[i] + r[j]
+    )
+    level = node_levels(r, cell)
+    shift = np.maximum(level[i], level[j])
+    cx_min, cx_max, cy_min, cy_max = cell_bounds(x, y, r, cell)
+    cells_meet = (
+        ((cx_min[i] >> shift) <= (cx_max[j] >> shift))
+        & ((cx_min[j] >> shift) <= (cx_max[i] >> shift))
+        & ((cy_min[i] >> shift) <= (cy_max[j] >> shift))
+        & ((cy_min[j] >> shift) <= (cy_max[i] >> shift))
+    )
+    return pair_set(i[bboxes_overlap], j[bboxes_overlap]), pair_set(
+        i[cells_meet], j[cells_meet]
+    )
+
+
+def overlapping_pairs(
+    x: np.ndarray, y: np.ndarray, r: np.ndarray
+) -> set[tuple[int, int]]:
+    """Every (i < j) pair of overlapping circles, by brute force."""
+    i, j = np.triu_indices(len(x), k=1)
+    overlap = np.hypot(x[i] - x[j], y[i] - y[j]) < r[i] + r[j]
+    return pair_set(i[overlap], j[overlap])
+
+
+def assert_unique_ordered(i: np.ndarray, j: np.ndarray) -> None:
+    assert np.all(i < j)
+    assert len(pair_set(i, j)) == len(i)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_candidate_pairs_match_brute_force(seed):
+    x, y, r = mixed_nodes(1500, seed)
+    cell = grid_cell(r)
+    assert len(np.unique(node_levels(r, cell))) >= 4
+    assert (x < 0).any() and (y < 0).any()
+
+    i, j = candidate_pairs(x, y, r, cell)
+    assert_unique_ordered(i, j)
+    lower, upper = brute_force_bounds(x, y, r, cell)
+    assert lower <= pair_set(i, j) <= upper
+
+
+@pytest.mark.parametrize("offset", [-5e5, 5e5])
+def test_candidate_pairs_far_from_the_origin(offset):
+    # Cells hundreds of thousands from zero, well inside the 29-bit keys
+    x, y, r = mixed_nodes(800, 3)
+    x += offset
+    y -= offset
+    cell = grid_cell(r)
+    i, j = candidate_pairs(x, y, r, cell)
+    assert_unique_ordered(i, j)
+    lower, upper = brute_force_bounds(x, y, r, cell)
+    assert lower <= pair_set(i, j) <= upper
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_active_pairs_match_brute_force(seed):
+    x, y, r = mixed_nodes(1500, seed)
+    cell = grid_cell(r)
+    index = build_cell_index(x, y, r, cell)
+    rng = np.random.default_rng(seed)
+    active = rng.choice(len(x), 200, replace=False)
+    # Make sure some hubs are active too
+    active = np.union1d(active, np.argsort(r)[-5:])
+
+    i, j = active_pairs(index, active)
+    assert_unique_ordered(i, j)
+    is_active = np.isin(np.arange(len(x)), active)
+    lower, upper = brute_force_bounds(x, y, r, cell)
+    lower = {(a, b) for a, b in lower if is_active[a] or is_active[b]}
+    assert lower <= pair_set(i, j) <= upper
+    assert np.all(is_active[i] | is_active[j])
+
+
+def test_updated_index_matches_a_fresh_build():
+    x, y, r = mixed_nodes(1500, 4)
+    cell = grid_cell(r)
+    index = build_cell_index(x, y, r, cell)
+    rng = np.random.default_rng(4)
+    moved = rng.choice(len(x), 300, replace=False)
+    x[moved] += rng.normal(0, 3 * cell, len(moved))
+    y[moved] -= rng.normal(0, 3 * cell, len(moved))
+
+    candidates = np.union1d(moved, rng.choice(len(x), 100, replace=False))
+    index, n_changed = update_cell_index(index, x, y, r, cell, candidates)
+    assert 0 < n_changed <= len(moved)
+    fresh = build_cell_index(x, y, r, cell)
+    assert np.array_equal(index[0], fresh[0])
+    assert pair_set(index[0], index[1]) == pair_set(fresh[0], fresh[1])
+    for updated, rebuilt in zip(index[2], fresh[2]):
+        assert np.array_equal(updated, rebuilt)
+
+
+def test_cell_keys_sort_by_level_then_column_then_row():
+    edge = CELL_OFFSET - 1
+    coords = [-CELL_OFFSET, -edge, -1, 0, 1, edge]
+    cells = sorted(itertools.product([0, 1, 63], coords, coords))
+    level, cx, cy = (np.array(c) for c in zip(*cells))
+    keys = cell_keys(level, cx, cy)
+    assert np.all(keys[1:] > keys[:-1])
+
+
+def test_relax_never_misses_an_overlap(monkeypatch):
+    # Every iteration's pairs must include every pair overlapping at the
+    # padded radii: a pair of nodes that didn't move can't have started to
+    # overlap. The active set is looked up even when it is most of the nodes.
+    monkeypatch.setattr(remove_overlaps, "FULL_SCAN_ACTIVE_FRACTION", 1.0)
+    x, y, r = dense_clusters(2000, 2)
+    r_pad = r * (1.0 + SEPARATION_PADDING)
+    n_active_lookups = 0
+
+    def checked(pairs):
+        def wrapper(*args):
+            i, j = pairs(*args)
+            assert overlapping_pairs(x, y, r_pad) <= pair_set(i, j)
+            return i, j
+
+        return wrapper
+
+    def counted(index, active):
+        nonlocal n_active_lookups
+        n_active_lookups += 1
+        return active_pairs(index, active)
+
+    monkeypatch.setattr(remove_overlaps, "active_pairs", checked(counted))
+    trace: list[dict] = []
+    assert relax(x, y, r, verbose=False, trace=trace) == 0
+
+    assert overlapping_pairs(x, y, r) == set()
+    assert n_active_lookups == len(trace)
+    # Only the nodes pushed last step stay active
+    active = [record["active"] for record in trace]
+    assert active[0] == len(x)
+    assert np.median(active[len(active) // 2 :]) < len(x) / 3
+    assert active[-1] < len(x) / 3
+
+
+def test_active_set_relax_matches_full_rescans(monkeypatch):
+    x0, y0, r = dense_clusters(2000, 2)
+    monkeypatch.setattr(remove_overlaps, "FULL_SCAN_ACTIVE_FRACTION", 1.0)
+    x, y = x0.copy(), y0.copy()
+    trace: list[dict] = []
+    relax(x, y, r, verbose=False, trace=trace)
+
+    monkeypatch.setattr(remove_overlaps, "FULL_SCAN_ACTIVE_FRACTION", -1.0)
+    full_x, full_y = x0.copy(), y0.copy()
+    full_trace: list[dict] = []
+    relax(full_x, full_y, r, verbose=False, trace=full_trace)
+
+    assert [record["overlaps"] for record in trace] == [
+        record["overlaps"] for record in full_trace
+    ]
+    np.testing.assert_allclose(x, full_x, rtol=1e-12)
+    np.testing.assert_allclose(y, full_y, rtol=1e-12)
+
+
+@pytest.mark.parametrize(("rounds", "tiles_finish"), [(2, False), (40, True)])
+def test_partitioned_relax_passes_the_float32_check(rounds, tiles_finish, monkeypatch):
+    # Short rounds over 3×3 tiles, so clearing the tiles takes many rounds;
+    # with only 2 allowed, the final serial relax finishes the job
+    monkeypatch.setattr(remove_overlaps, "TILES_PER_SIDE", 3)
+    monkeypatch.setattr(remove_overlaps, "PARTITION_ROUND_ITERS", 10)
+    monkeypatch.setattr(remove_overlaps, "PARTITION_ROUNDS", rounds)
+    x, y, r = dense_clusters(3000, 3)
+
+    # Overlapping pairs split between the first round's tiles
+    owner = np.empty(len(x), dtype=np.int64)
+    for tile, (owned, _) in enumerate(spatial_tiles(x, y, 3)):
+        owner[owned] = tile
+    across = {(i, j) for i, j in overlapping_pairs(x, y, r) if owner[i] != owner[j]}
+    assert len(across) > 20
+
+    messages: list[str] = []
+    sink = logger.add(messages.append, level="INFO", format="{message}")
+    trace: list[dict] = []
+    try:
+        relax_partitioned(x, y, r, trace)
+    finally:
+        logger.remove(sink)
+
+    n_rounds = sum(message.startswith("round ") for message in messages)
+    if tiles_finish:
+        # The tiles cleared everything, the pairs across their boundaries
+        # too, before the final serial relax
+        assert 1 < n_rounds < rounds
+        assert trace[0]["overlaps"] == 0
+    else:
+        assert n_rounds == rounds
+        assert trace[0]["overlaps"] > 0
+    assert not across & overlapping_pairs(x, y, r)
+
+    x32 = pl.Series("x", x).cast(pl.Float32)
+    y32 = pl.Series("y", y).cast(pl.Float32)
+    assert rounded_overlaps(x32, y32, r) == 0
+    xf = x32.cast(pl.Float64).to_numpy()
+    yf = y32.cast(pl.Float64).to_numpy()
+    assert overlapping_pairs(xf, yf, r) == set()
+
+
+TRACE_KEYS = {
+    "iteration",
+    "overlaps",
+    "max_penetration",
+    "active",
+    "mean_displacement",
+    "max_displacement",
+    "seconds",
+}
+
+
+def test_momentum_clears_the_dense_fixture_faster_than_jacobi():
+    x0, y0, r = dense_clusters(4000, 4)
+    runs = {}
+    for solver in ("jacobi", "momentum"):
+        x, y = x0.copy(), y0.copy()
+        trace: list[dict] = []
+        remaining = relax(x, y, r, verbose=False, solver=solver, trace=trace)
+        runs[solver] = remaining, trace
+        assert all(record.keys() == TRACE_KEYS for record in trace)
+        assert [record["iteration"] for record in trace] == list(
+            range(1, len(trace) + 1)
+        )
+
+    remaining, trace = runs["momentum"]
+    assert remaining == 0 and len(trace) < MAX_ITERS
+    assert trace[-1]["overlaps"] == 0
+    assert trace[0]["overlaps"] > 0 and trace[0]["max_displacement"] > 0
+    jacobi_remaining, jacobi_trace = runs["jacobi"]
+    assert remaining <= jacobi_remaining
+    assert len(trace) <= len(jacobi_trace)
+
+
+def test_remove_overlaps_writes_the_trace(tmp_path, monkeypatch):
+    trace_path = tmp_path / "relax_trace.json"
+    monkeypatch.setattr(remove_overlaps, "RELAX_TRACE_PATH", trace_path)
+    x, y, r = dense_clusters(2000, 2)
+    nodes = pl.DataFrame(
+        {"x": x, "y": y, "radius": r},
+        schema={"x": pl.Float32, "y": pl.Float32, "radius": pl.Float32},
+    )
+    nodes = remove_overlaps.remove_overlaps(nodes)
+
+    trace = json.loads(trace_path.read_text())
+    assert len(trace) > 1
+    assert all(record.keys() == TRACE_KEYS for record in trace)
+    assert trace[-1]["overlaps"] == 0
+    r = nodes["radius"].cast(pl.Float64).to_numpy()
+    assert rounded_overlaps(nodes["x"], nodes["y"], r) == 0
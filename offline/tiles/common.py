@@ -1,14 +1,15 @@
 import io
 import math
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
 import numpy as np
 import polars as pl
 from loguru import logger
 from PIL import Image as PILImage
-from pmtiles.tile import Compression, TileType, zxy_to_tileid
+from pmtiles.tile import Compression, TileType
 from pmtiles.writer import Writer
-from tqdm import tqdm
 
 WORLD_EXTENT = 2**16
 TILE_SIZE = 1024
@@ -32,6 +33,47 @@ def compute_max_zoom(radii: pl.Series) -> int:
     return max_z
 
 
+def tile_coords(v: np.ndarray, z: int) -> np.ndarray:
+    """Tile column (or row) of world coordinates `v` at zoom z."""
+    return np.floor((v + WORLD_EXTENT / 2) / (WORLD_EXTENT / 2**z)).astype(np.int64)
+
+
+def hilbert_keys(tx: np.ndarray, ty: np.ndarray, z: int) -> np.ndarray:
+    """Position of tiles (tx, ty) along the PMTiles Hilbert curve at zoom z.
+
+    The tile's id is zoom_base(z) + key. The curve visits each tile's four
+    children in a row, so the ancestor s zooms out has key >> 2s and sorting
+    by key keeps every ancestor's tiles contiguous, in tileid order.
+    """
+    x = tx.astype(np.int64)
+    y = ty.astype(np.int64)
+    keys = np.zeros(len(x), dtype=np.int64)
+    for a in range(z - 1, -1, -1):
+        s = 1 << a
+        rx = x & s
+        ry = y & s
+        keys += ((3 * rx) ^ ry) << a
+        swap = ry == 0
+        flip = swap & (rx != 0)
+        x = np.where(flip, s - 1 - x, x)
+        y = np.where(flip, s - 1 - y, y)
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+    return keys
+
+
+def zoom_base(z: int) -> int:
+    """The first tileid at zoom z."""
+    return (4**z - 1) // 3
+
+
+def key_runs(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct values of sorted `keys` and the offsets of their runs."""
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(first)
+    return keys[starts], np.r_[starts, len(keys)]
+
+
 def encode_webp_lossless(arr: np.ndarray) -> bytes:
     """Encode an RGBA (straight alpha) array to lossless WebP bytes."""
     buf = io.BytesIO()
@@ -41,31 +83,30 @@ def encode_webp_lossless(arr: np.ndarray) -> bytes:
     return buf.getvalue()
 
 
-def write_pmtiles(
-    pyramid: dict[int, dict[tuple[int, int], bytes]],
-    max_z: int,
+@contextmanager
+def stream_pmtiles(
     path: Path,
+    max_z: int,
     tile_type: TileType = TileType.WEBP,
     tile_compression: Compression = Compression.NONE,
-) -> None:
-    """Pack all zoom levels into a single PMTiles archive on disk.
+) -> Iterator[Writer]:
+    """Open a PMTiles archive on disk to write tiles into as they're made.
+
+    The writer spools tile bytes to a temporary file and keeps only their
+    directory entries, so memory doesn't grow with the archive's size. Write
+    tiles in ascending tileid order to get a clustered archive. The directory
+    is finalized when the block exits.
 
     Defaults pack lossless-WebP raster tiles uncompressed (the node/edge
     pyramids). Pass tile_type=TileType.UNKNOWN with tile_compression=GZIP for
     the gzipped-JSON metadata archive — the tile bytes must already be gzipped;
     tile_compression only tells the client how to decode them.
     """
-    total = sum(len(layer) for layer in pyramid.values())
-    logger.info(f"Writing {total:,} tiles to {path}")
-
     with open(path, "wb") as f:
         writer = Writer(f)
-        with tqdm(total=total, desc="Packing PMTiles", unit=" tiles") as pbar:
-            for z in range(max_z + 1):
-                for (x, y), data in pyramid[z].items():
-                    writer.write_tile(zxy_to_tileid(z, x, y), data)
-                    pbar.update(1)
+        yield writer
 
+        logger.info(f"Finalizing {writer.addressed_tiles:,} tiles in {path}")
         writer.finalize(
             {
                 "tile_type": tile_type,
@@ -55,17 +55,23 @@ import math
 import os
 from pathlib import Path
 
+import numpy as np
 import polars as pl
 from joblib import Parallel, delayed
 from loguru import logger
-from pmtiles.tile import Compression, TileType, tileid_to_zxy
+from pmtiles.tile import Compression, TileType
+from pmtiles.writer import Writer
 from tqdm import tqdm
 
 from offline.tiles.common import (
     TILE_SIZE,
     WORLD_EXTENT,
     compute_max_zoom,
-    write_pmtiles,
+    hilbert_keys,
+    key_runs,
+    stream_pmtiles,
+    tile_coords,
+    zoom_base,
 )
 from offline.tiles.palette import compute_palette
 
@@ -184,52 +190,42 @@ def build_records(nodes: pl.DataFrame, edges: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def bucket_meta_tiles(records: pl.DataFrame, z: int) -> pl.DataFrame:
+def meta_tile_index(
+    records: pl.DataFrame, max_z: int
+) -> tuple[pl.DataFrame, np.ndarray]:
+    """Place every node record in its max_z tile, once for the whole pyramid.
+
+    Placement is by node center, so each node lands in exactly one tile.
+    Returns the records inside the world, sorted by their tile's Hilbert key,
+    and those keys.
+    """
+    n_axis = 2**max_z
+    tx = tile_coords(records["x"].to_numpy(), max_z)
+    ty = tile_coords(records["y"].to_numpy(), max_z)
+    inside = np.flatnonzero((tx >= 0) & (tx < n_axis) & (ty >= 0) & (ty < n_axis))
+    keys = hilbert_keys(tx[inside], ty[inside], max_z)
+    order = np.argsort(keys, kind="stable")
+    return records[inside[order]], keys[order]
+
+
+def bucket_meta_tiles(
+    records: pl.DataFrame, keys: np.ndarray, z: int, max_z: int
+) -> tuple[pl.DataFrame, np.ndarray, np.ndarray]:
     """Filter to threshold-passing nodes at zoom z and group them by tile.
 
-    Placement is by node center, so each node lands in exactly one tile. Returns
-    one row per non-empty tile: (tx, ty, recs) where recs is a list of the full
-    node-record structs.
+    Takes meta_tile_index's sorted records and keys: a z tile's key is its
+    max_z children's shifted right by 2·(max_z − z), so the filtered records
+    already run tile by tile, in tileid order. Returns (rows, tileid, offsets):
+    one non-empty tile per tileid, its node records at
+    rows[offsets[k] : offsets[k + 1]].
     """
     ppwu = TILE_SIZE * (2**z) / WORLD_EXTENT
-    visible = records.filter(pl.col("radius") * ppwu >= NODE_META_MIN_PX)
-    if visible.is_empty():
-        # 0-row frame. (Don't select() only literals onto an empty frame — that
-        # broadcasts them into a phantom 1-row frame.)
-        return pl.DataFrame(
-            schema={"tx": pl.Int32, "ty": pl.Int32, "recs": pl.List(pl.Int64)}
-        )
-
-    tile_w = WORLD_EXTENT / (2**z)
-    n_axis = 2**z
-
-    rec = pl.struct(
-        "id", "t", "x", "y", "radius", "cl", "pr", "no", "ni", "ob", "ib", "out", "inn"
-    ).alias("rec")
-    return (
-        visible.with_columns(
-            ((pl.col("x") + WORLD_EXTENT / 2) / tile_w)
-            .floor()
-            .cast(pl.Int32)
-            .alias("tx"),
-            ((pl.col("y") + WORLD_EXTENT / 2) / tile_w)
-            .floor()
-            .cast(pl.Int32)
-            .alias("ty"),
-        )
-        .filter(
-            (pl.col("tx") >= 0)
-            & (pl.col("tx") < n_axis)
-            & (pl.col("ty") >= 0)
-            & (pl.col("ty") < n_axis)
-        )
-        .with_columns(rec)
-        .group_by(["tx", "ty"], maintain_order=False)
-        .agg(pl.col("rec").alias("recs"))
-    )
+    visible = records["radius"].to_numpy() * ppwu >= NODE_META_MIN_PX
+    tiles, offsets = key_runs(keys[visible] >> (2 * (max_z - z)))
+    return records.filter(visible), zoom_base(z) + tiles, offsets
 
 
-def encode_tile(tx: int, ty: int, recs: list[dict]) -> tuple[int, int, bytes]:
+def encode_tile(recs: list[dict]) -> bytes:
     """Reshape a tile's node records into compact JSON and gzip them."""
     entries = []
     for rec in recs:
@@ -257,64 +253,94 @@ def encode_tile(tx: int, ty: int, recs: list[dict]) -> tuple[int, int, bytes]:
     data = json.dumps(entries, separators=(",", ":"), ensure_ascii=False).encode(
         "utf-8"
     )
-    return tx, ty, gzip.compress(data, compresslevel=6)
+    return gzip.compress(data, compresslevel=6)
 
 
-def encode_tile_chunk(chunk: pl.DataFrame) -> list[tuple[int, int, bytes]]:
-    """Encode a slice of tiles in one worker task (chunked to amortize IPC)."""
-    return [encode_tile(tx, ty, recs) for tx, ty, recs in chunk.iter_rows()]
+def encode_tile_chunk(rows: pl.DataFrame, offsets: np.ndarray) -> list[bytes]:
+    """Encode a slice of tiles in one worker task (chunked to amortize IPC).
 
+    `rows` holds the slice's node records, tile k's at offsets[k]:offsets[k+1].
+    """
+    recs = rows.select(
+        "id", "t", "x", "y", "radius", "cl", "pr", "no", "ni", "ob", "ib", "out", "inn"
+    ).to_dicts()
+    return [
+        encode_tile(recs[offsets[k] : offsets[k + 1]]) for k in range(len(offsets) - 1)
+    ]
 
-def slice_for_parallelism(df: pl.DataFrame) -> list[pl.DataFrame]:
-    """Split a frame into ~cores×4 chunks (capped at ENCODE_CHUNK_ROWS rows).
+
+def chunk_size(n: int) -> int:
+    """Rows per task for ~cores×4 chunks (capped at ENCODE_CHUNK_ROWS rows).
 
     Targeting several chunks per core keeps all workers fed even on zoom levels
     with few tiles, while the row cap bounds per-task memory on the big levels.
     """
-    n = len(df)
     target = max(1, (os.cpu_count() or 1) * 4)
-    size = max(1, min(ENCODE_CHUNK_ROWS, math.ceil(n / target)))
-    return list(df.iter_slices(size))
+    return max(1, min(ENCODE_CHUNK_ROWS, math.ceil(n / target)))
+
+
+def slice_for_parallelism(df: pl.DataFrame) -> list[pl.DataFrame]:
+    """Split a frame into chunk_size() slices."""
+    return list(df.iter_slices(chunk_size(len(df))))
 
 
-def build_layer(records: pl.DataFrame, z: int) -> dict[tuple[int, int], bytes]:
-    """Bucket and encode every metadata tile at zoom z (chunked across cores)."""
-    bucketed = bucket_meta_tiles(records, z)
-    n_tiles = len(bucketed)
+def build_layer(
+    records: pl.DataFrame, keys: np.ndarray, z: int, max_z: int, writer: Writer
+) -> tuple[int, int]:
+    """Bucket and encode every metadata tile at zoom z (chunked across cores).
+
+    Chunks go into `writer` as they come back, in tileid order. Returns
+    (tiles, bytes) written.
+    """
+    rows, tileid, offsets = bucket_meta_tiles(records, keys, z, max_z)
+    n_tiles = len(tileid)
     if n_tiles == 0:
         logger.info(f"z={z}: no nodes above {NODE_META_MIN_PX}px, skipping")
-        return {}
+        return 0, 0
 
-    chunks = slice_for_parallelism(bucketed)
-    layer: dict[tuple[int, int], bytes] = {}
+    # Chunks of whole tiles, each with its tiles' contiguous run of rows
+    size = chunk_size(n_tiles)
+    chunks = [(a, min(a + size, n_tiles)) for a in range(0, n_tiles, size)]
+    total_bytes = 0
     results = Parallel(n_jobs=-1, return_as="generator", backend="loky")(
-        delayed(encode_tile_chunk)(chunk) for chunk in chunks
+        delayed(encode_tile_chunk)(
+            rows.slice(offsets[a], offsets[b] - offsets[a]),
+            offsets[a : b + 1] - offsets[a],
+        )
+        for a, b in chunks
     )
-    for batch in tqdm(  # pyright: ignore[reportGeneralTypeIssues]
-        results, total=len(chunks), desc=f"Encoding z={z}", unit=" chunks"
+    for (a, _), batch in zip(
+        chunks,
+        tqdm(  # pyright: ignore[reportGeneralTypeIssues]
+            results, total=len(chunks), desc=f"Encoding z={z}", unit=" chunks"
+        ),
     ):
-        for tx, ty, data in batch:  # pyright: ignore[reportOptionalIterable]
-            layer[(tx, ty)] = data
+        for k, data in enumerate(batch, a):  # pyright: ignore[reportArgumentType]
+            writer.write_tile(int(tileid[k]), data)
+            total_bytes += len(data)
 
-    total_bytes = sum(len(b) for b in layer.values())
     logger.info(
         f"z={z}: {n_tiles:,} tiles, {total_bytes / 1e6:.1f} MB gzipped "
         f"(avg {total_bytes / n_tiles / 1024:.1f} KB/tile)"
     )
-    return layer
+    return n_tiles, total_bytes
+
 
+def page_zoom(n: int) -> int:
+    """The smallest zoom whose 2^z × 2^z grid holds n pages."""
+    return max(1, math.ceil(math.log2(n) / 2))  # 4^z >= n
 
-def encode_page_chunk(chunk: pl.DataFrame, base: int) -> list[tuple[int, int, bytes]]:
+
+def encode_page_chunk(chunk: pl.DataFrame, base: int) -> list[tuple[int, bytes]]:
     """Encode a slice of pages in one worker task.
 
-    Each page id is mapped to a (z, x, y) slot via the PMTiles Hilbert order:
-    tileid = base + id, where base is the first tileid at the packing zoom.
+    Each page id is mapped to a slot via the PMTiles Hilbert order: tileid =
+    base + id, where base is the first tileid at the packing zoom.
     """
-    rows: list[tuple[int, int, bytes]] = []
+    rows: list[tuple[int, bytes]] = []
     for rid, t, x, y, r, cl, pr, no, ni, ob, inb, out, inn in chunk.iter_rows():
-        # tx/ty are the PMTiles slot for this page id; x/y/r are the node's own
-        # world geometry (so a page lookup can place/zoom to the node directly).
-        _, tx, ty = tileid_to_zxy(base + rid)
+        # x/y/r are the node's own world geometry (so a page lookup can
+        # place/zoom to the node directly), not its slot in the archive.
         entry = {
             "id": rid,
             "t": t,
@@ -339,21 +365,18 @@ def encode_page_chunk(chunk: pl.DataFrame, base: int) -> list[tuple[int, int, by
         data = json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode(
             "utf-8"
         )
-        rows.append((tx, ty, gzip.compress(data, compresslevel=6)))
+        rows.append((base + rid, gzip.compress(data, compresslevel=6)))
     return rows
 
 
-def build_page_archive(
-    records: pl.DataFrame,
-) -> tuple[dict[int, dict[tuple[int, int], bytes]], int]:
-    """Pack one JSON entry per page into a single-zoom PMTiles pyramid.
+def build_page_archive(records: pl.DataFrame, z: int, writer: Writer) -> None:
+    """Pack one JSON entry per page into `writer` at the single zoom z.
 
-    Picks the smallest zoom Z whose 2^Z × 2^Z grid holds every page, then writes
-    pages in id order so tileids stay ascending (clustered archive).
+    z is page_zoom(len(records)). Pages are written in id order so tileids stay
+    ascending (clustered archive).
     """
     n = len(records)
-    z = max(1, math.ceil(math.log2(n) / 2))  # 4^z >= n
-    base = (4**z - 1) // 3  # first tileid at zoom z
+    base = zoom_base(z)
     logger.info(
         f"Packing {n:,} pages at z={z} ({2**z:,} per side, base tileid {base:,})"
     )
@@ -362,23 +385,19 @@ def build_page_archive(
         "id", "t", "x", "y", "radius", "cl", "pr", "no", "ni", "ob", "ib", "out", "inn"
     )
     chunks = slice_for_parallelism(sel)
-    layer: dict[tuple[int, int], bytes] = {}
+    total_bytes = 0
     results = Parallel(n_jobs=-1, return_as="generator", backend="loky")(
         delayed(encode_page_chunk)(chunk, base) for chunk in chunks
     )
     for batch in tqdm(  # pyright: ignore[reportGeneralTypeIssues]
         results, total=len(chunks), desc="Encoding pages", unit=" chunks"
     ):
-        for x, y, data in batch:  # pyright: ignore[reportOptionalIterable]
-            layer[(x, y)] = data
+        for tileid, data in batch:  # pyright: ignore[reportOptionalIterable]
+            writer.write_tile(tileid, data)
+            total_bytes += len(data)
 
-    total_bytes = sum(len(b) for b in layer.values())
     logger.info(f"Page archive: {n:,} pages, {total_bytes / 1e6:.1f} MB gzipped")
 
-    pyramid: dict[int, dict[tuple[int, int], bytes]] = {zz: {} for zz in range(z + 1)}
-    pyramid[z] = layer
-    return pyramid, z
-
 
 def build_meta_json(
     nodes: pl.DataFrame, edges: pl.DataFrame, palette: pl.DataFrame
@@ -456,34 +475,35 @@ if __name__ == "__main__":
 
     # 1. Tile pyramid (only up to the zoom where every node has metadata; the
     # frontend overzooms beyond this for deeper raster levels).
-    pyramid: dict[int, dict[tuple[int, int], bytes]] = {}
-    for z in range(meta_max_z + 1):
-        pyramid[z] = build_layer(records, z)
-
-    total_tiles = sum(len(layer) for layer in pyramid.values())
-    total_bytes = sum(sum(len(b) for b in layer.values()) for layer in pyramid.values())
-    logger.info(
-        f"Metadata pyramid: {total_tiles:,} tiles, {total_bytes / 1e6:.1f} MB gzipped"
-    )
-
-    write_pmtiles(
-        pyramid,
-        meta_max_z,
+    tile_records, tile_keys = meta_tile_index(records, meta_max_z)
+    total_tiles = total_bytes = 0
+    with stream_pmtiles(
         META_TILES_OUTPUT_PATH,
+        meta_max_z,
         tile_type=TileType.UNKNOWN,
         tile_compression=Compression.GZIP,
-    )
+    ) as writer:
+        for z in range(meta_max_z + 1):
+            n_tiles, n_bytes = build_layer(
+                tile_records, tile_keys, z, meta_max_z, writer
+            )
+            total_tiles += n_tiles
+            total_bytes += n_bytes
+        logger.info(
+            f"Metadata pyramid: {total_tiles:,} tiles, "
+            f"{total_bytes / 1e6:.1f} MB gzipped"
+        )
     logger.success(f"Wrote metadata pyramid to {META_TILES_OUTPUT_PATH}")
 
     # 2. Per-page archive.
-    page_pyramid, page_z = build_page_archive(records)
-    write_pmtiles(
-        page_pyramid,
-        page_z,
+    page_z = page_zoom(len(records))
+    with stream_pmtiles(
         PAGES_OUTPUT_PATH,
+        page_z,
         tile_type=TileType.UNKNOWN,
         tile_compression=Compression.GZIP,
-    )
+    ) as writer:
+        build_page_archive(records, page_z, writer)
     logger.success(f"Wrote per-page archive to {PAGES_OUTPUT_PATH}")
 
     # 3. Overarching meta.json.
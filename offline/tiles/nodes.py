@@ -6,6 +6,7 @@ import polars as pl
 import skia
 from joblib import Parallel, delayed
 from loguru import logger
+from pmtiles.writer import Writer
 from tqdm import tqdm
 
 from offline.tiles.common import (
@@ -13,7 +14,11 @@ from offline.tiles.common import (
     WORLD_EXTENT,
     compute_max_zoom,
     encode_webp_lossless,
-    write_pmtiles,
+    hilbert_keys,
+    key_runs,
+    stream_pmtiles,
+    tile_coords,
+    zoom_base,
 )
 from offline.tiles.palette import compute_palette
 
@@ -25,51 +30,75 @@ NODE_TILES_OUTPUT_PATH = Path("output/node_tiles.pmtiles")
 SSAA = 4
 
 
-def bucket_nodes_by_tile(nodes: pl.DataFrame, max_z: int) -> pl.DataFrame:
-    """Group nodes by their z=MAX tile.
+def tile_index(
+    nodes: pl.DataFrame, max_z: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, tuple[np.ndarray, ...]]:
+    """Tile membership of every node at max_z, computed once for the pyramid.
 
-    Each node is exploded into every tile its bounding circle touches so big
-    nodes appear in every tile they overlap. Returns one row per non-empty
-    tile with list-columns of node attributes.
+    Each node is entered in every z=MAX tile its bounding circle touches so big
+    nodes appear in every tile they overlap. Returns (keys, node, tx, ty,
+    bounds): the (tile, node) entries sorted by the tile's Hilbert key, and
+    each node's (tx_min, tx_max, ty_min, ty_max) tile range at max_z.
     """
-    tile_w = WORLD_EXTENT / (2**max_z)
     n_axis = 2**max_z
-
-    exploded = (
-        nodes.with_columns(
-            ((pl.col("x") - pl.col("radius") + WORLD_EXTENT / 2) / tile_w)
-            .floor()
-            .cast(pl.Int32)
-            .alias("tx_min"),
-            ((pl.col("x") + pl.col("radius") + WORLD_EXTENT / 2) / tile_w)
-            .floor()
-            .cast(pl.Int32)
-            .alias("tx_max"),
-            ((pl.col("y") - pl.col("radius") + WORLD_EXTENT / 2) / tile_w)
-            .floor()
-            .cast(pl.Int32)
-            .alias("ty_min"),
-            ((pl.col("y") + pl.col("radius") + WORLD_EXTENT / 2) / tile_w)
-            .floor()
-            .cast(pl.Int32)
-            .alias("ty_max"),
-        )
-        .with_columns(pl.int_ranges(pl.col("tx_min"), pl.col("tx_max") + 1).alias("tx"))
-        .explode("tx")
-        .with_columns(pl.int_ranges(pl.col("ty_min"), pl.col("ty_max") + 1).alias("ty"))
-        .explode("ty")
-        .filter(
-            (pl.col("tx") >= 0)
-            & (pl.col("tx") < n_axis)
-            & (pl.col("ty") >= 0)
-            & (pl.col("ty") < n_axis)
-        )
-        .select(["tx", "ty", "x", "y", "radius", "r", "g", "b"])
+    x = nodes["x"].to_numpy()
+    y = nodes["y"].to_numpy()
+    r = nodes["radius"].to_numpy()
+    tx_min, tx_max = tile_coords(x - r, max_z), tile_coords(x + r, max_z)
+    ty_min, ty_max = tile_coords(y - r, max_z), tile_coords(y + r, max_z)
+    inside = np.flatnonzero(
+        (tx_max >= 0) & (tx_min < n_axis) & (ty_max >= 0) & (ty_min < n_axis)
     )
-    logger.info(f"Bucketed {len(nodes):,} nodes into {len(exploded):,} tile-node rows")
+    bounds = tuple(np.clip(b, 0, n_axis - 1) for b in (tx_min, tx_max, ty_min, ty_max))
+    tx_min, tx_max, ty_min, ty_max = (b[inside] for b in bounds)
+
+    width = tx_max - tx_min + 1
+    counts = width * (ty_max - ty_min + 1)
+    owner = np.repeat(np.arange(len(inside)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    tx = tx_min[owner] + k % width[owner]
+    ty = ty_min[owner] + k // width[owner]
+    keys = hilbert_keys(tx, ty, max_z)
+    order = np.argsort(keys, kind="stable")
+    logger.info(f"Indexed {len(nodes):,} nodes into {len(keys):,} tile-node rows")
+    return (
+        keys[order],
+        inside[owner[order]].astype(np.int32),
+        tx[order].astype(np.int32),
+        ty[order].astype(np.int32),
+        bounds,
+    )
+
 
-    return exploded.group_by(["tx", "ty"], maintain_order=False).agg(
-        "x", "y", "radius", "r", "g", "b"
+def bucket_nodes_by_tile(
+    index: tuple[
+        np.ndarray, np.ndarray, np.ndarray, np.ndarray, tuple[np.ndarray, ...]
+    ],
+    z: int,
+    max_z: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Group nodes by their zoom-z tile, from the max_z tile_index.
+
+    A z tile's key is its max_z children's shifted right by 2·(max_z − z), so
+    the sorted entries already run tile by tile, in tileid order. A node
+    spanning several children of one tile is kept only in its first: the child
+    at the corner of its range clamped to the tile. Returns (tileid, tx, ty,
+    offsets, node): one non-empty tile per tileid, its nodes at
+    node[offsets[k] : offsets[k + 1]].
+    """
+    keys, node, tx, ty, (tx_min, _, ty_min, _) = index
+    shift = max_z - z
+    first = (tx == np.maximum(tx_min[node], (tx >> shift) << shift)) & (
+        ty == np.maximum(ty_min[node], (ty >> shift) << shift)
+    )
+    tiles, offsets = key_runs(keys[first] >> (2 * shift))
+    starts = offsets[:-1]
+    return (
+        zoom_base(z) + tiles,
+        tx[first][starts] >> shift,
+        ty[first][starts] >> shift,
+        offsets,
+        node[first],
     )
 
 
@@ -152,38 +181,58 @@ def render_node_tile(
 
 
 def render_layer(
-    nodes_with_palette: pl.DataFrame, z: int
-) -> dict[tuple[int, int], bytes]:
-    """Bucket nodes into this zoom level's tile grid and render each tile."""
+    nodes_with_palette: pl.DataFrame,
+    index: tuple[
+        np.ndarray, np.ndarray, np.ndarray, np.ndarray, tuple[np.ndarray, ...]
+    ],
+    z: int,
+    max_z: int,
+    writer: Writer,
+) -> tuple[int, int]:
+    """Bucket nodes into this zoom level's tile grid and render each tile.
+
+    Tiles go into `writer` as they come back, in tileid order, so no more than
+    the pool's backlog is held in memory. Returns (tiles, bytes) written.
+    """
     t_bucket = time.perf_counter()
-    bucketed = bucket_nodes_by_tile(nodes_with_palette, z)
-    n_tiles = len(bucketed)
+    tileid, tx, ty, offsets, node = bucket_nodes_by_tile(index, z, max_z)
+    n_tiles = len(tileid)
     bucket_s = time.perf_counter() - t_bucket
 
     if n_tiles == 0:
         logger.warning(f"z={z}: no tiles contain nodes, skipping")
-        return {}
+        return 0, 0
 
     logger.info(f"z={z}: bucketed in {bucket_s:.1f}s → rendering {n_tiles:,} tile(s)")
 
-    layer: dict[tuple[int, int], bytes] = {}
+    total_bytes = 0
     t_render = time.perf_counter()
+    columns = [
+        nodes_with_palette[c].to_numpy() for c in ("x", "y", "radius", "r", "g", "b")
+    ]
     results = Parallel(n_jobs=-1, return_as="generator", backend="loky")(
-        delayed(render_node_tile)(tx, ty, z, xs, ys, rs, reds, greens, blues)
-        for tx, ty, xs, ys, rs, reds, greens, blues in bucketed.iter_rows()
+        delayed(render_node_tile)(
+            int(tx[k]),
+            int(ty[k]),
+            z,
+            *(c[node[offsets[k] : offsets[k + 1]]].tolist() for c in columns),
+        )
+        for k in range(n_tiles)
     )
-    for tx, ty, data in tqdm(  # pyright: ignore[reportGeneralTypeIssues]
-        results, total=n_tiles, desc=f"Rendering z={z}", unit=" tiles"
+    for k, (_, _, data) in enumerate(
+        tqdm(  # pyright: ignore[reportGeneralTypeIssues]
+            results, total=n_tiles, desc=f"Rendering z={z}", unit=" tiles"
+        )
     ):
-        layer[(tx, ty)] = data
+        writer.write_tile(int(tileid[k]), data)
+        total_bytes += len(data)
     render_s = time.perf_counter() - t_render
 
-    total_bytes = sum(len(b) for b in layer.values())
     logger.info(
         f"z={z}: rendered in {render_s:.1f}s — {n_tiles:,} tiles, "
         f"{total_bytes / 1e9:.3f} GB (avg {total_bytes / n_tiles / 1024:.1f} KB/tile)"
     )
-    return layer
+    return n_tiles, total_bytes
 
 
 if __name__ == "__main__":
@@ -205,19 +254,19 @@ if __name__ == "__main__":
     )
 
     nodes_with_palette = nodes.join(palette, on="partition", how="inner")
+    index = tile_index(nodes_with_palette, max_z)
 
-    pyramid: dict[int, dict[tuple[int, int], bytes]] = {}
+    total_tiles = total_bytes = 0
     t_total = time.perf_counter()
-    for z in range(max_z + 1):
-        pyramid[z] = render_layer(nodes_with_palette, z)
-    total_s = time.perf_counter() - t_total
-
-    total_tiles = sum(len(layer) for layer in pyramid.values())
-    total_bytes = sum(sum(len(b) for b in layer.values()) for layer in pyramid.values())
-    logger.info(
-        f"All {max_z + 1} levels rendered in {total_s:.1f}s: "
-        f"{total_tiles:,} tiles, {total_bytes / 1e9:.2f} GB in memory"
-    )
+    with stream_pmtiles(NODE_TILES_OUTPUT_PATH, max_z) as writer:
+        for z in range(max_z + 1):
+            n_tiles, n_bytes = render_layer(nodes_with_palette, index, z, max_z, writer)
+            total_tiles += n_tiles
+            total_bytes += n_bytes
+        total_s = time.perf_counter() - t_total
+        logger.info(
+            f"All {max_z + 1} levels rendered in {total_s:.1f}s: "
+            f"{total_tiles:,} tiles, {total_bytes / 1e9:.2f} GB written"
+        )
 
-    write_pmtiles(pyramid, max_z, NODE_TILES_OUTPUT_PATH)
     logger.success(f"Wrote tile pyramid to {NODE_TILES_OUTPUT_PATH}")
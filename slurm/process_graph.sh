@@ -14,5 +14,5 @@
 
 set -e
 
-uv run offline/process_graph.py
+uv run python -m offline.process_graph
 uv run offline/remove_overlaps.py